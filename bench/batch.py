@@ -0,0 +1,69 @@
+"""
+A scoring formula over a table: `evaluate_batch` on the columns vs a tree-walker
+called on each row (what evaluating a form per row of bindings costs)
+
+Run with: python -m bench.batch [--rows 1000 100000] [--repeat 5]
+"""
+
+import argparse
+import random
+
+from bench.nesting import best_time
+from src import Parser, scan
+from src.batch import evaluate_batch
+from src.eval import evalate_single_op
+from src.parser import Atom, Expression, Operator
+from src.token import LispValue, TokenKind
+
+FORMULA = "(/ (- (+ price fee (/ price 10)) discount) (+ quantity 1) 2)"
+
+
+def evaluate_row(expr: Expression, row: dict[str, LispValue]) -> LispValue | list:
+    "The baseline: `evaluate`, with the symbols looked up in the row"
+    match expr:
+        case Atom(kind=TokenKind.SYMBOL, literal=name) if name in row:
+            return row[name]
+        case Atom(literal=literal):
+            return literal
+        case [Operator(op=op), *raw_args]:
+            return evalate_single_op(op, [evaluate_row(arg, row) for arg in raw_args])
+
+
+def make_table(n_rows: int, rng: random.Random) -> dict[str, list]:
+    return {
+        "price": [rng.uniform(1, 500) for _ in range(n_rows)],
+        "fee": [rng.randint(0, 20) for _ in range(n_rows)],
+        "discount": [rng.choice([0, 5, 12.5]) for _ in range(n_rows)],
+        "quantity": [rng.randint(1, 50) for _ in range(n_rows)],
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000])
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    expr = Parser(tokens=scan(FORMULA)).parse()
+    rng = random.Random(0)
+    print(FORMULA)
+    print(f"{'rows':>10} {'per row (ms)':>13} {'batch (ms)':>11} {'speedup':>8}")
+    for n_rows in args.rows:
+        table = make_table(n_rows, rng)
+        rows = [dict(zip(table, values)) for values in zip(*table.values())]
+
+        expected = [evaluate_row(expr, row) for row in rows]
+        assert evaluate_batch(expr, table) == expected
+
+        per_row = best_time(
+            lambda rows=rows: [evaluate_row(expr, row) for row in rows], args.repeat
+        )
+        batch = best_time(lambda table=table: evaluate_batch(expr, table), args.repeat)
+        print(
+            f"{n_rows:>10} {per_row * 1e3:>13.1f} {batch * 1e3:>11.1f} "
+            f"{per_row / batch:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
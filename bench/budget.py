@@ -0,0 +1,79 @@
+"""
+The cost of the budget accounting: each engine without a budget vs with one (limits
+high enough never to be reached), on the same forms.
+
+- arithmetic: a random arithmetic tree
+- lists: `cons` and `list` building cells
+- count: a tail recursive loop of function calls (run by env.py)
+
+Run with: python -m bench.budget [--repeat 200]
+"""
+
+import argparse
+import random
+from collections.abc import Callable
+
+from bench.generators import random_arithmetic
+from bench.nesting import best_time
+from src import Parser, scan
+from src.budget import Budget
+from src.compiler import compile
+from src.eval import evaluate
+from src.parser import Expression
+from src.vm import compile_program, run
+
+LIMITS = {"max_steps": 10**12, "max_seconds": 3600.0, "max_allocations": 10**12}
+
+
+def parse(source: str) -> Expression:
+    return Parser(tokens=scan(source)).parse()
+
+
+def workloads() -> dict[str, Expression]:
+    return {
+        "arithmetic": parse(random_arithmetic(6, 3, random.Random(0))),
+        "lists": parse("(list " + "(cons 1 (list 2 3 4)) " * 200 + ")"),
+        "count": parse("(count 5000 0)"),
+    }
+
+
+def engines(form: Expression) -> dict[str, Callable[[], object]]:
+    program = compile_program(form)
+    return {
+        "evaluate": lambda: evaluate(form),
+        "compiled": compile(form),
+        "vm": lambda: run(program),
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--repeat", type=int, default=200)
+    args = arg_parser.parse_args()
+
+    evaluate(parse("(defun count (n acc) (if (= n 0 ) acc (count (- n 1) (+ acc 1))))"))
+
+    print(f"time per evaluation in µs (best of {args.repeat})")
+    print(
+        f"{'workload':<12} {'engine':<9} {'no budget':>10} {'budget':>10} "
+        f"{'overhead':>9}  steps/allocations"
+    )
+    for name, form in workloads().items():
+        for engine, fn in engines(form).items():
+            plain = best_time(fn, args.repeat)
+
+            def budgeted(fn=fn) -> Budget:
+                with Budget(**LIMITS) as budget:
+                    fn()
+                return budget
+
+            counters = budgeted()
+            with_budget = best_time(budgeted, args.repeat)
+            print(
+                f"{name:<12} {engine:<9} {plain * 1e6:>10.1f} {with_budget * 1e6:>10.1f} "
+                f"{with_budget / plain - 1:>8.1%}  {counters.steps}/{counters.allocations}"
+            )
+
+
+if __name__ == "__main__":
+    main()
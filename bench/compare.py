@@ -0,0 +1,77 @@
+"""
+Compare two runs of the benchmark suite (python -m bench.suite --output ...), and flag
+the stages which got slower, or used more memory, beyond a threshold
+
+Run with: python -m bench.compare base.json new.json [--threshold 0.1]
+Exits with status 1 when there are regressions.
+"""
+
+import argparse
+import json
+import sys
+
+MIN_PEAK_BYTES = 4096
+
+
+def load(path: str) -> dict[tuple[str, int, str], dict]:
+    with open(path) as f:
+        report = json.load(f)
+    return {
+        (result["workload"], result["size"], result["stage"]): result
+        for result in report["results"]
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("base")
+    arg_parser.add_argument("new")
+    arg_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="relative change above which a stage is flagged (0.1 is 10%%)",
+    )
+    args = arg_parser.parse_args()
+
+    base, new = load(args.base), load(args.new)
+    print(f"{'workload':<18} {'size':>7} {'stage':<20} {'time':>8} {'memory':>8}")
+    regressions = 0
+    for key in sorted(base.keys() & new.keys()):
+        before, after = base[key], new[key]
+        if before["error"] or after["error"]:
+            # e.g. a stage which now hits (or no longer hits) the recursion limit
+            if before["error"] != after["error"]:
+                print(
+                    f"{key[0]:<18} {key[1]:>7} {key[2]:<20} {before['error']} -> {after['error']}"
+                )
+            continue
+
+        # like timeit, the best times: the others mostly measure the noise of the machine
+        time_ratio = min(after["times"]) / min(before["times"])
+        # small peaks vary with the interpreter internals, not with the code benchmarked
+        memory_ratio = max(after["peak_bytes"], MIN_PEAK_BYTES) / max(
+            before["peak_bytes"], MIN_PEAK_BYTES
+        )
+        flags = [
+            name
+            for name, ratio in [("time", time_ratio), ("memory", memory_ratio)]
+            if ratio > 1 + args.threshold
+        ]
+        regressions += bool(flags)
+        print(
+            f"{key[0]:<18} {key[1]:>7} {key[2]:<20} {time_ratio:>7.2f}x {memory_ratio:>7.2f}x"
+            + (f"  REGRESSION ({', '.join(flags)})" if flags else "")
+        )
+
+    for key in sorted(base.keys() ^ new.keys()):
+        print(
+            f"{key[0]:<18} {key[1]:>7} {key[2]:<20} only in {'base' if key in base else 'new'}"
+        )
+
+    print(f"{regressions} regressions (threshold {args.threshold:.0%})")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
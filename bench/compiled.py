@@ -0,0 +1,60 @@
+"""
+Tree-walking `evaluate` vs expressions compiled to closures, evaluated many times
+
+Run with: python -m bench.compiled [--repeat 1000]
+"""
+
+import argparse
+import random
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from bench.generators import random_arithmetic
+from src.compiler import compile
+from src.eval import evaluate
+from src.parser import Expression, Parser
+from src.scanner import scan
+
+LISP_SNIPPET_DIR = Path("lisp_snippets")
+
+
+def time_per_call(fn: Callable[[], object], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def workloads() -> list[tuple[str, Expression]]:
+    forms = [
+        (path.name, form)
+        for path in sorted(LISP_SNIPPET_DIR.glob("*.lisp"))
+        for form in Parser(tokens=scan(path.read_text())).iter_forms()
+    ]
+    rng = random.Random(0)
+    for depth, width in [(3, 3), (6, 3), (10, 2)]:
+        source = random_arithmetic(depth, width, rng)
+        forms.append((f"arithmetic d={depth} w={width}", Parser(scan(source)).parse()))
+    return forms
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--repeat", type=int, default=1000)
+    args = arg_parser.parse_args()
+
+    print(f"time per evaluation in µs (mean over {args.repeat})")
+    print(f"{'workload':<30} {'evaluate':>10} {'compiled':>10} {'speedup':>8}")
+    for name, form in workloads():
+        compiled = compile(form)
+        assert compiled() == evaluate(form), name
+        tree_walk = time_per_call(lambda form=form: evaluate(form), args.repeat)
+        closures = time_per_call(compiled, args.repeat)
+        print(
+            f"{name:<30} {tree_walk * 1e6:>10.2f} {closures * 1e6:>10.2f} {tree_walk / closures:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Cons cells (`src.cons.Cons`) vs the previous representation of lists as Python lists:
+a pair was the list `[car, cdr]`, and a list of items a Python list, copied to prepend
+
+- prepend: build a list of n items by adding each item in front of the previous list
+- share: 100 lists, each one item in front of the same list of n items
+- memory: bytes per pair, for a chain of n pairs
+- traverse: sum the n items of a list
+
+Run with: python -m bench.cons [--sizes 100 1000 10000] [--repeat 5]
+"""
+
+import argparse
+import tracemalloc
+
+from bench.nesting import best_time
+from src.cons import Cons, from_items
+from src.eval import evalate_single_op
+from src.token import SINGLETON_TOKENS, TokenKind
+
+CONS = SINGLETON_TOKENS[TokenKind.CONS]
+N_SHARING = 100
+
+
+def prepend_cells(n: int) -> Cons | None:
+    cell = None
+    for item in range(n):
+        cell = evalate_single_op(CONS, [item, cell])
+    return cell
+
+
+def prepend_copies(n: int) -> list:
+    items: list = []
+    for item in range(n):
+        items = [item, *items]  # O(n): the previous list is copied
+    return items
+
+
+def pair_chain(n: int) -> list | None:
+    "A chain of n pairs like the previous `cons` returned: [car, cdr]"
+    pair = None
+    for _ in range(n):
+        pair = [0, pair]  # NOTE: a small int, which is never allocated
+    return pair
+
+
+def cell_chain(n: int) -> Cons | None:
+    return from_items([0] * n)
+
+
+def allocated_bytes(build) -> int:
+    tracemalloc.start()
+    try:
+        built = build()
+        allocated = tracemalloc.get_traced_memory()[0]
+        del built
+        return allocated
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[100, 1_000, 10_000]
+    )
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    print(f"times in ms (best of {args.repeat}), memory in bytes per pair")
+    print(
+        f"{'n':>7} {'prepend':>8} {'copies':>8} {'share':>7} {'copies':>8} "
+        f"{'B/cell':>7} {'B/[a,b]':>8} {'traverse':>9} {'list':>7}"
+    )
+    for n in args.sizes:
+        cells, items = prepend_cells(n), prepend_copies(n)
+        assert list(cells) == items
+
+        prepend = best_time(lambda n=n: prepend_cells(n), args.repeat)
+        prepend_list = best_time(lambda n=n: prepend_copies(n), args.repeat)
+        share = best_time(
+            lambda cells=cells: [Cons(idx, cells) for idx in range(N_SHARING)],
+            args.repeat,
+        )
+        share_list = best_time(
+            lambda items=items: [[idx, *items] for idx in range(N_SHARING)],
+            args.repeat,
+        )
+        cell_bytes = allocated_bytes(lambda n=n: cell_chain(n)) / n
+        pair_bytes = allocated_bytes(lambda n=n: pair_chain(n)) / n
+        traverse = best_time(lambda cells=cells: sum(cells), args.repeat)
+        traverse_list = best_time(lambda items=items: sum(items), args.repeat)
+        print(
+            f"{n:>7} {prepend * 1e3:>8.2f} {prepend_list * 1e3:>8.2f} "
+            f"{share * 1e3:>7.3f} {share_list * 1e3:>8.3f} "
+            f"{cell_bytes:>7.1f} {pair_bytes:>8.1f} "
+            f"{traverse * 1e3:>9.3f} {traverse_list * 1e3:>7.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Variable lookups by lexical address (`resolve` + `evaluate_resolved`) vs by name in a
+chain of dicts (one per scope, searched from the innermost), at growing depths
+
+- lookup: a single lookup of a variable bound `depth` scopes up
+- eval: `(+ x x ... x)` with 100 references to that variable
+
+Run with: python -m bench.env [--depths 0 1 2 4 8 16 32] [--repeat 20]
+"""
+
+import argparse
+
+from bench.compiled import time_per_call
+from src import Parser, scan
+from src.env import Frame, Scope, evaluate_resolved, resolve
+from src.eval import evalate_single_op, evaluate
+from src.parser import Atom, Expression, Operator
+from src.token import TokenKind
+
+N_REFS = 100
+
+
+def lookup_by_name(scopes: list[dict[str, object]], name: str) -> object:
+    "The baseline: each scope is a dict, the innermost last"
+    for scope in reversed(scopes):
+        if name in scope:
+            return scope[name]
+    return name
+
+
+def lookup_by_address(frame: Frame, depth: int, index: int) -> object:
+    while depth:
+        frame = frame.parent
+        depth -= 1
+    return frame.slots[index]
+
+
+def evaluate_by_name(expr: Expression, scopes: list[dict[str, object]]) -> object:
+    match expr:
+        case Atom(kind=TokenKind.SYMBOL, literal=name):
+            return lookup_by_name(scopes, name)
+        case [Operator(op=op), *raw_args] if op.kind != TokenKind.QUOTE:
+            args = [evaluate_by_name(arg, scopes) for arg in raw_args]
+            return evalate_single_op(op, args)
+        case _:
+            return evaluate(expr)
+
+
+def nested(depth: int) -> tuple[list[dict[str, object]], Scope, Frame]:
+    "`x` bound in the outermost of depth + 1 scopes, each with a few other variables"
+    names = ["apple", "banana", "x"]
+    scopes = [dict(zip(names, [1, 2, 3]))]
+    scope, frame = Scope.of(names), Frame([1, 2, 3])
+    for level in range(depth):
+        inner = [f"v{level}a", f"v{level}b"]  # NOTE: no keyword prefix
+        scopes.append(dict.fromkeys(inner, 0))
+        scope, frame = Scope.of(inner, scope), Frame([0, 0], frame)
+    return scopes, scope, frame
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument(
+        "--depths", type=int, nargs="+", default=[0, 1, 2, 4, 8, 16, 32]
+    )
+    arg_parser.add_argument("--repeat", type=int, default=20)
+    args = arg_parser.parse_args()
+
+    expr = Parser(tokens=scan("(+ " + "x " * N_REFS + ")")).parse()
+    print(f"time per call in µs (mean over {args.repeat}, x1000 for the lookups)")
+    print(
+        f"{'depth':>6} {'lookup name':>12} {'address':>8} {'speedup':>8} "
+        f"{'eval name':>10} {'address':>8} {'speedup':>8}"
+    )
+    for depth in args.depths:
+        scopes, scope, frame = nested(depth)
+        resolved = resolve(expr, scope)
+        (ref, *_) = resolved[1:]
+        assert evaluate_resolved(resolved, frame) == evaluate_by_name(expr, scopes)
+
+        n_lookups = args.repeat * 1000  # single lookups are too quick to time alone
+        by_name = time_per_call(
+            lambda scopes=scopes: lookup_by_name(scopes, "x"), n_lookups
+        )
+        by_address = time_per_call(
+            lambda frame=frame, ref=ref: lookup_by_address(frame, ref.depth, ref.index),
+            n_lookups,
+        )
+        eval_name = time_per_call(
+            lambda scopes=scopes: evaluate_by_name(expr, scopes), args.repeat
+        )
+        eval_address = time_per_call(
+            lambda resolved=resolved, frame=frame: evaluate_resolved(resolved, frame),
+            args.repeat,
+        )
+        print(
+            f"{depth:>6} {by_name * 1e6:>12.3f} {by_address * 1e6:>8.3f} "
+            f"{by_name / by_address:>7.1f}x {eval_name * 1e6:>10.1f} "
+            f"{eval_address * 1e6:>8.1f} {eval_name / eval_address:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Function calls: `evaluate` (lexical addresses, slotted frames, an explicit stack of
+continuations with proper tail calls) vs a recursive tree-walker with a dict per call
+frame, on loops written as recursion
+
+- count: the loop-style program, a tail call per iteration
+- sumacc: 1 + ... + n with an accumulator (tail calls)
+- sum: 1 + ... + n without one, `(+ n (sum (- n 1)))` (not tail calls)
+- memory: peak bytes allocated while running, at growing n (tracemalloc, so slower)
+
+Run with: python -m bench.functions [--n 1000000] [--memory-sizes 1000 10000 100000]
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+
+from bench.nesting import best_time
+from src import Parser, scan
+from src.eval import evalate_single_op, evaluate
+from src.parser import Atom, Expression, Operator
+from src.token import LispValue, TokenKind
+
+PROGRAMS = {
+    "count": (
+        "(defun count (n acc) (if (= n 0 ) acc (count (- n 1) (+ acc 1))))",
+        "(count {n} 0)",
+    ),
+    "sumacc": (
+        "(defun sumacc (n acc) (if (= n 0 ) acc (sumacc (- n 1) (+ acc n))))",
+        "(sumacc {n} 0)",
+    ),
+    "sum": (
+        "(defun sum (n) (if (= n 0 ) 0 (+ n (sum (- n 1)))))",
+        "(sum {n})",
+    ),
+}
+# the functions defined by `evaluate_naive`: name -> (params, body, frame)
+NAIVE_FUNCTIONS: dict[str, tuple] = {}
+N_BASELINE = 100  # the baseline recurses in Python: keep it under the recursion limit
+
+
+def evaluate_naive(expr: Expression, frame: dict | None) -> LispValue | object:
+    "The baseline: recursive, each frame a dict of the params (and None: the parent)"
+    match expr:
+        case Atom(kind=TokenKind.SYMBOL, literal=name):
+            while frame is not None:
+                if name in frame:
+                    return frame[name]
+                frame = frame[None]
+            return NAIVE_FUNCTIONS.get(name, name)
+        case Atom(literal=literal):
+            return literal
+        case [Operator(op=op), test, then, *otherwise] if op.kind == TokenKind.IF:
+            if evaluate_naive(test, frame) is not None:
+                return evaluate_naive(then, frame)
+            return evaluate_naive(otherwise[0], frame) if otherwise else None
+        case [Operator(op=op), Atom(literal=name), params, *body] if (
+            op.kind == TokenKind.DEFUN
+        ):
+            NAIVE_FUNCTIONS[name] = ([param.literal for param in params], body, None)
+            return name
+        case [Operator(op=op), *raw_args]:
+            args = [evaluate_naive(arg, frame) for arg in raw_args]
+            return evalate_single_op(op, args)
+        case [head, *raw_args]:
+            params, body, parent = evaluate_naive(head, frame)
+            call_frame = dict(zip(params, [evaluate_naive(a, frame) for a in raw_args]))
+            call_frame[None] = parent
+            for form in body:
+                value = evaluate_naive(form, call_frame)
+            return value
+
+
+def peak_bytes(fn) -> int:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--n", type=int, default=1_000_000)
+    arg_parser.add_argument(
+        "--memory-sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000]
+    )
+    args = arg_parser.parse_args()
+
+    def parse(source: str) -> Expression:
+        return Parser(tokens=scan(source)).parse()
+
+    print(f"recursion limit: {sys.getrecursionlimit()}, times in µs per iteration")
+    print(
+        f"{'program':<9} {'n':>8} {'evaluate':>9} {f'dict n={N_BASELINE}':>11} "
+        f"{f'dict n={args.n}':>14} "
+        + " ".join(f"{f'KB n={size}':>10}" for size in args.memory_sizes)
+    )
+    for name, (definition, call) in PROGRAMS.items():
+        evaluate(parse(definition))
+        evaluate_naive(parse(definition), None)
+        small, large = parse(call.format(n=N_BASELINE)), parse(call.format(n=args.n))
+        assert evaluate(small) == evaluate_naive(small, None)
+
+        start = time.perf_counter()
+        evaluate(large)
+        per_iteration = (time.perf_counter() - start) / args.n
+        baseline = best_time(lambda small=small: evaluate_naive(small, None), 5)
+        try:
+            start = time.perf_counter()
+            evaluate_naive(large, None)
+            baseline_large = f"{(time.perf_counter() - start) / args.n * 1e6:.2f}"
+        except RecursionError:
+            baseline_large = "recursion"
+        peaks = [
+            peak_bytes(
+                lambda size=size, call=call: evaluate(parse(call.format(n=size)))
+            )
+            for size in args.memory_sizes
+        ]
+        print(
+            f"{name:<9} {args.n:>8} {per_iteration * 1e6:>9.2f} "
+            f"{baseline * 1e6 / N_BASELINE:>11.2f} {baseline_large:>14} "
+            + " ".join(f"{peak / 1024:>10.1f}" for peak in peaks)
+        )
+
+
+if __name__ == "__main__":
+    main()
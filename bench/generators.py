@@ -0,0 +1,87 @@
+"""
+Deterministic generators of LISP sources, for the benchmarks
+
+Each generator takes a size (and a seed when it draws at random): the same arguments
+always give the same source. Symbols and strings avoid the prefixes the scanner reads
+as keywords (`t`, `nil`, `cons`, `quote`).
+"""
+
+import random
+
+WORDS = ["apple", "banana", "cherry", "damson", "elder", "fig", "grape", "kiwi"]
+
+
+def deep_sum(depth: int) -> str:
+    "(+ 1 (+ 1 (+ 1 ... 1)))"
+    return "(+ 1 " * depth + "1" + ")" * depth
+
+
+def wide_sum(width: int) -> str:
+    "(+ 1 1 ... 1)"
+    return "(+ " + "1 " * width + ")"
+
+
+def deep_quoted_list(depth: int) -> str:
+    "'((((...))))"
+    return "'" + "(" * depth + ")" * depth
+
+
+def random_arithmetic(depth: int, width: int, rng: random.Random) -> str:
+    "Random arithmetic tree. Divisors are positive literals, so that it always evaluates"
+    if depth == 0:
+        return str(rng.randint(1, 9))
+    op = rng.choice("+-/")
+    if op == "/":
+        divisors = " ".join(str(rng.randint(1, 9)) for _ in range(width - 1))
+        return f"(/ {random_arithmetic(depth - 1, width, rng)} {divisors})"
+    args = " ".join(random_arithmetic(depth - 1, width, rng) for _ in range(width))
+    return f"({op} {args})"
+
+
+def wide_list(width: int, seed: int = 0) -> str:
+    "'(12 apple 345 banana ...): a quoted flat list of numbers and symbols"
+    rng = random.Random(seed)
+    items = [
+        rng.choice(WORDS) if rng.random() < 0.5 else str(rng.randint(0, 999))
+        for _ in range(width)
+    ]
+    return "'(" + " ".join(items) + ")"
+
+
+def arithmetic_chain(length: int, seed: int = 0) -> str:
+    "(+ (- 9 4) (/ 8 2) ...): a long chain of small arithmetic expressions"
+    rng = random.Random(seed)
+    return (
+        "(+ "
+        + " ".join(random_arithmetic(1, rng.randint(2, 4), rng) for _ in range(length))
+        + ")"
+    )
+
+
+def string_heavy(count: int, seed: int = 0) -> str:
+    '(cons "apple" \'("banana" ...)): mostly string literals'
+    rng = random.Random(seed)
+    strings = [f'"{rng.choice(WORDS)}"' for _ in range(count)]
+    return f'(cons "{rng.choice(WORDS)}" \'(' + " ".join(strings) + "))"
+
+
+def quote_heavy(count: int, seed: int = 0) -> str:
+    "(cons 'apple '('banana '(cherry) ...)): quoted symbols and lists, quoted again"
+    rng = random.Random(seed)
+    items = [
+        f"'{rng.choice(WORDS)}" if rng.random() < 0.5 else f"'({rng.choice(WORDS)})"
+        for _ in range(count)
+    ]
+    return f"(cons '{rng.choice(WORDS)} '(" + " ".join(items) + "))"
+
+
+# name -> generator of a source of the given size
+WORKLOADS = {
+    "wide_list": wide_list,
+    "wide_sum": wide_sum,
+    "deep_sum": deep_sum,
+    "deep_quoted_list": deep_quoted_list,
+    "arithmetic_chain": arithmetic_chain,
+    "string_heavy": string_heavy,
+    "quote_heavy": quote_heavy,
+}
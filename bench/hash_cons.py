@@ -0,0 +1,79 @@
+"""
+Hash-consed ASTs (`Parser(hash_cons=True)`) evaluated with `evaluate_memoized`, vs plain
+ASTs evaluated with `evaluate`: dedup ratio, memory of the AST, parse and eval times
+
+Run with: python -m bench.hash_cons [--repeat 5]
+"""
+
+import argparse
+import random
+import tracemalloc
+
+from bench.generators import random_arithmetic, wide_sum
+from bench.nesting import best_time
+from src.eval import evaluate, evaluate_memoized
+from src.parser import Parser
+from src.scanner import scan
+
+
+def repeated_big_list(copies: int) -> str:
+    "The items of lisp_snippets/big_list.lisp, summed `copies` times"
+    return "(+ " + " ".join(["(+ 2 3) (+ 2 3 4) (/ (- 7 1) (- 4 2))"] * copies) + ")"
+
+
+def ast_bytes(tokens, hash_cons: bool) -> int:
+    "Memory allocated for the AST (and the table of the shared nodes)"
+    tracemalloc.start()
+    try:
+        forms = Parser(tokens=tokens, hash_cons=hash_cons).parse_all()
+        allocated = tracemalloc.get_traced_memory()[0]  # `forms` (and the table) alive
+        del forms
+        return allocated
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    rng = random.Random(0)
+    workloads = [
+        ("big_list x 10000", repeated_big_list(10_000)),
+        ("arithmetic d=8 w=3", random_arithmetic(8, 3, rng)),
+        ("arithmetic d=12 w=2", random_arithmetic(12, 2, rng)),
+        ("wide_sum 10000", wide_sum(10_000)),
+    ]
+    print(f"times in ms (best of {args.repeat})")
+    print(
+        f"{'workload':<20} {'nodes':>8} {'unique':>8} {'dedup':>6} {'KiB':>8} {'KiB hc':>8} "
+        f"{'parse':>7} {'parse hc':>8} {'eval':>7} {'eval hc':>8} {'saved':>6}"
+    )
+    for name, source in workloads:
+        tokens = scan(source, engine="regex")
+        hc_parser = Parser(tokens=tokens, hash_cons=True)
+        (hc_ast,) = hc_parser.parse_all()
+        (ast,) = Parser(tokens=tokens).parse_all()
+        assert evaluate_memoized(hc_ast) == evaluate(ast), name
+        nodes = hc_parser.nodes
+
+        parse = best_time(
+            lambda tokens=tokens: Parser(tokens=tokens).parse_all(), args.repeat
+        )
+        parse_hc = best_time(
+            lambda tokens=tokens: Parser(tokens=tokens, hash_cons=True).parse_all(),
+            args.repeat,
+        )
+        eval_ = best_time(lambda ast=ast: evaluate(ast), args.repeat)
+        eval_hc = best_time(lambda ast=hc_ast: evaluate_memoized(ast), args.repeat)
+        print(
+            f"{name:<20} {nodes.requested:>8} {len(nodes):>8} {nodes.dedup_ratio:>5.1f}x "
+            f"{ast_bytes(tokens, False) / 1024:>8.0f} {ast_bytes(tokens, True) / 1024:>8.0f} "
+            f"{parse * 1e3:>7.2f} {parse_hc * 1e3:>8.2f} {eval_ * 1e3:>7.2f} {eval_hc * 1e3:>8.2f} "
+            f"{1 - eval_hc / eval_:>6.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
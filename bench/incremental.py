@@ -0,0 +1,73 @@
+"""
+Latency of small edits on large sources: incremental re-parse vs scanning and parsing
+the whole text again
+
+Run with: python -m bench.incremental [--edits 200]
+"""
+
+import argparse
+import random
+import time
+
+from bench.generators import arithmetic_chain, quote_heavy, string_heavy
+from src.incremental import IncrementalSource
+from src.parser import Parser
+from src.scanner import scan
+
+FULL_PARSES = 3
+
+
+def program(n_forms: int, seed: int = 0) -> str:
+    "A source of `n_forms` small top-level forms, one per line"
+    rng = random.Random(seed)
+    generators = [arithmetic_chain, quote_heavy, string_heavy]
+    return "\n".join(
+        rng.choice(generators)(rng.randint(2, 8), seed=i) for i in range(n_forms)
+    )
+
+
+def random_edits(
+    source: str, n_edits: int, rng: random.Random
+) -> list[tuple[int, int, str]]:
+    "Replace a digit by another one: the kind of edit which keeps the source valid"
+    digits = [idx for idx, char in enumerate(source) if char in "123456789"]
+    return [
+        (offset, 1, str(rng.randint(1, 9))) for offset in rng.sample(digits, n_edits)
+    ]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--edits", type=int, default=200)
+    args = arg_parser.parse_args()
+
+    print(f"time per edit in µs (mean over {args.edits} incremental edits)")
+    print(f"{'forms':>8} {'chars':>10} {'full':>12} {'incremental':>12} {'speedup':>8}")
+    rng = random.Random(0)
+    for n_forms in [100, 1_000, 10_000, 100_000]:
+        source = program(n_forms)
+        edits = random_edits(source, args.edits, rng)
+
+        # NOTE: only a few full parses, they take seconds on the largest sources
+        start = time.perf_counter()
+        for offset, deleted, inserted in edits[:FULL_PARSES]:
+            source = source[:offset] + inserted + source[offset + deleted :]
+            Parser(tokens=scan(source, engine="regex")).parse_all()
+        full = (time.perf_counter() - start) / FULL_PARSES
+
+        doc = IncrementalSource(source)
+        start = time.perf_counter()
+        for edit in edits:
+            doc.edit(*edit)
+        incremental = (time.perf_counter() - start) / len(edits)
+        assert doc.forms == Parser(tokens=scan(doc.source, engine="regex")).parse_all()
+        assert doc.stats.full_parses == 1, doc.stats  # the initial parse only
+
+        print(
+            f"{n_forms:>8} {len(source):>10} {full * 1e6:>12.1f} {incremental * 1e6:>12.1f} "
+            f"{full / incremental:>7.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
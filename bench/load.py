@@ -0,0 +1,144 @@
+"""
+Load generator for server.py: concurrent connections, each sending a request and
+waiting for its response, again and again. Reports the throughput and the latency
+percentiles seen by the clients, then the stats of the server.
+
+The requests mix small arithmetic forms, small programs (a `defun` and a loop), and a
+fraction of runaway forms (an endless loop) which the server must stop on their time
+limit without stalling the others.
+
+Without --socket, a server is started on a temporary Unix socket for the run.
+
+Run with: python -m bench.load [--socket /tmp/lisp.sock] [--connections 16]
+          [--requests 5000] [--runaway 0.001] [--jobs 4]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from server import percentiles
+
+WORKLOAD = [
+    "(+ 1 2 3)",
+    "(/ (- 7 1) 3)",
+    "(car (cdr (list 1 2 3)))",
+    "'(a b c)",
+    "(defun count (n acc) (if (= n 0 ) acc (count (- n 1) (+ acc 1)))) (count 1000 0)",
+]
+RUNAWAY = "(defun spin (n) (spin n)) (spin 1)"
+RUNAWAY_SECONDS = 0.05  # the time limit asked for the runaway forms
+
+
+async def client(
+    socket: str, n_requests: int, runaway: float, rng: random.Random
+) -> tuple[list[float], int]:
+    "The latencies of the requests of one connection, and the number of errors"
+    reader, writer = await asyncio.open_unix_connection(socket)
+    latencies, n_errors = [], 0
+    try:
+        for request_id in range(n_requests):
+            request = {"id": request_id, "source": rng.choice(WORKLOAD)}
+            if rng.random() < runaway:
+                request |= {"source": RUNAWAY, "max_seconds": RUNAWAY_SECONDS}
+            start = time.perf_counter()
+            writer.write(json.dumps(request).encode() + b"\n")
+            await writer.drain()
+            response = json.loads(await reader.readline())
+            latencies.append(time.perf_counter() - start)
+            assert response["id"] == request_id, response
+            n_errors += "error" in response
+    finally:
+        writer.close()
+    return latencies, n_errors
+
+
+async def server_stats(socket: str) -> dict:
+    reader, writer = await asyncio.open_unix_connection(socket)
+    writer.write(b'{"stats": true}\n')
+    await writer.drain()
+    stats = json.loads(await reader.readline())
+    writer.close()
+    return stats
+
+
+async def run(args: argparse.Namespace, socket: str):
+    rng = random.Random(0)
+    per_connection = args.requests // args.connections
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(
+            client(socket, per_connection, args.runaway, random.Random(rng.random()))
+            for _ in range(args.connections)
+        )
+    )
+    elapsed = time.perf_counter() - start
+
+    latencies_ms = [latency * 1e3 for latencies, _ in results for latency in latencies]
+    n_errors = sum(n_errors for _, n_errors in results)
+    print(
+        f"{len(latencies_ms)} requests ({n_errors} errors) over {args.connections} "
+        f"connections in {elapsed:.2f} s: {len(latencies_ms) / elapsed:.0f} requests/s"
+    )
+    print(
+        "client latency (ms): "
+        + " ".join(
+            f"{name}={value:.2f}"
+            for name, value in percentiles(latencies_ms, [50, 90, 99]).items()
+        )
+    )
+    print(f"server: {json.dumps(await server_stats(socket))}")
+
+
+def wait_for_socket(path: Path, server: subprocess.Popen, timeout: float = 30):
+    deadline = time.perf_counter() + timeout
+    while not path.exists():
+        if server.poll() is not None or time.perf_counter() > deadline:
+            raise RuntimeError("The server did not start")
+        time.sleep(0.05)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--socket", help="a running server (default: start one)")
+    arg_parser.add_argument("--connections", type=int, default=16)
+    arg_parser.add_argument("--requests", type=int, default=5_000)
+    arg_parser.add_argument(
+        "--runaway", type=float, default=0.001, help="fraction of endless loops"
+    )
+    arg_parser.add_argument("--jobs", type=int, default=4, help="of the server started")
+    args = arg_parser.parse_args()
+
+    if args.socket:
+        asyncio.run(run(args, args.socket))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        socket = Path(directory) / "lisp.sock"
+        server = subprocess.Popen(
+            [
+                sys.executable,
+                "server.py",
+                "--socket",
+                str(socket),
+                "--jobs",
+                str(args.jobs),
+            ],
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_for_socket(socket, server)
+            asyncio.run(run(args, str(socket)))
+        finally:
+            server.terminate()  # the server stops its workers too
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
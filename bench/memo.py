@@ -0,0 +1,84 @@
+"""
+Memoized calls of pure functions (`CallCache`) vs plain calls, at several capacities
+
+- fib: the doubly recursive Fibonacci, which repeats the same calls exponentially
+- lengths: the length of the same quoted list, 50 times (hits on the same cells)
+- count: a loop where no call repeats: the cost of the misses and evictions
+
+Run with: python -m bench.memo [--capacities 16 1024] [--repeat 3]
+"""
+
+import argparse
+
+from bench.nesting import best_time
+from src import Parser, scan
+from src.cache import CacheStats
+from src.env import CallCache, set_call_cache
+from src.eval import evaluate
+from src.parser import Expression
+
+DEFINITIONS = [
+    "(defun fib (n) (if (= n 0 ) 0 (if (= n 1) 1 (+ (fib (- n 1)) (fib (- n 2))))))",
+    "(defun length (l) (if (car l) (+ 1 (length (cdr l))) 0))",
+    "(defun lengths (l n) (if (= n 0 ) 0 (+ (length l) (lengths l (- n 1)))))",
+    "(defun count (n acc) (if (= n 0 ) acc (count (- n 1) (+ acc 1))))",
+]
+WORKLOADS = {
+    "fib 20": "(fib 20)",
+    "lengths": "(lengths '(" + "1 " * 200 + ") 50)",
+    "count": "(count 20000 0)",
+}
+
+
+def parse(source: str) -> Expression:
+    return Parser(tokens=scan(source)).parse()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--capacities", type=int, nargs="+", default=[16, 1024])
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    for definition in DEFINITIONS:
+        evaluate(parse(definition))
+
+    print(f"times in ms (best of {args.repeat}), then the counters of the last run")
+    print(
+        f"{'workload':<8} {'plain':>9} "
+        + " ".join(f"{f'memo {capacity}':>10}" for capacity in args.capacities)
+        + "  hits/misses/evictions"
+    )
+    for name, source in WORKLOADS.items():
+        expr = parse(source)
+        set_call_cache(None)
+        expected = evaluate(expr)
+        plain = best_time(lambda expr=expr: evaluate(expr), args.repeat)
+
+        times, counters = [], ""
+        for capacity in args.capacities:
+            cache = CallCache(capacity)
+
+            def memoized(expr=expr, cache=cache):
+                cache.clear()  # each run from an empty cache
+                cache.stats = CacheStats()
+                set_call_cache(cache)
+                try:
+                    return evaluate(expr)
+                finally:
+                    set_call_cache(None)
+
+            assert memoized() == expected
+            times.append(best_time(memoized, args.repeat))
+            stats = cache.stats
+            counters += f" {stats.hits}/{stats.misses}/{stats.evictions}"
+        print(
+            f"{name:<8} {plain * 1e3:>9.2f} "
+            + " ".join(f"{time * 1e3:>10.2f}" for time in times)
+            + " "
+            + counters
+        )
+
+
+if __name__ == "__main__":
+    main()
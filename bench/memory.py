@@ -0,0 +1,121 @@
+"""
+Memory used per token and per AST node, compared with the previous representation
+(plain dataclasses with a `__dict__`, one token per occurrence, atoms wrapping their token)
+and with the columnar `TokenStream`
+
+Run with: python -m bench.memory [--repeat 100000]
+"""
+
+import argparse
+import gc
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from src.parser import Atom, Expression, Operator, Parser
+from src.scanner import scan
+from src.token import LispValue, Token, TokenKind
+from src.token_stream import TokenStream
+
+
+# --- Previous representation ---
+@dataclass
+class LegacyToken:
+    kind: TokenKind
+    lexeme: str
+    literal: LispValue
+
+
+@dataclass
+class LegacyOperator:
+    op: LegacyToken
+
+
+@dataclass
+class LegacyAtom:
+    atom: LegacyToken
+
+
+def fresh_copy(lexeme: str) -> str:
+    # the previous scanner sliced every lexeme out of the source
+    return (" " + lexeme)[1:]
+
+
+def to_legacy_tokens(tokens: list[Token]) -> list[LegacyToken]:
+    return [
+        LegacyToken(kind=tok.kind, lexeme=fresh_copy(tok.lexeme), literal=tok.literal)
+        for tok in tokens
+    ]
+
+
+def to_legacy_ast(expr: Expression):
+    match expr:
+        case Atom(kind=kind, literal=literal):
+            lexeme = kind.value if literal is None else str(literal)
+            return LegacyAtom(
+                atom=LegacyToken(kind=kind, lexeme=fresh_copy(lexeme), literal=literal)
+            )
+        case Operator(op=op):
+            return LegacyOperator(
+                op=LegacyToken(kind=op.kind, lexeme=fresh_copy(op.lexeme), literal=None)
+            )
+        case sub_expr:
+            return [to_legacy_ast(item) for item in sub_expr]
+
+
+def count_nodes(expr: Expression) -> int:
+    count = 0
+    stack = [expr]
+    while stack:
+        node = stack.pop()
+        count += 1
+        if isinstance(node, list):
+            stack.extend(node)
+    return count
+
+
+def allocated_bytes(build: Callable[[], object]) -> int:
+    "Bytes still allocated by `build` once it returns (i.e., the size of its result)"
+    gc.collect()
+    tracemalloc.start()
+    result = build()  # noqa: F841, kept alive until measured
+    size, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--repeat", type=int, default=100_000)
+    args = arg_parser.parse_args()
+
+    source = (
+        "'("
+        + ' (+ 12 3.5 "abc" nil t symbol (cons 1 (quote (x y))))' * args.repeat
+        + ")"
+    )
+    tokens = scan(source, engine="regex")
+    ast = Parser(tokens=tokens).parse_iterative()
+    n_tokens = len(tokens)
+    n_nodes = count_nodes(ast)
+    print(f"{n_tokens} tokens, {n_nodes} AST nodes (lists included)")
+
+    tokens_size = allocated_bytes(lambda: scan(source, engine="regex"))
+    legacy_tokens_size = allocated_bytes(lambda: to_legacy_tokens(tokens))
+    # NOTE: the source is not counted, it is kept as is by the stream
+    stream_size = allocated_bytes(lambda: TokenStream(source))
+    ast_size = allocated_bytes(
+        lambda: Parser(tokens=scan(source, engine="regex")).parse_iterative()
+    )
+    legacy_ast_size = allocated_bytes(lambda: to_legacy_ast(ast))
+
+    print(f"{'':<8} {'bytes/token':>12} {'bytes/node':>12}")
+    print(
+        f"{'before':<8} {legacy_tokens_size / n_tokens:>12.1f} {legacy_ast_size / n_nodes:>12.1f}"
+    )
+    print(f"{'after':<8} {tokens_size / n_tokens:>12.1f} {ast_size / n_nodes:>12.1f}")
+    print(f"{'columnar':<8} {stream_size / n_tokens:>12.1f} {'':>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Recursive vs explicit-stack parser and evaluator, on deep and wide generated trees
+
+Run with: python -m bench.nesting [--max-depth 1000000]
+"""
+
+import argparse
+import gc
+import sys
+import time
+from collections.abc import Callable
+
+from bench.generators import deep_quoted_list, deep_sum, wide_sum
+from src.eval import evaluate, evaluate_iterative
+from src.parser import Parser
+from src.scanner import scan
+
+
+def best_time(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    gc.disable()  # like timeit, keep the collector out of the measure
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return best
+
+
+def time_or_recursion_error(fn: Callable[[], object], repeat: int) -> str:
+    try:
+        return f"{best_time(fn, repeat) * 1e3:10.2f}"
+    except RecursionError:
+        return f"{'recursion':>10}"
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--max-depth", type=int, default=1_000_000)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    print(
+        f"recursion limit: {sys.getrecursionlimit()}, times in ms (best of {args.repeat})"
+    )
+    print(
+        f"{'workload':<20} {'size':>9} {'parse':>10} {'parse_it':>10} {'eval':>10} {'eval_it':>10}"
+    )
+
+    sizes = [10**exp for exp in range(2, 8) if 10**exp <= args.max_depth]
+    for name, generate in [
+        ("deep_sum", deep_sum),
+        ("wide_sum", wide_sum),
+        ("deep_quoted_list", deep_quoted_list),
+    ]:
+        for size in sizes:
+            tokens = scan(generate(size), engine="regex")
+            parse = time_or_recursion_error(
+                lambda tokens=tokens: Parser(tokens=tokens).parse(), args.repeat
+            )
+            parse_it = time_or_recursion_error(
+                lambda tokens=tokens: Parser(tokens=tokens).parse_iterative(),
+                args.repeat,
+            )
+
+            ast = Parser(tokens=tokens).parse_iterative()
+            eval_ = time_or_recursion_error(lambda ast=ast: evaluate(ast), args.repeat)
+            eval_it = time_or_recursion_error(
+                lambda ast=ast: evaluate_iterative(ast), args.repeat
+            )
+            print(f"{name:<20} {size:>9} {parse} {parse_it} {eval_} {eval_it}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Arithmetic over many numeric arguments: the Python path of `evalate_single_op` vs the
+NumPy backend (`set_arithmetic_backend("numpy")`)
+
+Run with: python -m bench.numpy_backend [--repeat 20]
+"""
+
+import argparse
+import random
+
+from bench.compiled import time_per_call
+from src.eval import evalate_single_op, set_arithmetic_backend
+from src.token import SINGLETON_TOKENS, TokenKind
+
+
+def workloads(n_args: int, rng: random.Random) -> list[tuple[str, TokenKind, list]]:
+    ints = [rng.randint(1, 999) for _ in range(n_args)]
+    floats = [rng.uniform(0.5, 99.5) for _ in range(n_args)]
+    mixed = [value if idx % 2 else float(value) for idx, value in enumerate(ints)]
+    return [
+        ("+ ints", TokenKind.PLUS, ints),
+        ("+ floats (fallback)", TokenKind.PLUS, floats),
+        ("- ints", TokenKind.MINUS, ints),
+        ("- floats", TokenKind.MINUS, floats),
+        ("- mixed", TokenKind.MINUS, mixed),
+        ("/ ints", TokenKind.SLASH, ints),
+        ("/ floats", TokenKind.SLASH, floats),
+    ]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--repeat", type=int, default=20)
+    args = arg_parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"time per call in µs (mean over {args.repeat})")
+    print(f"{'workload':<22} {'args':>8} {'python':>10} {'numpy':>10} {'speedup':>8}")
+    for n_args in [10, 100, 1_000, 100_000]:
+        for name, kind, values in workloads(n_args, rng):
+            op = SINGLETON_TOKENS[kind]
+            timings = {}
+            results = {}
+            for backend in ["python", "numpy"]:
+                set_arithmetic_backend(backend)
+                results[backend] = evalate_single_op(op, values)
+                timings[backend] = time_per_call(
+                    lambda op=op, values=values: evalate_single_op(op, values),
+                    args.repeat,
+                )
+            set_arithmetic_backend("python")
+            assert repr(results["python"]) == repr(results["numpy"]), name
+            print(
+                f"{name:<22} {n_args:>8} {timings['python'] * 1e6:>10.1f} "
+                f"{timings['numpy'] * 1e6:>10.1f} {timings['python'] / timings['numpy']:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
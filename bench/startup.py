@@ -0,0 +1,63 @@
+"""
+Cold start of `main.py` on a tiny snippet, for each output format: wall time of the
+whole process, and import time as reported by `python -X importtime`
+
+Run with: python -m bench.startup [--repeat 10] [--snippet lisp_snippets/addition.lisp]
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+
+
+def wall_time(command: list[str], repeat: int) -> float:
+    "Best wall time of the process, in seconds"
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, check=True, capture_output=True)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def import_times(command: list[str]) -> dict[str, int]:
+    "Cumulative import time in µs of each top-level import, from `-X importtime`"
+    # NOTE: lazy imports (done when a function runs) are top-level imports too
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", *command],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stderr
+    times = {}
+    for line in stderr.splitlines():
+        # e.g. "import time:       285 |        612 | rich.text"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        if not name.startswith("  "):  # nested imports are indented
+            times[name.strip()] = int(cumulative_us)
+    return times
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--repeat", type=int, default=10)
+    arg_parser.add_argument("--snippet", default="lisp_snippets/addition.lisp")
+    args = arg_parser.parse_args()
+
+    print(f"{'format':<8} {'wall (ms)':>10} {'imports (ms)':>13} {'rich (ms)':>10}")
+    for output_format in ["rich", "plain", "jsonl"]:
+        command = ["main.py", f"--format={output_format}", args.snippet]
+        wall = wall_time([sys.executable, *command], args.repeat)
+        imports = import_times(command)
+        rich_us = sum(t for name, t in imports.items() if name.split(".")[0] == "rich")
+        print(
+            f"{output_format:<8} {wall * 1e3:>10.1f} {sum(imports.values()) / 1e3:>13.1f} "
+            f"{rich_us / 1e3:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
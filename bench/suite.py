@@ -0,0 +1,145 @@
+"""
+Benchmark suite: each stage (scan, parse, evaluate) timed separately on the generated
+workloads of bench/generators.py, at several sizes, with the peak memory of each stage
+
+Run with: python -m bench.suite [--output results.json] [--sizes 100 1000 10000]
+Compare two runs with: python -m bench.compare base.json new.json
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import timeit
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+
+from bench.generators import WORKLOADS
+from src.eval import evaluate, evaluate_iterative
+from src.parser import Parser
+from src.scanner import scan
+
+DEFAULT_SIZES = [100, 1_000, 10_000]
+
+
+@dataclass(slots=True)
+class StageResult:
+    workload: str
+    size: int
+    stage: str
+    loops: int  # calls per sample
+    times: list[float]  # seconds per call, one per sample
+    peak_bytes: int  # peak of the memory allocated during one call
+    error: str | None = (
+        None  # e.g. RecursionError for the recursive stages on deep trees
+    )
+
+
+def stages(source: str) -> dict[str, Callable[[], object]]:
+    "The stages to time, each one given the output of the previous stages"
+    tokens = scan(source, engine="regex")
+    ast = Parser(tokens=tokens).parse_iterative()
+    return {
+        "scan": lambda: scan(source),
+        "scan_regex": lambda: scan(source, engine="regex"),
+        "parse": lambda: Parser(tokens=tokens).parse(),
+        "parse_iterative": lambda: Parser(tokens=tokens).parse_iterative(),
+        "evaluate": lambda: evaluate(ast),
+        "evaluate_iterative": lambda: evaluate_iterative(ast),
+    }
+
+
+def time_stage(
+    fn: Callable[[], object], repeat: int, min_time: float
+) -> tuple[int, list[float]]:
+    "Like timeit: enough calls per sample to last `min_time`, best `repeat` samples kept"
+    timer = timeit.Timer(fn)  # NOTE: the collector is disabled while timing
+    loops = 1
+    while timer.timeit(loops) < min_time:
+        loops *= 10
+    return loops, [total / loops for total in timer.repeat(repeat, loops)]
+
+
+def peak_memory(fn: Callable[[], object]) -> int:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_suite(
+    sizes: list[int], repeat: int, min_time: float, workloads: list[str]
+) -> list[StageResult]:
+    results = []
+    for workload in workloads:
+        for size in sizes:
+            for stage, fn in stages(WORKLOADS[workload](size)).items():
+                try:
+                    loops, times = time_stage(fn, repeat, min_time)
+                    peak = peak_memory(fn)
+                except RecursionError as e:
+                    results.append(
+                        StageResult(workload, size, stage, 0, [], 0, type(e).__name__)
+                    )
+                    continue
+                results.append(StageResult(workload, size, stage, loops, times, peak))
+    return results
+
+
+def print_results(results: list[StageResult]):
+    print(
+        f"{'workload':<18} {'size':>7} {'stage':<20} {'median (µs)':>12} {'min (µs)':>10} {'peak (KiB)':>11}"
+    )
+    for result in results:
+        if result.error:
+            print(
+                f"{result.workload:<18} {result.size:>7} {result.stage:<20} {result.error:>12}"
+            )
+            continue
+        print(
+            f"{result.workload:<18} {result.size:>7} {result.stage:<20} "
+            f"{statistics.median(result.times) * 1e6:>12.1f} {min(result.times) * 1e6:>10.1f} "
+            f"{result.peak_bytes / 1024:>11.1f}"
+        )
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    arg_parser.add_argument(
+        "--workloads", nargs="+", choices=list(WORKLOADS), default=list(WORKLOADS)
+    )
+    arg_parser.add_argument("--repeat", type=int, default=5, help="samples per stage")
+    arg_parser.add_argument(
+        "--min-time",
+        type=float,
+        default=0.05,
+        help="minimal duration of a sample, in seconds",
+    )
+    arg_parser.add_argument("--output", help="write the results to this JSON file")
+    args = arg_parser.parse_args()
+
+    results = run_suite(args.sizes, args.repeat, args.min_time, args.workloads)
+    if args.output:
+        report = {
+            "metadata": {
+                "python": sys.version,
+                "platform": platform.platform(),
+                "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "repeat": args.repeat,
+                "min_time": args.min_time,
+            },
+            "results": [asdict(result) for result in results],
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=1)
+    print_results(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Tree-walking `evaluate` vs closures vs the bytecode VM vs transpiled Python, on
+lisp_snippets/ and on large generated arithmetic trees. Also the cost of `transpile`
+itself: the first time (generating and compiling the source), and for an expression of
+the same shape (a hit of the code cache).
+
+Run with: python -m bench.transpiled [--repeat 200] [--source]
+"""
+
+import argparse
+import random
+
+from bench.compiled import time_per_call, workloads
+from bench.generators import random_arithmetic
+from src.compiler import compile
+from src.eval import evaluate
+from src.parser import Parser
+from src.scanner import scan
+from src.transpiler import clear_code_cache, transpile, transpile_source
+from src.vm import compile_program, run
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--repeat", type=int, default=200)
+    arg_parser.add_argument(
+        "--source", action="store_true", help="print the Python source of each workload"
+    )
+    args = arg_parser.parse_args()
+
+    forms = workloads()
+    rng = random.Random(1)
+    for depth, width in [(8, 3), (14, 2)]:
+        source = random_arithmetic(depth, width, rng)
+        forms.append((f"arithmetic d={depth} w={width}", Parser(scan(source)).parse()))
+
+    print(f"time per evaluation in µs (mean over {args.repeat})")
+    print(
+        f"{'workload':<30} {'evaluate':>10} {'closures':>10} {'vm':>10} {'python':>10} "
+        f"{'speedup':>8} {'transpile':>10} {'cached':>8}"
+    )
+    for name, form in forms:
+        if args.source:
+            print(transpile_source(form))
+        clear_code_cache()
+        transpile_time = time_per_call(lambda form=form: transpile(form), 1)
+        cached_time = time_per_call(lambda form=form: transpile(form), args.repeat)
+        transpiled = transpile(form)
+        assert transpiled() == evaluate(form), name
+
+        closures = compile(form)
+        program = compile_program(form)
+        tree_walk = time_per_call(lambda form=form: evaluate(form), args.repeat)
+        closure_time = time_per_call(closures, args.repeat)
+        vm_time = time_per_call(lambda program=program: run(program), args.repeat)
+        python_time = time_per_call(transpiled, args.repeat)
+        print(
+            f"{name:<30} {tree_walk * 1e6:>10.2f} {closure_time * 1e6:>10.2f} "
+            f"{vm_time * 1e6:>10.2f} {python_time * 1e6:>10.2f} "
+            f"{tree_walk / python_time:>7.1f}x {transpile_time * 1e6:>10.0f} "
+            f"{cached_time * 1e6:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Tree-walking `evaluate` vs closures vs the bytecode VM, on lisp_snippets/ and on large
+generated arithmetic trees
+
+Run with: python -m bench.vm [--repeat 200] [--disassemble]
+"""
+
+import argparse
+import random
+
+from bench.compiled import time_per_call, workloads
+from bench.generators import random_arithmetic
+from src.compiler import compile
+from src.eval import evaluate
+from src.parser import Parser
+from src.scanner import scan
+from src.vm import compile_program, disassemble, run
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--repeat", type=int, default=200)
+    arg_parser.add_argument(
+        "--disassemble", action="store_true", help="print the bytecode of each workload"
+    )
+    args = arg_parser.parse_args()
+
+    forms = workloads()
+    rng = random.Random(1)
+    for depth, width in [(8, 3), (14, 2)]:
+        source = random_arithmetic(depth, width, rng)
+        forms.append((f"arithmetic d={depth} w={width}", Parser(scan(source)).parse()))
+
+    print(f"time per evaluation in µs (mean over {args.repeat})")
+    print(
+        f"{'workload':<30} {'nodes':>7} {'evaluate':>10} {'closures':>10} {'vm':>10} {'vm speedup':>10}"
+    )
+    for name, form in forms:
+        program = compile_program(form)
+        if args.disassemble:
+            print(disassemble(program))
+        assert run(program) == evaluate(form), name
+
+        closures = compile(form)
+        tree_walk = time_per_call(lambda form=form: evaluate(form), args.repeat)
+        closure_time = time_per_call(closures, args.repeat)
+        vm_time = time_per_call(lambda program=program: run(program), args.repeat)
+        print(
+            f"{name:<30} {len(program.code) // 2:>7} {tree_walk * 1e6:>10.2f} {closure_time * 1e6:>10.2f} "
+            f"{vm_time * 1e6:>10.2f} {tree_walk / vm_time:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
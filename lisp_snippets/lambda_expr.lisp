@@ -0,0 +1,3 @@
+(lambda (x y)
+  (+ x y))
+((lambda (x y) (+ x y)) 2 3)
@@ -0,0 +1,3 @@
+(cons 1 '(2 3))
+(car (cdr (list 1 2 3)))
+(cdr (cons 1 2))
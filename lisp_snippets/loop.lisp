@@ -0,0 +1,6 @@
+(defun count (n acc)
+  (if (= n 0 ) acc (count (- n 1) (+ acc 1))))
+(count 100000 0)
+(defun sum (n)
+  (if (= n 0 ) 0 (+ n (sum (- n 1)))))
+(sum 1000)
@@ -0,0 +1,3 @@
+(+ 2 3)
+'(a b)
+(/ (- 7 1) 3)
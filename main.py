@@ -1,34 +1,319 @@
+import argparse
+import json
+import os
 import sys
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Literal
 
-from rich import print
-
-from src import Parser, evaluate, scan
+from src import Interpreter, Parser, ProfileCollector, evaluate, scan
+from src.cache import ParseCache
+from src.cons import Cons, last_cdr
+from src.env import GLOBALS, CallCache, Closure, set_call_cache
+from src.eval import EVALUATION_ERRORS, ArithmeticBackend, set_arithmetic_backend
+from src.parser import Atom, Expression, Operator, to_lisp
+from src.token import TokenKind
 
 LISP_SNIPPET_DIR = Path("lisp_snippets")
 
+# - rich: pretty-print the source, the AST and the value of each expression
+# - plain: the value of each expression, as LISP text
+# - jsonl: one JSON object per expression evaluated
+OutputFormat = Literal["jsonl", "plain", "rich"]
 
-def process_snippet(snippet_name: str, snippet_dir: Path):
-    raw_source_text = (snippet_dir / snippet_name).read_text()
-    print(f"Source:\n{raw_source_text}")
 
-    tokens = scan(raw_source_text)
+def rich_print(*values: object):
+    # NOTE: `rich` is imported on first use only, it is by far the slowest import at startup
+    from rich import print
 
-    ast = Parser(tokens=tokens).parse()
-    print(f"Final AST for {snippet_name}:")
-    print(ast)
+    print(*values)
 
-    val = evaluate(ast)
-    print("Value:", val)
 
+def process_snippet(
+    snippet_name: str,
+    snippet_dir: Path,
+    cache: ParseCache | None = None,
+    output_format: OutputFormat = "rich",
+    interpreter: Interpreter | None = None,
+):
+    interpreter = interpreter or Interpreter()
+    snippet_path = snippet_dir / snippet_name
+    if output_format == "rich":
+        rich_print(f"Source:\n{snippet_path.read_text()}")
 
-def main():
-    if len(sys.argv) > 1:
-        snippet_path = Path(sys.argv[1])
-        process_snippet(snippet_path.name, snippet_path.parent)
+    if cache is not None:
+        # no scanning nor parsing if the source is cached
+        forms = cache.parse(snippet_path.read_text())
+        evaluate_forms(snippet_name, forms, output_format, interpreter.evaluate)
     else:
-        for snippet_path in LISP_SNIPPET_DIR.glob("*.lisp"):
-            process_snippet(snippet_path.name, LISP_SNIPPET_DIR)
+        with snippet_path.open() as f:
+            # a snippet can hold several expressions: each one is evaluated as soon as it is parsed
+            forms = interpreter.parse(interpreter.scan(f))
+            evaluate_forms(snippet_name, forms, output_format, interpreter.evaluate)
+
+
+def evaluate_forms(
+    snippet_name: str,
+    forms,
+    output_format: OutputFormat = "rich",
+    evaluate: Callable[[Expression], object] = evaluate,
+):
+    for form_idx, ast in enumerate(forms):
+        match output_format:
+            case "rich":
+                rich_print(f"Final AST for {snippet_name}:")
+                rich_print(ast)
+                rich_print("Value:", evaluate(ast))
+            case "plain":
+                print(to_lisp(evaluate(ast)))
+            case "jsonl":
+                print(json_line(snippet_name, form_idx, value=evaluate(ast)))
+
+
+def to_json(value: object) -> object:
+    "A value as JSON data: lists for the lists, and the lexeme of the operators"
+    match value:
+        case list():
+            return [to_json(item) for item in value]
+        case Cons():
+            items = [to_json(item) for item in value]
+            tail = last_cdr(value)
+            if tail is not None:
+                items += [".", to_json(tail)]  # a dotted pair, like (cons 1 2)
+            return items
+        case Operator(op=op):
+            return op.lexeme
+        case Closure():
+            return repr(value)  # e.g. "#<function count (n acc)>"
+        case Atom(kind=TokenKind.TRUE):
+            return True
+        case Atom(literal=literal):
+            return to_json(literal)
+        case _:
+            return value
+
+
+def json_line(snippet: str, form_idx: int, **fields: object) -> str:
+    return json.dumps(
+        {"snippet": snippet, "form": form_idx}
+        | {name: to_json(value) for name, value in fields.items()}
+    )
+
+
+# --- Batch mode ---
+
+
+@dataclass(slots=True)
+class SnippetResult:
+    path: str
+    values: list  # the value of each expression evaluated
+    error: str | None  # the error which stopped the snippet, if any
+    n_tokens: int | None  # None when the parsed snippet came from the cache
+    seconds: float
+
+
+_worker_cache: ParseCache | None = None
+
+
+def _init_worker(
+    cache_dir: Path | None,
+    arithmetic: ArithmeticBackend = "python",
+    memoize: int | None = None,
+):
+    global _worker_cache
+    _worker_cache = ParseCache(cache_dir) if cache_dir else None
+    set_arithmetic_backend(arithmetic)
+    set_call_cache(CallCache(memoize) if memoize else None)
+
+
+def run_snippet(path: Path) -> SnippetResult:
+    "Scan, parse and evaluate a snippet, collecting its values or its error"
+    start = time.perf_counter()
+    values: list[str] = []
+    error = None
+    n_tokens = None
+    try:
+        source = path.read_text()
+        if _worker_cache is not None:
+            forms = _worker_cache.parse(source)
+        else:
+            tokens = scan(source, engine="regex")
+            n_tokens = len(tokens)
+            forms = Parser(tokens=tokens).iter_forms()
+        for form in forms:
+            values.append(evaluate(form))
+    except (*EVALUATION_ERRORS, OSError) as e:  # a bad snippet, or a file not read
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        GLOBALS.clear()  # the functions of a snippet are not seen by the next ones
+    return SnippetResult(
+        path=str(path),
+        values=values,
+        error=error,
+        n_tokens=n_tokens,
+        seconds=time.perf_counter() - start,
+    )
+
+
+def run_corpus(
+    paths: list[Path],
+    jobs: int,
+    chunksize: int | None = None,
+    cache_dir: Path | None = None,
+    arithmetic: ArithmeticBackend = "python",
+    memoize: int | None = None,
+) -> list[SnippetResult]:
+    "Run the snippets over a pool of processes. Results are in the order of `paths`"
+    if jobs == 1:
+        _init_worker(cache_dir, arithmetic, memoize)
+        return [run_snippet(path) for path in paths]
+
+    from concurrent.futures import (
+        ProcessPoolExecutor,
+    )  # slow to import, only needed here
+
+    if chunksize is None:
+        chunksize = max(1, len(paths) // (jobs * 4))  # a few chunks per worker
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(cache_dir, arithmetic, memoize),
+    ) as executor:
+        return list(executor.map(run_snippet, paths, chunksize=chunksize))
+
+
+def report_corpus(
+    results: list[SnippetResult],
+    wall_seconds: float,
+    output_format: OutputFormat = "rich",
+):
+    for result in results:
+        if output_format == "jsonl":
+            for form_idx, value in enumerate(result.values):
+                print(json_line(result.path, form_idx, value=value))
+            if result.error:
+                print(json_line(result.path, len(result.values), error=result.error))
+            continue
+
+        outcome = (
+            f"error: {result.error}"
+            if result.error
+            else " ".join(map(to_lisp, result.values))
+        )
+        line = f"{result.path} ({result.seconds * 1e3:.2f} ms): {outcome}"
+        if output_format == "rich":
+            rich_print(line)
+        else:
+            print(line)
+
+    n_errors = sum(result.error is not None for result in results)
+    n_tokens = sum(result.n_tokens or 0 for result in results)
+    # in jsonl, the output stays one JSON object per line: the summary goes to stderr
+    print(
+        f"{len(results)} files ({n_errors} errors) in {wall_seconds:.3f} s: "
+        f"{len(results) / wall_seconds:.1f} files/s, {n_tokens / wall_seconds:.1f} tokens/s",
+        file=sys.stderr if output_format == "jsonl" else sys.stdout,
+    )
+
+
+def collect_snippets(paths: Iterable[Path]) -> list[Path]:
+    "The snippets of the given files and directories, sorted for a deterministic order"
+    snippets: list[Path] = []
+    for path in paths:
+        snippets.extend(sorted(path.rglob("*.lisp")) if path.is_dir() else [path])
+    return snippets
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Run LISP snippets")
+    arg_parser.add_argument(
+        "snippets",
+        nargs="*",
+        type=Path,
+        help=f"snippets or directories of snippets to run (default: {LISP_SNIPPET_DIR}/)",
+    )
+    arg_parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        help="cache the parsed snippets in this directory, to skip parsing on later runs",
+    )
+    arg_parser.add_argument(
+        "--format",
+        choices=["jsonl", "plain", "rich"],
+        default="rich",
+        help="output format: rich pretty-prints the ASTs, plain and jsonl only print the values",
+    )
+    arg_parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="run the snippets in parallel, printing one summary line per file",
+    )
+    arg_parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="number of worker processes in batch mode",
+    )
+    arg_parser.add_argument(
+        "--chunksize", type=int, help="files per task sent to a worker in batch mode"
+    )
+    arg_parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="report the hottest operators and forms (not in batch mode)",
+    )
+    arg_parser.add_argument(
+        "--numpy",
+        action="store_true",
+        help="vectorize the arithmetic over many arguments with NumPy (optional dependency)",
+    )
+    arg_parser.add_argument(
+        "--memoize",
+        type=int,
+        metavar="CAPACITY",
+        help="cache the values of the calls of pure functions, keeping the last CAPACITY",
+    )
+    args = arg_parser.parse_args()
+    arithmetic: ArithmeticBackend = "numpy" if args.numpy else "python"
+
+    snippets = collect_snippets(args.snippets or [LISP_SNIPPET_DIR])
+    if args.batch:
+        start = time.perf_counter()
+        results = run_corpus(
+            snippets,
+            args.jobs,
+            args.chunksize,
+            args.cache_dir,
+            arithmetic,
+            args.memoize,
+        )
+        report_corpus(results, time.perf_counter() - start, args.format)
+        return
+
+    set_arithmetic_backend(arithmetic)
+    call_cache = CallCache(args.memoize) if args.memoize else None
+    set_call_cache(call_cache)
+    cache = ParseCache(args.cache_dir) if args.cache_dir else None
+    profile = ProfileCollector() if args.profile else None
+    interpreter = Interpreter(hooks=profile)
+    for snippet_path in snippets:
+        try:
+            process_snippet(
+                snippet_path.name, snippet_path.parent, cache, args.format, interpreter
+            )
+        finally:
+            GLOBALS.clear()  # like in batch mode, each snippet is a program of its own
+
+    # in jsonl, the output stays one JSON object per line: the reports go to stderr
+    report_file = sys.stderr if args.format == "jsonl" else sys.stdout
+    if cache is not None:
+        print(f"Parse cache: {cache.stats}", file=report_file)
+    if call_cache is not None:
+        print(f"Call cache: {call_cache.stats}", file=report_file)
+    if profile is not None:
+        print(profile.report(), file=report_file)
 
 
 if __name__ == "__main__":
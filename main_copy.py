@@ -3,8 +3,6 @@ from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
 
-from rich import print
-
 
 class TokenKind(Enum):
     PLUS = "+"
@@ -31,6 +29,13 @@ class TokenKind(Enum):
 LispValue = str | int | float | bool | None
 
 
+def print(*values: object):
+    "`rich.print`, imported on first use: importing `rich` is slow"
+    from rich import print as rich_print
+
+    rich_print(*values)
+
+
 @dataclass
 class Token:
     kind: TokenKind
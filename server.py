@@ -0,0 +1,321 @@
+"""
+A long-running evaluation server: the startup (Python, the imports) is paid once, and a
+pool of worker processes scans, parses and evaluates the requests.
+
+One JSON object per line, on a Unix socket (--socket) or on TCP (--host, --port):
+- request: {"id": 1, "source": "(+ 1 2)"}, optionally with "max_steps",
+  "max_allocations" and "max_seconds" (capped by the limits of the server)
+- response: {"id": 1, "values": [3.0]} or {"id": 1, "error": "..."}, in the order
+  they complete, plus {"budget": {"resource": "steps", "limit": ..., "used": ...}}
+  when the error is a limit exceeded. A request is a whole program: its `defun`s are
+  gone after it.
+- {"id": 2, "stats": true}: the counters and the latency percentiles of the server
+
+Small requests are batched: the ones which arrive while all the workers are busy go to
+the next free worker together, one round trip for all. Each request is evaluated with
+its own budget (see src/budget.py): a runaway form is stopped after its steps, its
+allocations or its time, and the other requests of its batch go on.
+
+Run with: python server.py [--socket /tmp/lisp.sock | --port 8765] [--jobs 4]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from main import to_json
+from src import Parser, evaluate, scan
+from src.budget import Budget, BudgetExceeded
+from src.env import GLOBALS, SYMBOLS
+from src.eval import EVALUATION_ERRORS, clear_quoted_cache
+
+DEFAULT_MAX_STEPS = 10_000_000
+DEFAULT_MAX_ALLOCATIONS = 1_000_000
+DEFAULT_MAX_SECONDS = 1.0
+MAX_REQUEST_BYTES = 1024 * 1024  # longest request line
+SMALL_REQUEST_BYTES = 1024  # larger sources are not batched with others
+N_LATENCIES = 10_000  # the last latencies, for the percentiles
+
+
+# --- In the workers ---
+
+
+def _init_worker():
+    # NOTE: Ctrl-C reaches the whole process group: the server shuts the workers down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def run_batch(requests: list[tuple[str, int, int, float]]) -> list[dict]:
+    "Evaluate each (source, max steps, max allocations, max seconds), isolated"
+    return [run_request(*request) for request in requests]
+
+
+def run_request(
+    source: str, max_steps: int, max_allocations: int, max_seconds: float
+) -> dict:
+    try:
+        with Budget(max_steps, max_seconds, max_allocations):
+            forms = Parser(tokens=scan(source, engine="regex")).iter_forms()
+            return {"values": [to_json(evaluate(form)) for form in forms]}
+    except BudgetExceeded as e:
+        return {"error": f"{type(e).__name__}: {e}", "budget": e.to_json()}
+    except (*EVALUATION_ERRORS, MemoryError) as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+    finally:
+        # nothing left for the next request: its functions, its symbols, its quoted
+        # lists (the memory of a worker does not grow with the requests it served)
+        GLOBALS.clear()
+        SYMBOLS.clear()
+        clear_quoted_cache()
+
+
+# --- In the server ---
+
+
+@dataclass(slots=True)
+class _Pending:
+    source: str
+    max_steps: int
+    max_allocations: int
+    max_seconds: float
+    result: asyncio.Future
+
+
+def percentiles(values: list[float], ranks: list[int]) -> dict[str, float]:
+    "Nearest-rank percentiles (and the max) of the values, e.g. {'p50': ..., 'max': ...}"
+    if not values:
+        return {}
+    values = sorted(values)
+    return {
+        f"p{rank}": values[min(len(values) - 1, len(values) * rank // 100)]
+        for rank in ranks
+    } | {"max": values[-1]}
+
+
+class EvalServer:
+    def __init__(
+        self,
+        jobs: int,
+        max_batch: int = 32,
+        max_steps: int = DEFAULT_MAX_STEPS,
+        max_allocations: int = DEFAULT_MAX_ALLOCATIONS,
+        max_seconds: float = DEFAULT_MAX_SECONDS,
+    ):
+        self.jobs = jobs
+        self.max_batch = max_batch
+        self.max_steps = max_steps
+        self.max_allocations = max_allocations
+        self.max_seconds = max_seconds
+        self.pool = ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker)
+        self.queue: asyncio.Queue[_Pending] = asyncio.Queue()
+        self.latencies: deque[float] = deque(maxlen=N_LATENCIES)  # in seconds
+        self.n_requests = 0
+        self.n_errors = 0
+        self.n_batches = 0
+        self._held: _Pending | None = None  # a large request, for the next batch
+
+    async def start_workers(self):
+        "Start the worker processes now, not on the first requests"
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *(loop.run_in_executor(self.pool, run_batch, []) for _ in range(self.jobs))
+        )
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        "A connection: its requests are answered concurrently"
+        tasks: set[asyncio.Task] = set()
+        try:
+            while line := await reader.readline():
+                task = asyncio.create_task(
+                    self._respond(line, time.perf_counter(), writer)
+                )
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+        except (ValueError, ConnectionError):
+            pass  # a request line over the limit, or the client went away
+        finally:
+            writer.close()
+
+    async def _respond(self, line: bytes, start: float, writer: asyncio.StreamWriter):
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            request, response = {}, {"error": f"Invalid JSON: {e}"}
+        else:
+            response = await self._answer(request)
+        if isinstance(request, dict) and "id" in request:
+            response = {"id": request["id"]} | response
+        writer.write(json.dumps(response).encode() + b"\n")
+        await writer.drain()
+        self.latencies.append(time.perf_counter() - start)
+
+    async def _answer(self, request: object) -> dict:
+        if isinstance(request, dict) and request.get("stats"):
+            return self.stats()
+        if not isinstance(request, dict) or not isinstance(request.get("source"), str):
+            self.n_errors += 1
+            return {"error": 'Invalid request: should be {"source": "..."}'}
+
+        max_steps = request.get("max_steps", self.max_steps)
+        max_allocations = request.get("max_allocations", self.max_allocations)
+        max_seconds = request.get("max_seconds", self.max_seconds)
+        if not (
+            isinstance(max_steps, int)
+            and isinstance(max_allocations, int)
+            and isinstance(max_seconds, int | float)
+        ):
+            self.n_errors += 1
+            return {"error": "Invalid request: the limits should be numbers"}
+
+        self.n_requests += 1
+        pending = _Pending(
+            request["source"],
+            min(max_steps, self.max_steps),
+            min(max_allocations, self.max_allocations),
+            min(max_seconds, self.max_seconds),
+            asyncio.get_running_loop().create_future(),
+        )
+        self.queue.put_nowait(pending)
+        response = await pending.result
+        self.n_errors += "error" in response
+        return response
+
+    async def dispatch(self):
+        "Send the requests to the workers, in batches, one batch per free worker"
+        free_workers = asyncio.Semaphore(self.jobs)
+        tasks: set[asyncio.Task] = set()
+        while True:
+            await free_workers.acquire()
+            batch = [await self._next()]
+            # the requests which arrived while the workers were busy go together
+            small = len(batch[0].source) <= SMALL_REQUEST_BYTES
+            while small and len(batch) < self.max_batch and not self.queue.empty():
+                pending = self.queue.get_nowait()
+                if len(pending.source) > SMALL_REQUEST_BYTES:
+                    self._held = pending
+                    break
+                batch.append(pending)
+            task = asyncio.create_task(self._run(batch, free_workers))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+    async def _next(self) -> _Pending:
+        if self._held is not None:
+            pending, self._held = self._held, None
+            return pending
+        return await self.queue.get()
+
+    async def _run(self, batch: list[_Pending], free_workers: asyncio.Semaphore):
+        self.n_batches += 1
+        requests = [
+            (p.source, p.max_steps, p.max_allocations, p.max_seconds) for p in batch
+        ]
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self.pool, run_batch, requests
+            )
+        except Exception as e:  # noqa: BLE001
+            # e.g. a worker killed, or a bug of the interpreter: each request of the
+            # batch must get a response all the same, or its client waits forever
+            results = [{"error": f"{type(e).__name__}: {e}"}] * len(batch)
+        finally:
+            free_workers.release()
+        for pending, result in zip(batch, results):
+            pending.result.set_result(result)
+
+    def stats(self) -> dict:
+        latencies_ms = [latency * 1e3 for latency in self.latencies]
+        return {
+            "requests": self.n_requests,
+            "errors": self.n_errors,
+            "batches": self.n_batches,
+            "mean_batch": round(self.n_requests / max(self.n_batches, 1), 2),
+            "latency_ms": {
+                name: round(latency, 3)
+                for name, latency in percentiles(latencies_ms, [50, 90, 99]).items()
+            },
+        }
+
+
+async def serve(args: argparse.Namespace):
+    server = EvalServer(
+        args.jobs,
+        args.max_batch,
+        args.max_steps,
+        args.max_allocations,
+        args.max_seconds,
+    )
+    await server.start_workers()
+    dispatcher = asyncio.create_task(server.dispatch())
+    if args.socket:
+        listener = await asyncio.start_unix_server(
+            server.handle, path=args.socket, limit=MAX_REQUEST_BYTES
+        )
+        address = args.socket
+    else:
+        listener = await asyncio.start_server(
+            server.handle, args.host, args.port, limit=MAX_REQUEST_BYTES
+        )
+        address = f"{args.host}:{args.port}"
+    print(f"listening on {address} with {args.jobs} workers", file=sys.stderr)
+    stop = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        asyncio.get_running_loop().add_signal_handler(signum, stop.set)
+    try:
+        async with listener:
+            await stop.wait()
+    finally:
+        dispatcher.cancel()
+        server.pool.shutdown(cancel_futures=True)
+        print(json.dumps(server.stats()), file=sys.stderr)
+        if args.socket:
+            Path(args.socket).unlink(missing_ok=True)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Serve LISP evaluations")
+    arg_parser.add_argument("--socket", help="path of a Unix socket to listen on")
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8765)
+    arg_parser.add_argument(
+        "--jobs", type=int, default=os.cpu_count() or 1, help="worker processes"
+    )
+    arg_parser.add_argument(
+        "--max-batch",
+        type=int,
+        default=32,
+        help="most requests sent to a worker at once",
+    )
+    arg_parser.add_argument(
+        "--max-steps",
+        type=int,
+        default=DEFAULT_MAX_STEPS,
+        help="most steps per request (see src/budget.py)",
+    )
+    arg_parser.add_argument(
+        "--max-allocations",
+        type=int,
+        default=DEFAULT_MAX_ALLOCATIONS,
+        help="most cons cells, frames and closures per request",
+    )
+    arg_parser.add_argument(
+        "--max-seconds",
+        type=float,
+        default=DEFAULT_MAX_SECONDS,
+        help="most evaluation time per request",
+    )
+    args = arg_parser.parse_args()
+    asyncio.run(serve(args))  # until SIGINT or SIGTERM
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,26 @@
-from .eval import evaluate
+from .batch import evaluate_batch
+from .env import evaluate_resolved, resolve
+from .eval import evaluate, evaluate_iterative, evaluate_memoized
+from .hooks import Hooks, ProfileCollector
+from .incremental import IncrementalSource
+from .interpreter import Interpreter
 from .parser import Parser
-from .scanner import scan
+from .scanner import iter_tokens, scan
+from .token_stream import TokenStream
 
-__all__ = ["evaluate", "Parser", "scan"]
+__all__ = [
+    "evaluate",
+    "evaluate_batch",
+    "evaluate_iterative",
+    "evaluate_memoized",
+    "evaluate_resolved",
+    "Hooks",
+    "IncrementalSource",
+    "Interpreter",
+    "iter_tokens",
+    "Parser",
+    "ProfileCollector",
+    "resolve",
+    "scan",
+    "TokenStream",
+]
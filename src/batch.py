@@ -0,0 +1,182 @@
+import operator
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+from itertools import repeat
+
+from .env import GLOBALS, Frame, Scope, evaluate_resolved, resolve
+from .eval import EVALUATION_ERRORS, evalate_single_op, evaluate
+from .parser import SPECIAL_FORM_TOKEN_KINDS, Atom, Expression, Operator
+from .token import LispValue, Token, TokenKind
+
+# a column of values, one per row
+Column = list
+
+
+@dataclass(slots=True)
+class _Scalar:
+    "Value of an expression which does not depend on the columns: the same for every row"
+
+    value: LispValue | list
+
+
+@dataclass(slots=True)
+class _Column:
+    values: Column
+    numeric: bool  # whether all the values are known to be numbers
+
+
+_NUMBER_TYPES = {int, float}  # what the arithmetic operators accept (not bools)
+
+
+def evaluate_batch(
+    expresssion: Expression, columns: Mapping[str, Sequence[LispValue]]
+) -> Column:
+    """
+    The value of the expression for each row of `columns` (name -> values, all of the
+    same length): a `SYMBOL` atom named like a column takes its value in the row, the
+    other atoms are the same as with `evaluate`.
+
+    The tree is walked once for the whole batch, not once per row: each node computes
+    the column of its values from the columns of its arguments, with the operators
+    mapped over the rows at C speed. The values (and their types) are the ones of
+    `evaluate` on each row: the arithmetic goes through the same Python operations, in
+    the same order. The special forms and the function calls on columns (e.g.
+    `(if x y 0)`) are run by env.py once per row, with the columns as variables. When
+    a node may raise (e.g. non-numbers, zero divisors), it is
+    applied row by row with `evalate_single_op`. On an error, the rows are evaluated
+    again one by one, so that the error raised is the one of `evaluate` on the first
+    failing row (and not e.g. the one of a later row, in an earlier argument).
+    """
+    lengths = {len(values) for values in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError(f"Columns should all have the same length, got: {lengths}")
+    n_rows = lengths.pop() if lengths else 0
+
+    bound: dict[str, _Column] = {}
+    for name, values in columns.items():
+        # NOTE: `tolist` turns arrays (array.array, numpy) into Python numbers
+        values = values.tolist() if hasattr(values, "tolist") else list(values)
+        bound[name] = _Column(values, set(map(type, values)) <= _NUMBER_TYPES)
+
+    try:
+        result = _visit(expresssion, bound)
+    except EVALUATION_ERRORS:
+        for row in range(n_rows):
+            row_bound = {
+                name: _Column(column.values[row : row + 1], column.numeric)
+                for name, column in bound.items()
+            }
+            _visit(expresssion, row_bound)  # raises for the first failing row
+        raise
+    if type(result) is _Scalar:
+        return [result.value] * n_rows
+    return list(result.values)  # NOTE: a copy, the result may be a column given
+
+
+def _visit(expr: Expression, bound: dict[str, _Column]) -> _Column | _Scalar:
+    match expr:
+        case Atom(kind=TokenKind.SYMBOL, literal=name) if name in bound:
+            return bound[name]
+        case [Operator(op=op), *raw_args] if op.kind not in SPECIAL_FORM_TOKEN_KINDS:
+            args = [_visit(arg, bound) for arg in raw_args]
+            if all(type(arg) is _Scalar for arg in args):
+                return _Scalar(evalate_single_op(op, [arg.value for arg in args]))
+            return _apply(op, args)
+        case _ if _uses_columns(expr, bound):
+            return _per_row(expr, bound)
+        case _:
+            # other atoms, special forms, function calls, and malformed forms
+            return _Scalar(evaluate(expr))
+
+
+def _uses_columns(expr: Expression, bound: dict[str, _Column]) -> bool:
+    "Whether a symbol of the expression is named like a column. Explicit stack: any depth"
+    todo = [expr]
+    while todo:
+        item = todo.pop()
+        if type(item) is list:
+            todo.extend(item)
+        elif (
+            type(item) is Atom
+            and item.kind == TokenKind.SYMBOL
+            and item.literal in bound
+        ):
+            return True
+    return False
+
+
+def _per_row(expr: Expression, bound: dict[str, _Column]) -> _Column:
+    """
+    Special forms and function calls over the columns: the columns are the variables of
+    a scope (see env.py), and the expression is run once per row, with a frame of the row
+    """
+    names = list(bound)
+    resolved = resolve(expr, Scope.of(names))
+    values = [
+        evaluate_resolved(resolved, Frame(list(row)), GLOBALS)
+        for row in zip(*(bound[name].values for name in names))
+    ]
+    return _Column(values, set(map(type, values)) <= _NUMBER_TYPES)
+
+
+def _apply(op: Token, args: list[_Column | _Scalar]) -> _Column:
+    "The operator applied to each row of its arguments (at least one is a column)"
+    kernel = _COLUMN_KERNELS.get(op.kind)
+    if (
+        kernel is not None
+        and all(map(_is_numeric, args))
+        and (op.kind != TokenKind.SLASH or not any(map(_has_zero, args[1:])))
+    ):
+        return _Column(kernel(list(map(_iter, args))), numeric=True)
+    # cons, and the rows which may raise: same checks (and errors) as `evaluate`
+    values = [evalate_single_op(op, list(row)) for row in zip(*map(_iter, args))]
+    return _Column(values, numeric=op.kind in _COLUMN_KERNELS)
+
+
+def _is_numeric(arg: _Column | _Scalar) -> bool:
+    if type(arg) is _Scalar:
+        return type(arg.value) in _NUMBER_TYPES
+    return arg.numeric
+
+
+def _has_zero(arg: _Column | _Scalar) -> bool:
+    if type(arg) is _Scalar:
+        return arg.value == 0
+    return 0 in arg.values  # NOTE: `==`, like the check of `/`: 0.0 too
+
+
+def _iter(arg: _Column | _Scalar):
+    # a scalar is repeated for every row: `map` and `zip` stop at the end of the columns
+    return repeat(arg.value) if type(arg) is _Scalar else arg.values
+
+
+def _plus(args: list) -> Column:
+    # `sum` of the floats of each row, like `evaluate`
+    floats = [map(float, arg) for arg in args]
+    return list(map(sum, zip(*floats)))
+
+
+def _minus(args: list) -> Column:
+    first, *terms = args
+    if not terms:
+        return list(first)
+    for term in terms:
+        first = map(operator.sub, first, term)
+    return list(first)
+
+
+def _slash(args: list) -> Column:
+    first, *divisors = args
+    if not divisors:
+        return list(first)
+    for divisor in divisors:
+        first = map(operator.truediv, first, divisor)
+    return list(first)
+
+
+# arithmetic over columns of numbers (and divisors without zeros): no checks per row
+_COLUMN_KERNELS = {
+    TokenKind.PLUS: _plus,
+    TokenKind.MINUS: _minus,
+    TokenKind.SLASH: _slash,
+}
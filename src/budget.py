@@ -0,0 +1,127 @@
+"""
+Limits of an evaluation, for forms which may not terminate or may build huge data: a
+number of steps, a number of allocations, and a time limit.
+
+- a step: each application of an operator counts one, plus one per argument (so a
+  flat `(+ 1 1 ... 1)` is not a single step); a function call, a `lambda` or a `defun`
+  counts one
+- an allocation: a cons cell (one per `cons`, n per `list` of n items, one per cell of
+  a quoted list at each evaluation, even though its cells are shared), a frame of a
+  function call, a closure
+
+The engines add to the counters as they go (`Budget.charge`), which is two additions.
+The limits are compared on each charge, but the clock is only read every
+`CHECK_INTERVAL` steps. The evaluator of env.py also counts its function calls locally,
+and only charges them every `CHECK_INTERVAL` calls: the limits are enforced to this
+precision.
+
+    with Budget(max_steps=10_000, max_allocations=1_000):
+        evaluate(expression)  # or raises BudgetExceeded
+"""
+
+from time import perf_counter
+from typing import Self
+
+# steps between two checks of the clock
+CHECK_INTERVAL = 1024
+
+
+_LIMIT_NAMES = {"steps": "Step", "allocations": "Allocation", "seconds": "Time"}
+
+
+class BudgetExceeded(Exception):
+    "An evaluation went over one of its limits: `resource` is the limit exceeded"
+
+    def __init__(self, resource: str, limit: float, used: float):
+        super().__init__(resource, limit, used)  # NOTE: so that it pickles
+        self.resource = resource  # "steps", "allocations" or "seconds"
+        self.limit = limit
+        self.used = used
+
+    def __str__(self) -> str:
+        name = _LIMIT_NAMES[self.resource]
+        return f"{name} limit exceeded: used {self.used}, the limit is {self.limit}"
+
+    def to_json(self) -> dict:
+        return {"resource": self.resource, "limit": self.limit, "used": self.used}
+
+
+class Budget:
+    """
+    The limits of an evaluation (None: no limit), and what was charged so far.
+    The time limit runs from the creation of the budget.
+    """
+
+    __slots__ = (
+        "_allocation_limit",
+        "_next_check",
+        "_previous",
+        "allocations",
+        "deadline",
+        "max_allocations",
+        "max_seconds",
+        "max_steps",
+        "steps",
+    )
+
+    def __init__(
+        self,
+        max_steps: int | None = None,
+        max_seconds: float | None = None,
+        max_allocations: int | None = None,
+    ):
+        self.max_steps = max_steps
+        self.max_seconds = max_seconds
+        self.max_allocations = max_allocations
+        self.deadline = None if max_seconds is None else perf_counter() + max_seconds
+        self.steps = 0
+        self.allocations = 0
+        self._allocation_limit = (
+            float("inf") if max_allocations is None else max_allocations
+        )
+        self._next_check = 0  # the steps at which to check the limits and the clock
+        self._previous: Budget | None = None
+
+    def charge(self, steps: int, allocations: int = 0):
+        self.steps += steps
+        self.allocations += allocations
+        if self.steps >= self._next_check or self.allocations > self._allocation_limit:
+            self.check()
+
+    def check(self):
+        "Raise BudgetExceeded if over a limit"
+        if self.max_steps is not None and self.steps > self.max_steps:
+            raise BudgetExceeded("steps", self.max_steps, self.steps)
+        if self.allocations > self._allocation_limit:
+            raise BudgetExceeded("allocations", self.max_allocations, self.allocations)
+        if self.deadline is not None and (now := perf_counter()) > self.deadline:
+            elapsed = self.max_seconds + now - self.deadline
+            raise BudgetExceeded("seconds", self.max_seconds, round(elapsed, 3))
+        self._next_check = self.steps + CHECK_INTERVAL
+        if self.max_steps is not None:
+            # NOTE: the step limit is exact, whatever the interval
+            self._next_check = min(self._next_check, self.max_steps + 1)
+
+    def __enter__(self) -> Self:
+        "The evaluations of the `with` block are charged to this budget"
+        self._previous = current_budget()
+        set_budget(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        set_budget(self._previous)
+        self._previous = None
+
+
+# the budget of the evaluations, when limited (see `set_budget`)
+_active: Budget | None = None
+
+
+def set_budget(budget: Budget | None):
+    "Charge the evaluations to `budget` from now on (None: no limits)"
+    global _active
+    _active = budget
+
+
+def current_budget() -> Budget | None:
+    return _active
@@ -0,0 +1,253 @@
+import hashlib
+import marshal
+import os
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+from .parser import OPERATORS, SINGLETON_ATOMS, Atom, Expression, Operator, Parser
+from .scanner import scan
+from .token import SINGLETON_TOKENS, TokenKind
+from .vm import Opcode, Program, compile_program
+
+# part of the cache keys: bump it when the AST or the bytecode change, to invalidate the caches
+INTERPRETER_VERSION = "0.1.0"
+CACHE_FORMAT_VERSION = 4
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+_ALL_KINDS: list[TokenKind] = list(TokenKind)
+_KIND_CODES: dict[TokenKind, int] = {kind: code for code, kind in enumerate(_ALL_KINDS)}
+
+
+@dataclass(slots=True)
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+class ParseCache:
+    """
+    On-disk cache of the parsed expressions (and their bytecode) of source texts.
+
+    Entries are keyed by a hash of the source text and of the interpreter version, so a
+    hit skips `scan` and `Parser` entirely. The cache is bounded to `max_bytes`: the least
+    recently used entries are evicted first.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._entries: OrderedDict[str, int] | None = None  # key -> size, oldest first
+        self._total_bytes = 0
+
+    def parse(self, source: str) -> list[Expression]:
+        "The expressions of the source, from the cache if possible"
+        entry = self._load(source)
+        if entry is not None:
+            return entry[0]
+
+        forms = Parser(tokens=scan(source, engine="regex")).parse_all()
+        self._store(source, forms, None)
+        return forms
+
+    def compile(self, source: str) -> tuple[list[Expression], list[Program]]:
+        "The expressions of the source and their bytecode, from the cache if possible"
+        entry = self._load(source)
+        if entry is not None and entry[1] is not None:
+            return entry[0], entry[1]
+
+        forms = (
+            entry[0]
+            if entry is not None
+            else Parser(tokens=scan(source, engine="regex")).parse_all()
+        )
+        programs = [compile_program(form) for form in forms]
+        self._store(source, forms, programs)
+        return forms, programs
+
+    def key(self, source: str) -> str:
+        version = f"{INTERPRETER_VERSION}/{CACHE_FORMAT_VERSION}\0"
+        return hashlib.sha256((version + source).encode()).hexdigest()
+
+    def clear(self):
+        for key in list(self._index()):
+            self._remove(key)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.bin"
+
+    def _index(self) -> OrderedDict[str, int]:
+        "Entries on disk, from the least to the most recently used (loaded on first use)"
+        if self._entries is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            files = [
+                (
+                    entry.stat().st_mtime_ns,
+                    entry.name.removesuffix(".bin"),
+                    entry.stat().st_size,
+                )
+                for entry in os.scandir(self.directory)
+                if entry.name.endswith(".bin")
+            ]
+            self._entries = OrderedDict(
+                (key, size) for _mtime, key, size in sorted(files)
+            )
+            self._total_bytes = sum(self._entries.values())
+        return self._entries
+
+    def _load(
+        self, source: str
+    ) -> tuple[list[Expression], list[Program] | None] | None:
+        key = self.key(source)
+        entries = self._index()
+        if key in entries:
+            try:
+                data = self._path(key).read_bytes()
+                entry = _decode_entry(marshal.loads(data))
+            except (OSError, ValueError, EOFError, TypeError, KeyError, IndexError):
+                self._remove(key)  # gone or corrupted: treat as a miss
+            else:
+                self.stats.hits += 1
+                entries.move_to_end(key)
+                os.utime(self._path(key))  # recency survives across runs (see `_index`)
+                return entry
+
+        self.stats.misses += 1
+        return None
+
+    def _store(
+        self, source: str, forms: list[Expression], programs: list[Program] | None
+    ):
+        key = self.key(source)
+        data = marshal.dumps(_encode_entry(forms, programs))
+
+        entries = self._index()
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".tmp{os.getpid()}")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)  # atomic, for concurrent runs
+
+        self._total_bytes += len(data) - entries.pop(key, 0)
+        entries[key] = len(data)
+        while self._total_bytes > self.max_bytes and len(entries) > 1:
+            oldest = next(iter(entries))
+            self._remove(oldest)
+            self.stats.evictions += 1
+
+    def _remove(self, key: str):
+        self._total_bytes -= self._index().pop(key, 0)
+        self._path(key).unlink(missing_ok=True)
+
+
+# --- Serialization ---
+# Expressions are flattened in post-order, so that any depth can be encoded:
+# an atom is a (kind code, literal) tuple, an operator is its kind code, and a list
+# is the negative int -(number of items + 1), placed right after its items.
+
+
+def encode_expression(expression: Expression) -> list:
+    encoded: list = []
+    todo: list[tuple[Expression, bool]] = [(expression, False)]
+    while todo:
+        expr, items_done = todo.pop()
+        match expr:
+            case Atom(kind=kind, literal=literal):
+                encoded.append((_KIND_CODES[kind], literal))
+            case Operator(op=op):
+                encoded.append(_KIND_CODES[op.kind])
+            case _ if items_done:
+                encoded.append(-(len(expr) + 1))
+            case _:
+                todo.append((expr, True))
+                todo.extend((item, False) for item in reversed(expr))
+    return encoded
+
+
+def decode_expression(encoded: list) -> Expression:
+    stack: list[Expression] = []
+    for item in encoded:
+        if isinstance(item, tuple):
+            kind_code, literal = item
+            kind = _ALL_KINDS[kind_code]
+            stack.append(SINGLETON_ATOMS.get(kind) or Atom(kind=kind, literal=literal))
+        elif item >= 0:
+            stack.append(OPERATORS[_ALL_KINDS[item]])
+        else:
+            n_items = -item - 1
+            items = stack[len(stack) - n_items :]
+            del stack[len(stack) - n_items :]
+            stack.append(items)
+    (expression,) = stack
+    return expression
+
+
+_CONSTANT_OPCODES = {
+    Opcode.PUSH_CONST,
+    Opcode.QUOTE_CONST,
+    Opcode.CALL,
+    Opcode.EVAL_CONST,
+}
+
+
+def _constant_opcodes(code: array) -> dict[int, int]:
+    "Opcode of the instruction using each constant, which tells what the constant holds"
+    return {
+        code[pc + 1]: code[pc]
+        for pc in range(0, len(code), 2)
+        if code[pc] in _CONSTANT_OPCODES
+    }
+
+
+def _encode_program(program: Program) -> tuple[bytes, list]:
+    constant_opcodes = _constant_opcodes(program.code)
+    constants = []
+    for idx, constant in enumerate(program.constants):
+        match constant_opcodes[idx]:
+            case Opcode.QUOTE_CONST | Opcode.EVAL_CONST:
+                constants.append(encode_expression(constant))
+            case Opcode.CALL:
+                op, n_args = constant
+                constants.append((_KIND_CODES[op.kind], n_args))
+            case _:
+                constants.append(constant)
+    return program.code.tobytes(), constants
+
+
+def _decode_program(encoded: tuple[bytes, list]) -> Program:
+    code_bytes, encoded_constants = encoded
+    code = array("i")
+    code.frombytes(code_bytes)
+    constant_opcodes = _constant_opcodes(code)
+
+    constants: list = []
+    for idx, constant in enumerate(encoded_constants):
+        match constant_opcodes[idx]:
+            case Opcode.QUOTE_CONST | Opcode.EVAL_CONST:
+                constants.append(decode_expression(constant))
+            case Opcode.CALL:
+                kind_code, n_args = constant
+                constants.append((SINGLETON_TOKENS[_ALL_KINDS[kind_code]], n_args))
+            case _:
+                constants.append(constant)
+    return Program(code=code, constants=constants)
+
+
+def _encode_entry(forms: list[Expression], programs: list[Program] | None) -> tuple:
+    return (
+        [encode_expression(form) for form in forms],
+        None if programs is None else [_encode_program(p) for p in programs],
+    )
+
+
+def _decode_entry(
+    encoded: tuple,
+) -> tuple[list[Expression], list[Program] | None]:
+    encoded_forms, encoded_programs = encoded
+    forms = [decode_expression(form) for form in encoded_forms]
+    if encoded_programs is None:
+        return forms, None
+    return forms, [_decode_program(program) for program in encoded_programs]
@@ -0,0 +1,141 @@
+from collections.abc import Callable
+
+from .budget import current_budget
+from .cons import Cons
+from .eval import evalate_single_op, evaluate, quoted_cells
+from .parser import SPECIAL_FORM_TOKEN_KINDS, Atom, Expression, Operator
+from .token import SINGLETON_TOKENS, LispValue, TokenKind
+
+# a compiled expression: calling it evaluates the expression
+Compiled = Callable[[], LispValue | list]
+
+ARITHMETIC_TOKEN_KINDS = {TokenKind.PLUS, TokenKind.MINUS, TokenKind.SLASH}
+
+
+def compile(expression: Expression) -> Compiled:
+    """
+    Turn an expression into nested Python closures, once, so that it can be evaluated
+    many times without re-walking the AST.
+
+    Calling the result gives the same value as `evaluate(expression)`, and raises the same
+    errors at the same point. Operator dispatch and arity checks are resolved here, and
+    the type checks of the arithmetic operators are skipped when the arguments are known
+    to be numbers (number literals, or results of arithmetic operators).
+
+    The steps and allocations of the operators run without `evalate_single_op` (the
+    arithmetic on numbers, `cons`, the quotes) are counted here, and charged to the budget at once
+    when the compiled expression is called (see budget.py): the other operators charge
+    theirs as they run.
+    """
+    cost = [0, 0]  # steps, allocations
+    compiled = _compile(expression, cost)
+    steps, allocations = cost
+    if not steps and not allocations:
+        return compiled
+
+    def budgeted() -> LispValue | list:
+        budget = current_budget()
+        if budget is not None:
+            budget.charge(steps, allocations)
+        return compiled()
+
+    return budgeted
+
+
+def _compile(expression: Expression, cost: list[int]) -> Compiled:
+    "Adds the cost of the operators it compiles to fast paths to `cost`"
+    match expression:
+        case Atom(kind=TokenKind.SYMBOL):
+            return _deferred(expression)  # looked up at each call: its value may change
+        case Atom(literal=literal):
+            return lambda: literal
+        case Operator():
+            return _deferred(expression)
+        case sub_expr:
+            if not sub_expr or not isinstance(sub_expr[0], Operator):
+                return _deferred(sub_expr)  # malformed list: let `evaluate` raise
+
+            op = sub_expr[0].op
+            if op.kind == TokenKind.QUOTE:
+                if len(sub_expr) != 2:
+                    return _deferred(sub_expr)
+                # NOTE: converted once: cells are never mutated, so they can be shared.
+                # Still charged at each call, like `evaluate` does
+                quoted, n_cells = quoted_cells(sub_expr[1])
+                cost[1] += n_cells
+                return lambda: quoted
+            if op.kind in SPECIAL_FORM_TOKEN_KINDS:
+                return _deferred(sub_expr)  # lambda, if, defun: run by `evaluate`
+
+            raw_args = sub_expr[1:]
+            args_fns = [_compile(arg, cost) for arg in raw_args]
+            if op.kind in ARITHMETIC_TOKEN_KINDS and all(map(returns_number, raw_args)):
+                if args_fns:  # NOTE: without arguments, `evalate_single_op` charges
+                    cost[0] += len(args_fns) + 1
+                return _compile_arithmetic(op.kind, args_fns)
+            elif op.kind == TokenKind.CONS and len(args_fns) == 2:
+                car_fn, cdr_fn = args_fns
+                cost[0] += 3
+                cost[1] += 1
+                return lambda: Cons(car_fn(), cdr_fn())
+
+            # generic call, with the checks done at each evaluation
+            return lambda: evalate_single_op(op, [fn() for fn in args_fns])
+
+
+def _deferred(expression: Expression) -> Compiled:
+    # forms the compiler does not handle itself (typically because evaluating them raises)
+    return lambda: evaluate(expression)
+
+
+def returns_number(expression: Expression) -> bool:
+    "Whether the value of the expression is a number (whenever its evaluation succeeds)"
+    match expression:
+        case Atom(kind=kind):
+            return kind == TokenKind.NUMBER
+        case [Operator(op=op), *_]:
+            return op.kind in ARITHMETIC_TOKEN_KINDS
+        case _:
+            return False
+
+
+def _compile_arithmetic(kind: TokenKind, args_fns: list[Compiled]) -> Compiled:
+    "Arithmetic operator over arguments known to be numbers: no type checks needed"
+    if not args_fns:
+        return lambda: evalate_single_op(SINGLETON_TOKENS[kind], [])
+
+    match kind:
+        case TokenKind.PLUS:
+            # NOTE: always through `sum`, to keep its exact float semantics
+            return lambda: sum([float(fn()) for fn in args_fns])
+        case TokenKind.MINUS:
+            if len(args_fns) == 1:
+                return args_fns[0]
+            elif len(args_fns) == 2:
+                first_fn, second_fn = args_fns
+                return lambda: first_fn() - second_fn()
+
+            def minus() -> LispValue:
+                first, *terms = [fn() for fn in args_fns]
+                for term in terms:
+                    first -= term
+                return first
+
+            return minus
+        case TokenKind.SLASH:
+            if len(args_fns) == 1:
+                return args_fns[0]
+
+            def slash() -> LispValue:
+                res, *divisors = [fn() for fn in args_fns]
+                for divisor in divisors:
+                    if divisor == 0:
+                        raise ValueError(
+                            f"Invalid argument. Divisor should not be 0: {divisor}"
+                        )
+                    res /= divisor
+                return res
+
+            return slash
+        case _:
+            raise ValueError(f"Not an arithmetic operator: {kind}")
@@ -0,0 +1,58 @@
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+
+
+@dataclass(slots=True, eq=False, repr=False)
+class Cons:
+    """
+    A cons cell, the pair built by `cons`. A list is a chain of cells linked by their
+    cdr and ended by nil (None): `(list 1 2)` is Cons(1, Cons(2, None)).
+
+    Cells are never mutated, so lists share their structure: `cons` on a list is O(1),
+    and the new list reuses all the cells of the old one. Two slots and no `__dict__`:
+    a cell is the smallest Python object holding a pair.
+    """
+
+    car: object
+    cdr: object
+
+    def __iter__(self) -> Iterator[object]:
+        "The items of the list, up to its last cell (the tail of a dotted list is left out)"
+        cell = self
+        while type(cell) is Cons:
+            yield cell.car
+            cell = cell.cdr
+
+    def __eq__(self, other: object) -> bool:
+        # NOTE: along the cdrs with a loop, as lists can be much longer than the recursion limit
+        if type(other) is not Cons:
+            return NotImplemented
+        cell = self
+        while type(cell) is Cons and type(other) is Cons:
+            if cell is other:
+                return True  # shared tail
+            if cell.car != other.car:
+                return False
+            cell, other = cell.cdr, other.cdr
+        return cell == other
+
+    __hash__ = None  # equal lists are not the same cells
+
+    def __repr__(self) -> str:
+        from .parser import to_lisp  # NOTE: here, as the parser prints the cells too
+
+        return to_lisp(self)
+
+
+def from_items(items: Iterable[object], tail: object = None) -> Cons | None:
+    "The list of the items (nil when there are none), ended by `tail`"
+    for item in reversed(list(items)):
+        tail = Cons(item, tail)
+    return tail
+
+
+def last_cdr(cell: object) -> object:
+    "The tail after the last cell of a list: nil for a proper list"
+    while type(cell) is Cons:
+        cell = cell.cdr
+    return cell
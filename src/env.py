@@ -0,0 +1,730 @@
+"""
+Environments: symbols interned to integer IDs, and variables resolved to lexical
+addresses before evaluation. Also the functions: `lambda`, `defun`, `if` and calls.
+
+`resolve` replaces each symbol of an expression by the address of its variable: a
+`LocalRef` (how many frames up, and the slot in that frame) for the variables of the
+scopes given, a `GlobalRef` (the symbol ID) for the others. Evaluating a resolved
+expression then never looks a name up: a local variable is `frame.slots[index]` after
+`depth` hops up the frames, a global one `globals.values[symbol]`.
+
+`resolve` also turns the special forms into nodes (`Lambda`, `Defun`, `If`, `Call`)
+checked once, so that running them is a few attribute reads. `evaluate_resolved`
+runs the nodes with an explicit stack of continuations instead of Python recursion:
+a call in tail position (the last form of a body, a branch of an `if`) pushes
+nothing, so a loop written as tail recursion runs in constant stack and memory, and
+any other recursion is only limited by the heap.
+
+With a `CallCache` set (`set_call_cache`), the calls of pure functions are memoized.
+"""
+
+from collections import OrderedDict
+from collections.abc import Sequence
+from dataclasses import dataclass
+from time import perf_counter_ns
+
+from .budget import CHECK_INTERVAL, current_budget
+from .cache import CacheStats
+from .cons import Cons, last_cdr
+from .eval import evalate_single_op, evaluate
+from .hooks import Hooks
+from .parser import (
+    SINGLETON_ATOMS,
+    Atom,
+    Expression,
+    Operator,
+    to_lisp,
+)
+from .token import LispValue, TokenKind
+
+
+class SymbolTable:
+    "Symbol names interned to consecutive integer IDs"
+
+    __slots__ = ("ids", "names")
+
+    def __init__(self):
+        self.ids: dict[str, int] = {}
+        self.names: list[str] = []  # by ID
+
+    def intern(self, name: str) -> int:
+        symbol = self.ids.get(name)
+        if symbol is None:
+            symbol = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return symbol
+
+    def clear(self):
+        """
+        Forget all the symbols, e.g. between two unrelated programs. Only once nothing
+        resolved is left (nor any global): their IDs are given again to other names
+        """
+        self.ids.clear()
+        self.names.clear()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+# the IDs of all the symbols resolved
+SYMBOLS = SymbolTable()
+
+
+@dataclass(slots=True)
+class LocalRef:
+    "A variable of an enclosing scope: slot `index` of the frame `depth` levels up"
+
+    depth: int
+    index: int
+    symbol: int  # for error messages
+
+    def __str__(self) -> str:
+        return SYMBOLS.names[self.symbol]  # e.g. in `to_lisp`
+
+
+@dataclass(slots=True)
+class GlobalRef:
+    symbol: int
+
+    def __str__(self) -> str:
+        return SYMBOLS.names[self.symbol]
+
+
+@dataclass(slots=True)
+class Scope:
+    "The variables of a frame, at resolution time: their slots are their positions"
+
+    symbols: list[int]
+    parent: "Scope | None" = None
+
+    @classmethod
+    def of(cls, names: Sequence[str], parent: "Scope | None" = None) -> "Scope":
+        return cls([SYMBOLS.intern(name) for name in names], parent)
+
+    def address(self, symbol: int) -> tuple[int, int] | None:
+        "(depth, index) of the innermost variable of this symbol, None for a global"
+        scope, depth = self, 0
+        while scope is not None:
+            # NOTE: from the end, so that the last of duplicate names wins
+            for index in range(len(scope.symbols) - 1, -1, -1):
+                if scope.symbols[index] == symbol:
+                    return depth, index
+            scope, depth = scope.parent, depth + 1
+        return None
+
+
+@dataclass(slots=True)
+class Frame:
+    "The values of the variables of a scope, at evaluation time"
+
+    slots: list[LispValue | object]
+    parent: "Frame | None" = None
+
+
+class GlobalEnv:
+    """
+    The values of the global variables, indexed by symbol ID. An unbound symbol
+    evaluates to its own name, like with `evaluate`.
+    """
+
+    __slots__ = ("values",)
+
+    def __init__(self):
+        self.values: list[object] = []
+
+    def define(self, name: str, value: object):
+        self.set(SYMBOLS.intern(name), value)
+
+    def set(self, symbol: int, value: object):
+        if _call_cache is not None:
+            _call_cache.clear()  # the memoized calls may depend on the old value
+        if symbol >= len(self.values):
+            self.values.extend([_UNBOUND] * (symbol + 1 - len(self.values)))
+        self.values[symbol] = value
+
+    def clear(self):
+        "Unbind all the variables, e.g. between two unrelated programs"
+        if _call_cache is not None:
+            _call_cache.clear()
+        self.values.clear()
+
+    def lookup(self, symbol: int) -> object:
+        value = self.values[symbol] if symbol < len(self.values) else _UNBOUND
+        return SYMBOLS.names[symbol] if value is _UNBOUND else value
+
+    def value_of(self, name: str) -> object:
+        "Same as `lookup`, by name (not interned: most symbols of data are never bound)"
+        symbol = SYMBOLS.ids.get(name)
+        return name if symbol is None else self.lookup(symbol)
+
+
+_UNBOUND = object()  # as None is a value (nil)
+
+# the global environment of the process: where `defun` defines its functions
+GLOBALS = GlobalEnv()
+
+
+@dataclass(slots=True)
+class Lambda:
+    "`(lambda (params...) body...)`, resolved: its body addresses the params at depth 0"
+
+    params: list[str]  # for the arity and the messages
+    body: list[Expression]  # at least one form, the last one in tail position
+    name: str | None = None  # set by `defun`
+
+    def __str__(self) -> str:
+        return f"(lambda ({' '.join(self.params)}) {' '.join(map(to_lisp, self.body))})"
+
+
+@dataclass(slots=True)
+class Defun:
+    "`(defun name (params...) body...)`: binds a global function, evaluates to its name"
+
+    symbol: int
+    function: Lambda
+
+    def __str__(self) -> str:
+        return "(defun " + SYMBOLS.names[self.symbol] + str(self.function)[7:]
+
+
+@dataclass(slots=True)
+class If:
+    "`(if test then [else])`: nil is false, anything else is true"
+
+    test: Expression
+    then: Expression
+    otherwise: Expression  # nil when left out
+
+    def __str__(self) -> str:
+        return (
+            f"(if {to_lisp(self.test)} {to_lisp(self.then)} {to_lisp(self.otherwise)})"
+        )
+
+
+@dataclass(slots=True)
+class Call:
+    "A function call: `items` is the function, then the arguments"
+
+    items: list[Expression]
+
+    def __str__(self) -> str:
+        return to_lisp(self.items)
+
+
+@dataclass(slots=True, repr=False)
+class Closure:
+    "A function value: a `Lambda` and the frame it was evaluated in"
+
+    function: Lambda
+    frame: Frame | None
+
+    def __repr__(self) -> str:
+        name = self.function.name or "lambda"
+        # NOTE: names only, as the values may be printed by another process
+        return f"#<function {name} ({' '.join(self.function.params)})>"
+
+
+def resolve(expression: Expression, scope: Scope | None = None) -> Expression:
+    """
+    The expression with its symbols replaced by `LocalRef`s (variables of `scope` and
+    of its parents) and `GlobalRef`s (the other symbols), and its special forms and
+    function calls by their nodes. Quoted expressions are data: their symbols are left
+    as they are. Nodes without symbols are kept, not copied. Uses an explicit stack, so
+    any depth is fine.
+    """
+    resolved: list[Expression] = []  # resolved expressions, in post-order
+    # (expr, the scope of its variables, items done?)
+    todo: list[tuple[Expression, Scope | None, bool]] = [(expression, scope, False)]
+    while todo:
+        expr, scope, items_done = todo.pop()
+        if isinstance(expr, Atom):
+            resolved.append(_resolve_symbol(expr, scope))
+        elif not _is_call(expr):
+            resolved.append(expr)  # operators, quotes, and malformed lists
+        elif not items_done:
+            todo.append((expr, scope, True))
+            match _form_kind(expr):
+                case TokenKind.LAMBDA | TokenKind.DEFUN as kind:
+                    names = _check_function(expr, kind)
+                    body = expr[3:] if kind == TokenKind.DEFUN else expr[2:]
+                    inner = Scope.of(names, scope)
+                    todo.extend((item, inner, False) for item in reversed(body))
+                case TokenKind.IF:
+                    assert 3 <= len(expr) <= 4, (
+                        f"Invalid arguments for if operator. Should be a test, a then form and an optional else form, got {len(expr) - 1}: {expr[1:]}"
+                    )
+                    todo.extend((item, scope, False) for item in reversed(expr[1:]))
+                case _:
+                    todo.extend((item, scope, False) for item in reversed(expr))
+        else:
+            kind = _form_kind(expr)
+            n_items = {
+                TokenKind.LAMBDA: len(expr) - 2,
+                TokenKind.DEFUN: len(expr) - 3,
+                TokenKind.IF: len(expr) - 1,
+            }.get(kind, len(expr))
+            items = resolved[len(resolved) - n_items :]
+            del resolved[len(resolved) - n_items :]
+            match kind:
+                case TokenKind.LAMBDA:
+                    resolved.append(Lambda(_param_names(expr[1]), items))
+                case TokenKind.DEFUN:
+                    name = expr[1].literal
+                    function = Lambda(_param_names(expr[2]), items, name)
+                    resolved.append(Defun(SYMBOLS.intern(name), function))
+                case TokenKind.IF:
+                    otherwise = (
+                        items[2] if len(items) == 3 else SINGLETON_ATOMS[TokenKind.NIL]
+                    )
+                    resolved.append(If(items[0], items[1], otherwise))
+                case None:
+                    resolved.append(Call(items))
+                case _:
+                    if all(item is original for item, original in zip(items, expr)):
+                        items = expr  # nothing resolved below: keep the original node
+                    resolved.append(items)
+    return resolved.pop()
+
+
+def _resolve_symbol(atom: Atom, scope: Scope | None) -> Expression:
+    if atom.kind != TokenKind.SYMBOL:
+        return atom
+    symbol = SYMBOLS.intern(atom.literal)
+    address = scope.address(symbol) if scope is not None else None
+    if address is None:
+        return GlobalRef(symbol)
+    return LocalRef(*address, symbol)
+
+
+def _is_call(expr: Expression) -> bool:
+    "Operator calls, special forms but quote, and function calls"
+    return (
+        isinstance(expr, list)
+        and bool(expr)
+        and not (isinstance(expr[0], Operator) and expr[0].op.kind == TokenKind.QUOTE)
+    )
+
+
+def _form_kind(expr: list[Expression]) -> TokenKind | None:
+    "The kind of the operator of a call, None for a function call"
+    return expr[0].op.kind if isinstance(expr[0], Operator) else None
+
+
+def _check_function(expr: list[Expression], kind: TokenKind) -> list[str]:
+    "The names of the params of a `lambda` or `defun`, asserting the form is well made"
+    if kind == TokenKind.DEFUN:
+        assert (
+            len(expr) >= 4
+            and isinstance(expr[1], Atom)
+            and expr[1].kind == TokenKind.SYMBOL
+        ), (
+            f"Invalid arguments for defun operator. Should be a name, a list of params and a body, got {len(expr) - 1}: {expr[1:]}"
+        )
+        params = expr[2]
+    else:
+        assert len(expr) >= 3, (
+            f"Invalid arguments for lambda operator. Should be a list of params and a body, got {len(expr) - 1}: {expr[1:]}"
+        )
+        params = expr[1]
+    return _param_names(params)
+
+
+def _param_names(params: Expression) -> list[str]:
+    if params is SINGLETON_ATOMS[TokenKind.NIL]:
+        return []  # `nil` for no params, like `()`
+    assert isinstance(params, list) and all(
+        [isinstance(param, Atom) and param.kind == TokenKind.SYMBOL for param in params]
+    ), f"Invalid params. Should be a list of symbols, got: {params}"
+    return [param.literal for param in params]
+
+
+# the builtins without side effects: the building blocks of the pure functions
+PURE_TOKEN_KINDS = {
+    TokenKind.PLUS,
+    TokenKind.MINUS,
+    TokenKind.SLASH,
+    TokenKind.EQUAL,
+    TokenKind.CONS,
+    TokenKind.CAR,
+    TokenKind.CDR,
+    TokenKind.LIST,
+    TokenKind.QUOTE,
+}
+
+DEFAULT_CALL_CACHE_SIZE = 1024
+
+
+class CallCache:
+    """
+    LRU cache of the values of the calls of pure functions, by function and arguments.
+
+    A function is pure when its body only calls the builtins of `PURE_TOKEN_KINDS` and
+    global pure functions, and only reads its params and the globals: no `defun`, no
+    `lambda`, no variables of enclosing functions. It is found out from the resolved
+    body, once per function. Setting a global (e.g. `defun`) clears the cache.
+
+    Numbers, strings, nil and t are keyed by type and value, lists by their items, and
+    functions by identity: a call on a list built again (e.g. by `list`) hits too.
+    """
+
+    __slots__ = ("_entries", "_verdicts", "capacity", "stats")
+
+    def __init__(self, capacity: int = DEFAULT_CALL_CACHE_SIZE):
+        assert capacity > 0, f"Invalid capacity. Should be positive, got {capacity}"
+        self.capacity = capacity
+        self.stats = CacheStats()
+        # key -> (value, the function and arguments, kept alive for their ids)
+        self._entries: OrderedDict[tuple, tuple[object, list]] = OrderedDict()
+        self._verdicts: dict[int, tuple[Lambda, bool]] = {}  # id -> (function, pure?)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+        self._verdicts.clear()
+
+    def is_pure(self, function: Lambda, env: GlobalEnv | None) -> bool:
+        verdict = self._verdicts.get(id(function))
+        if verdict is not None:
+            return verdict[1]
+        # the functions it calls are pure too, if it is (recursion included)
+        callees = _pure_callees(function, env, self._verdicts)
+        if callees is None:
+            self._verdicts[id(function)] = (function, False)
+            return False
+        for callee in callees:
+            self._verdicts[id(callee)] = (callee, True)
+        return True
+
+    def get(self, key: tuple) -> object:
+        "The value of the call, `_MISSING` when not cached"
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return _MISSING
+        self.stats.hits += 1
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: tuple, value: object, call: list):
+        self._entries[key] = (value, call)
+        if len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+
+_MISSING = object()  # as None is a value (nil)
+
+# the cache of the calls of pure functions, when memoizing (see `set_call_cache`)
+_call_cache: CallCache | None = None
+
+
+def set_call_cache(cache: CallCache | None):
+    "Memoize the calls of pure functions in `cache` from now on (None: stop memoizing)"
+    global _call_cache
+    _call_cache = cache
+
+
+def _call_key(values: list) -> tuple:
+    """
+    The cache key of a call: the function, then its arguments. A list is its items
+    between two markers, then its tail: equal lists give equal keys, cells built
+    afresh at each call included.
+    """
+    key: list = [id(values[0].function)]
+    todo = values[:0:-1]  # the arguments, the first one on top
+    while todo:
+        arg = todo.pop()
+        kind = type(arg)
+        if kind is float:
+            key.append(arg.hex())  # NOTE: not `arg`, as 0.0 == -0.0
+        elif kind is int or kind is str or arg is None or arg is True:
+            key.append((kind, arg))  # NOTE: with the type, as 1 == 1.0 == True
+        elif kind is Cons:
+            key.append(_LIST_START)
+            todo.append(last_cdr(arg))
+            todo.append(_LIST_END)
+            todo.extend(reversed(list(arg)))
+        elif arg is _LIST_END:
+            key.append(_LIST_END)
+        else:
+            key.append((kind, id(arg)))  # functions
+    return tuple(key)
+
+
+# the markers around the items of a list in a call key
+_LIST_START, _LIST_END = object(), object()
+
+
+def _pure_callees(
+    function: Lambda, env: GlobalEnv | None, verdicts: dict[int, tuple[Lambda, bool]]
+) -> list[Lambda] | None:
+    """
+    The function and all the functions it calls (directly or not) not known to be pure,
+    assuming they are, or None when one of them is impure
+    """
+    callees, seen = [function], {id(function)}
+    pending = [function]
+    while pending:
+        todo = list(pending.pop().body)
+        while todo:
+            expr = todo.pop()
+            kind = type(expr)
+            if kind is LocalRef:
+                if expr.depth:
+                    return None  # a variable of an enclosing function
+            elif kind is Atom or kind is GlobalRef:
+                pass
+            elif kind is If:
+                todo += (expr.test, expr.then, expr.otherwise)
+            elif kind is Call:
+                head, *args = expr.items
+                callee = (
+                    env.lookup(head.symbol)
+                    if type(head) is GlobalRef and env is not None
+                    else None
+                )
+                if type(callee) is not Closure or callee.frame is not None:
+                    return None  # not a global function (yet)
+                callee = callee.function
+                verdict = verdicts.get(id(callee))
+                if verdict is not None and not verdict[1]:
+                    return None
+                if verdict is None and id(callee) not in seen:
+                    seen.add(id(callee))
+                    callees.append(callee)
+                    pending.append(callee)
+                todo += args
+            elif kind is list and expr and type(expr[0]) is Operator:
+                if expr[0].op.kind not in PURE_TOKEN_KINDS:
+                    return None
+                if expr[0].op.kind is not TokenKind.QUOTE:
+                    todo += expr[1:]
+            else:
+                return None  # lambda, defun, and malformed forms
+    return callees
+
+
+# what to do with the value just computed, on top of the stack of continuations:
+_ARGS = 0  # (_ARGS, node, values, frame, index): the value of item `index` - 1
+_IF = 1  # (_IF, node, frame): the value of the test
+_BODY = 2  # (_BODY, body, frame, index): run the forms of a body from `index`
+_MEMO = 3  # (_MEMO, cache, key, call): the value of a call, to cache
+
+
+def _flat_op_args(
+    expr: list, frame: Frame | None, env: GlobalEnv | None
+) -> list | None:
+    """
+    The values of the arguments of an operator call whose arguments are all variables
+    and atoms, e.g. `(- n 1)`, else None: `evaluate_resolved` applies such a call right
+    away, without a continuation
+    """
+    if not expr or type(expr[0]) is not Operator or expr[0].op.kind is TokenKind.QUOTE:
+        return None
+    args = []
+    for idx in range(1, len(expr)):
+        item = expr[idx]
+        kind = type(item)
+        if kind is LocalRef:
+            scope_frame, depth = frame, item.depth
+            while depth:
+                scope_frame = scope_frame.parent
+                depth -= 1
+            args.append(scope_frame.slots[item.index])
+        elif kind is Atom:
+            args.append(item.literal)
+        elif kind is GlobalRef and env is not None:
+            args.append(env.lookup(item.symbol))
+        else:
+            return None
+    return args
+
+
+# what the loop of `evaluate_resolved` does next
+_EVAL, _COLLECT, _RETURN = 0, 1, 2
+
+
+def evaluate_resolved(
+    expression: Expression,
+    frame: Frame | None = None,
+    env: GlobalEnv | None = GLOBALS,
+    hooks: Hooks | None = None,
+) -> LispValue | object:
+    """
+    Same as `evaluate`, for an expression from `resolve`: its variables take their
+    values in `frame` (and its parents, laid out like the scopes given to `resolve`)
+    and in `env` (none: the globals evaluate to their names).
+
+    A loop over an explicit stack of continuations, never recursive in Python. Calling
+    a function is one `Frame` of the argument values, linked to the frame of the
+    closure; a call in tail position replaces the current form instead of pushing a
+    continuation, so that tail recursion runs in constant memory. When memoizing, the
+    calls of pure functions are not tail calls: their value is cached on return.
+
+    Each function call is a step and an allocation (its frame, even when its value
+    comes from the call cache), charged to the current budget (see budget.py) every
+    `CHECK_INTERVAL` calls. The operators charge theirs in `evalate_single_op`.
+
+    With `hooks`, each operator call emits `on_call` and `on_node` (see `Interpreter`).
+    """
+    budget = current_budget()
+    # calls until the next charge to the budget (never, without a budget)
+    countdown = CHECK_INTERVAL if budget is not None else -1
+    konts: list[tuple] = []
+    expr, mode = expression, _EVAL
+    value: object = None
+    node: object = None  # the operator call (a list) or `Call` collecting its items
+    values: list = []
+    index = 0
+    starts: list[int] = []  # with hooks: when each operator call being run started
+    while True:
+        if mode == _EVAL:
+            # NOTE: dispatching on the exact types, the nodes are never subclassed
+            kind = type(expr)
+            if kind is LocalRef:
+                scope_frame, depth = frame, expr.depth
+                while depth:
+                    scope_frame = scope_frame.parent
+                    depth -= 1
+                value, mode = scope_frame.slots[expr.index], _RETURN
+            elif kind is GlobalRef:
+                value = (
+                    SYMBOLS.names[expr.symbol]
+                    if env is None
+                    else env.lookup(expr.symbol)
+                )
+                mode = _RETURN
+            elif kind is Atom:
+                value, mode = expr.literal, _RETURN
+            elif kind is Call:
+                node, values, index, mode = expr, [], 0, _COLLECT
+            elif kind is If:
+                test = expr.test
+                args = (
+                    _flat_op_args(test, frame, env)
+                    if type(test) is list and hooks is None
+                    else None
+                )
+                if args is None:
+                    konts.append((_IF, expr, frame))
+                    expr = test
+                    continue
+                value = evalate_single_op(test[0].op, args)
+                expr = expr.then if value is not None else expr.otherwise
+                continue
+            elif kind is Lambda:
+                if budget is not None:
+                    budget.charge(1, 1)
+                value, mode = Closure(expr, frame), _RETURN
+            elif kind is Defun:
+                if budget is not None:
+                    budget.charge(1, 1)
+                if env is not None:
+                    env.set(expr.symbol, Closure(expr.function, None))
+                value, mode = expr.function.name, _RETURN
+            elif (
+                kind is list
+                and expr
+                and type(expr[0]) is Operator
+                # NOTE: the other special forms are nodes once resolved
+                and expr[0].op.kind is not TokenKind.QUOTE
+            ):
+                if hooks is not None:
+                    starts.append(perf_counter_ns())
+                node, values, index, mode = expr, [], 1, _COLLECT
+            else:
+                # other atoms, quotes, and malformed forms (for which `evaluate` raises)
+                value, mode = evaluate(expr), _RETURN
+
+        if mode == _COLLECT:
+            # the items of `node` from `index`: the simple ones inline, the others with
+            # a continuation to come back here
+            items = node.items if type(node) is Call else node
+            n_items = len(items)
+            while index < n_items:
+                item = items[index]
+                kind = type(item)
+                if kind is LocalRef:
+                    scope_frame, depth = frame, item.depth
+                    while depth:
+                        scope_frame = scope_frame.parent
+                        depth -= 1
+                    values.append(scope_frame.slots[item.index])
+                elif kind is Atom:
+                    values.append(item.literal)
+                elif kind is GlobalRef and env is not None:
+                    values.append(env.lookup(item.symbol))
+                elif kind is list and hooks is None:
+                    args = _flat_op_args(item, frame, env)
+                    if args is None:
+                        break
+                    values.append(evalate_single_op(item[0].op, args))
+                else:
+                    break
+                index += 1
+            if index < n_items:
+                konts.append((_ARGS, node, values, frame, index + 1))
+                expr, mode = items[index], _EVAL
+                continue
+            if type(node) is not Call:
+                if hooks is None:
+                    value = evalate_single_op(node[0].op, values)
+                else:
+                    hooks.on_call(node[0].op, values)
+                    value = evalate_single_op(node[0].op, values)
+                    hooks.on_node(node, value, perf_counter_ns() - starts.pop())
+                mode = _RETURN
+            else:
+                function = values[0]
+                assert type(function) is Closure, (
+                    f"Invalid function call. The first item should be a function, got: {function}"
+                )
+                params, body = function.function.params, function.function.body
+                assert len(values) - 1 == len(params), (
+                    f"Invalid arguments for {function}. Should be {len(params)}, got {len(values) - 1}: {values[1:]}"
+                )
+                countdown -= 1
+                if not countdown:
+                    budget.charge(CHECK_INTERVAL, CHECK_INTERVAL)
+                    countdown = CHECK_INTERVAL
+                cache = _call_cache
+                if cache is not None and cache.is_pure(function.function, env):
+                    key = _call_key(values)
+                    value = cache.get(key)
+                    if value is not _MISSING:
+                        mode = _RETURN
+                    else:
+                        konts.append((_MEMO, cache, key, values))
+                if mode != _RETURN:
+                    # the call replaces the current form: in tail position, nothing is
+                    # pushed
+                    frame = Frame(values[1:], function.frame)
+                    if len(body) > 1:
+                        konts.append((_BODY, body, frame, 1))
+                    expr, mode = body[0], _EVAL
+                    continue
+
+        # mode == _RETURN: give the value to the last continuation
+        if not konts:
+            if budget is not None:
+                budget.charge(CHECK_INTERVAL - countdown, CHECK_INTERVAL - countdown)
+            return value
+        kont = konts.pop()
+        if kont[0] == _ARGS:
+            _, node, values, frame, index = kont
+            values.append(value)
+            mode = _COLLECT
+        elif kont[0] == _IF:
+            _, if_node, frame = kont
+            expr = if_node.then if value is not None else if_node.otherwise
+            mode = _EVAL
+        elif kont[0] == _MEMO:
+            _, cache, key, call = kont
+            cache.put(key, value, call)
+        else:
+            _, body, frame, index = kont
+            if index + 1 < len(body):
+                konts.append((_BODY, body, frame, index + 1))
+            expr, mode = body[index], _EVAL
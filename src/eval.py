@@ -1,5 +1,11 @@
+from collections import OrderedDict
+from typing import Literal
+
+from .budget import current_budget
+from .cons import Cons, from_items
 from .parser import (
     OPERATORS_TOKEN_KIND,
+    SPECIAL_FORM_TOKEN_KINDS,
     Atom,
     Expression,
     Operator,
@@ -9,21 +15,22 @@ from .token import LispValue, Token, TokenKind
 
 def evaluate(expresssion: Expression) -> LispValue:
     match expresssion:
-        case Atom(atom):
-            return atom.literal
+        case Atom(kind=TokenKind.SYMBOL, literal=name):
+            return symbol_value(name)
+        case Atom(literal=literal):
+            return literal
         case Operator():
             raise NotImplementedError("Value of an operator not implemented yet")
         case sub_expr:
             op = sub_expr[0]
-            assert isinstance(op, Operator), (
-                f"First item of a list should be an operator, got: {op}"
-            )
+            if not isinstance(op, Operator) or op.op.kind in PROGRAM_TOKEN_KINDS:
+                return evaluate_program(sub_expr)  # function calls, lambda, if, defun
 
             if op.op.kind == TokenKind.QUOTE:
                 assert len(sub_expr) == 2, (
                     f"Invalid arguments for quote operator. Should be a single argument, got {len(sub_expr) - 1}: {sub_expr[1:]}"
                 )
-                return sub_expr[1]  # NOTE: by pass evaluation of the args
+                return quoted_data(sub_expr[1])  # NOTE: by pass evaluation of the args
             else:
                 raw_args = sub_expr[1:]  # expressions
                 args_values = [evaluate(arg) for arg in raw_args]
@@ -31,27 +38,295 @@ def evaluate(expresssion: Expression) -> LispValue:
                 return evalate_single_op(op.op, args_values)
 
 
-def evalate_single_op(op: Token, args: list[LispValue]) -> LispValue | list[LispValue]:
-    assert op.kind in OPERATORS_TOKEN_KIND, (
-        f"operator {op} does not have the expected kind. Should be one of: {OPERATORS_TOKEN_KIND}"
-    )
-    match op.kind:
+# the errors of the evaluation of a bad form (e.g. a zero divisor, too deep a nesting):
+# a BudgetExceeded is not one of them, the form may be fine with a higher limit
+EVALUATION_ERRORS = (
+    AssertionError,
+    ValueError,
+    NotImplementedError,
+    ArithmeticError,
+    RecursionError,
+)
+
+# the forms evaluated with environments, by `evaluate_program`
+PROGRAM_TOKEN_KINDS = {TokenKind.LAMBDA, TokenKind.IF, TokenKind.DEFUN}
+
+
+def evaluate_program(expression: Expression) -> object:
+    """
+    Value of a function call, `lambda`, `if` or `defun`: the expression is resolved,
+    then run with the global environment of the process (see env.py)
+    """
+    from .env import GLOBALS, evaluate_resolved, resolve  # NOTE: env.py imports eval.py
+
+    return evaluate_resolved(resolve(expression), None, GLOBALS)
+
+
+def symbol_value(name: str) -> object:
+    """
+    Value of a symbol outside of any function: its global value (e.g. the closure of a
+    `defun`), else its own name. The same as a `GlobalRef` of env.py
+    """
+    from .env import GLOBALS  # NOTE: env.py imports eval.py
+
+    return GLOBALS.value_of(name)
+
+
+def quoted_data(quoted: Expression) -> object:
+    """
+    The value of a quoted expression, as data: its lists become lists of cons cells
+    (nil when empty), its numbers, strings, nils and ts their values. Symbols and
+    operators are kept as their nodes (a quoted symbol is not looked up): they print
+    as themselves.
+
+    The cells of the last quoted lists are kept, so evaluating a quote again is O(1)
+    and gives the same cells (they are never mutated). The budget is charged all the
+    cells at each evaluation all the same, like in the other engines.
+    """
+    data, n_cells = quoted_cells(quoted)
+    if n_cells:
+        budget = current_budget()
+        if budget is not None:
+            budget.charge(0, n_cells)
+    return data
+
+
+def quoted_cells(quoted: Expression) -> tuple[object, int]:
+    "The data of a quoted expression, and its number of cells (not charged)"
+    if type(quoted) is not list:
+        return _datum(quoted), 0
+    entry = _quoted_cache.get(id(quoted))
+    if entry is not None:
+        _quoted_cache.move_to_end(id(quoted))
+        return entry[1], entry[2]
+
+    data, n_cells = _to_cells(quoted)
+    _quoted_cache[id(quoted)] = (quoted, data, n_cells)
+    if len(_quoted_cache) > QUOTED_CACHE_SIZE:
+        _quoted_cache.popitem(last=False)
+    return data, n_cells
+
+
+# data of the quoted lists evaluated last (and their number of cells), by id of the
+# list. The list is kept alive with its data, so that its id is not reused by another list
+QUOTED_CACHE_SIZE = 1024
+_quoted_cache: OrderedDict[int, tuple[list[Expression], object, int]] = OrderedDict()
+
+
+def clear_quoted_cache():
+    "Let the quoted lists go, with their data (e.g. once their program is done)"
+    _quoted_cache.clear()
+
+
+def _to_cells(quoted: list[Expression]) -> tuple[object, int]:
+    "The data, and its number of cells. Uses an explicit stack, so any depth is fine"
+    n_cells = 0
+    values: list[object] = []  # data of the expressions done, in post-order
+    todo: list[tuple[Expression, bool]] = [(quoted, False)]  # (expr, items done?)
+    while todo:
+        expr, items_done = todo.pop()
+        if type(expr) is not list:
+            values.append(_datum(expr))
+        elif not items_done:
+            todo.append((expr, True))
+            todo.extend((item, False) for item in reversed(expr))
+        else:
+            tail = None
+            for _ in expr:
+                tail = Cons(values.pop(), tail)  # from the last item
+            values.append(tail)
+            n_cells += len(expr)
+    return values.pop(), n_cells
+
+
+def _datum(node: Atom | Operator) -> object:
+    match node:
+        case Atom(
+            kind=TokenKind.NUMBER | TokenKind.STRING | TokenKind.NIL | TokenKind.TRUE,
+            literal=literal,
+        ):
+            return literal
+        case Atom(kind=TokenKind.CONS, literal=literal):
+            return literal  # a pair folded by the optimizer
+        case _:
+            return node
+
+
+def evaluate_iterative(expresssion: Expression) -> LispValue:
+    """
+    Same as `evaluate`, but with an explicit stack instead of recursion.
+    Handles any nesting depth (`evaluate` hits the recursion limit at ~1000 levels).
+    """
+    # calls whose arguments are being evaluated, innermost last: (list, values of its first args)
+    stack: list[tuple[list[Expression], list[LispValue]]] = []
+
+    expr = expresssion
+    while True:
+        # go down `expr` until a value is found, pushing the calls met on the way
+        value: LispValue
+        match expr:
+            case Atom(kind=TokenKind.SYMBOL, literal=name):
+                value = symbol_value(name)
+            case Atom(literal=literal):
+                value = literal
+            case Operator():
+                raise NotImplementedError("Value of an operator not implemented yet")
+            case sub_expr:
+                op = sub_expr[0]
+                if not isinstance(op, Operator) or op.op.kind in PROGRAM_TOKEN_KINDS:
+                    value = evaluate_program(sub_expr)
+                elif op.op.kind == TokenKind.QUOTE:
+                    assert len(sub_expr) == 2, (
+                        f"Invalid arguments for quote operator. Should be a single argument, got {len(sub_expr) - 1}: {sub_expr[1:]}"
+                    )
+                    value = quoted_data(
+                        sub_expr[1]
+                    )  # NOTE: by pass evaluation of the args
+                elif len(sub_expr) > 1:
+                    stack.append((sub_expr, []))
+                    expr = sub_expr[1]
+                    continue
+                else:
+                    value = evalate_single_op(op.op, [])
+
+        # go back up: `value` is the value of the next argument of the innermost call
+        while stack:
+            sub_expr, args_values = stack[-1]
+            args_values.append(value)
+
+            # the atoms that follow are evaluated right away, without going down
+            arg_idx = len(args_values) + 1
+            while arg_idx < len(sub_expr) and isinstance(sub_expr[arg_idx], Atom):
+                atom = sub_expr[arg_idx]
+                if atom.kind == TokenKind.SYMBOL:
+                    args_values.append(symbol_value(atom.literal))
+                else:
+                    args_values.append(atom.literal)
+                arg_idx += 1
+
+            if arg_idx < len(sub_expr):
+                expr = sub_expr[arg_idx]  # evaluate the next argument
+                break
+            stack.pop()
+            value = evalate_single_op(sub_expr[0].op, args_values)
+        else:
+            return value
+
+
+def evaluate_memoized(
+    expresssion: Expression, memo: dict[int, LispValue | list] | None = None
+) -> LispValue:
+    """
+    Same as `evaluate`, but each call node is evaluated once: its value is kept in
+    `memo`, by the id of the node. Meant for hash-consed ASTs (`Parser(hash_cons=True)`),
+    where identical subtrees are the same node, so e.g. all the `(+ 2 3)` of a program
+    are evaluated once. Only the nodes whose value never changes are kept: not the ones
+    above a symbol, a function call, a `lambda`, an `if` or a `defun`, whose values
+    depend on the globals (which a `defun` may redefine).
+
+    NOTE: the ids are only valid while the nodes are alive: don't reuse a memo once
+    its AST is gone.
+    """
+    if memo is None:
+        memo = {}
+
+    def visit(expr: Expression) -> tuple[LispValue | list, bool]:
+        "The value of the expression, and whether it is always the same"
+        if type(expr) is not list or not expr or not isinstance(expr[0], Operator):
+            # atoms, function calls, and the forms for which `evaluate` raises
+            constant = type(expr) is not list and (
+                type(expr) is not Atom or expr.kind != TokenKind.SYMBOL
+            )
+            return evaluate(expr), constant
+        op = expr[0].op
+        if op.kind in SPECIAL_FORM_TOKEN_KINDS:
+            return evaluate(expr), op.kind == TokenKind.QUOTE
+
+        value = memo.get(id(expr), _NOT_EVALUATED)
+        if value is not _NOT_EVALUATED:
+            return value, True
+        args_values, constant = [], True
+        for arg in expr[1:]:
+            arg_value, arg_constant = visit(arg)
+            args_values.append(arg_value)
+            constant = constant and arg_constant
+        value = evalate_single_op(op, args_values)
+        if constant:
+            memo[id(expr)] = value
+        return value, constant
+
+    return visit(expresssion)[0]
+
+
+_NOT_EVALUATED = object()  # as None is a value (nil)
+
+
+ArithmeticBackend = Literal["python", "numpy"]
+
+# the NumPy backend module, when selected (see `set_arithmetic_backend`)
+_numpy_backend = None
+
+
+def set_arithmetic_backend(backend: ArithmeticBackend):
+    """
+    With "numpy", the arithmetic operators over many arguments are computed with
+    vectorized NumPy operations, when they give exactly the same values as the Python
+    path (which is used otherwise). NumPy is an optional dependency.
+    """
+    global _numpy_backend
+    if backend == "numpy":
+        from . import numpy_backend  # NOTE: raises ImportError when NumPy is missing
+
+        _numpy_backend = numpy_backend
+    else:
+        _numpy_backend = None
+
+
+def _is_number(value: object) -> bool:
+    # NOTE: bool is a subclass of int, but `t` is not a number
+    return isinstance(value, int | float) and type(value) is not bool
+
+
+# the exact types of most numbers: checked first, without a call per argument
+_NUMBER_TYPES = {int, float}
+
+
+def evalate_single_op(op: Token, args: list[LispValue]) -> LispValue | Cons:
+    kind = op.kind
+    budget = current_budget()
+    if budget is not None:
+        # charged before the cells are built (see budget.py)
+        n_cells = (
+            1 if kind == TokenKind.CONS else len(args) if kind == TokenKind.LIST else 0
+        )
+        budget.charge(len(args) + 1, n_cells)
+    if _numpy_backend is not None and len(args) >= _numpy_backend.MIN_ARGS:
+        value = _numpy_backend.evaluate_arithmetic(kind, args)
+        if value is not None:
+            return value
+    match kind:
         case TokenKind.PLUS:
-            assert all([isinstance(arg, int | float) for arg in args]), (
+            assert all(
+                [type(arg) in _NUMBER_TYPES or _is_number(arg) for arg in args]
+            ), (
                 f"Invalid arguments. Addition operator operates on number, received: {args}"
             )
             return sum([float(arg) for arg in args])
         case TokenKind.MINUS:
-            assert all([isinstance(arg, int | float) for arg in args]), (
-                f"Invalid arguments. Substraction operator operates on number, received: {args}"
+            assert args and all(
+                [type(arg) in _NUMBER_TYPES or _is_number(arg) for arg in args]
+            ), (
+                f"Invalid arguments. Substraction operator operates on at least one number, received: {args}"
             )
             res = args[0]
             for term in args[1:]:
                 res -= term
             return res
         case TokenKind.SLASH:
-            assert all([isinstance(arg, int | float) for arg in args]), (
-                f"Invalid arguments. Division operator operates on number, received: {args}"
+            assert args and all(
+                [type(arg) in _NUMBER_TYPES or _is_number(arg) for arg in args]
+            ), (
+                f"Invalid arguments. Division operator operates on at least one number, received: {args}"
             )
             res = args[0]
             for divisor in args[1:]:
@@ -61,8 +336,29 @@ def evalate_single_op(op: Token, args: list[LispValue]) -> LispValue | list[Lisp
                     )
                 res /= divisor
             return res
+        case TokenKind.EQUAL:
+            assert args and all(
+                [type(arg) in _NUMBER_TYPES or _is_number(arg) for arg in args]
+            ), (
+                f"Invalid arguments. Equality operator operates on at least one number, received: {args}"
+            )
+            return True if all([arg == args[0] for arg in args]) else None
         case TokenKind.CONS:
             assert len(args) == 2, (
                 f"Invalid number of arguments to cons operator, should be two but got {len(args)}: {args}"
             )
-            return args
+            return Cons(args[0], args[1])
+        case TokenKind.CAR | TokenKind.CDR:
+            assert len(args) == 1 and (args[0] is None or type(args[0]) is Cons), (
+                f"Invalid arguments. {op.kind.value} operator operates on a single list, received: {args}"
+            )
+            if args[0] is None:
+                return None  # the car and the cdr of nil are nil
+            return args[0].car if kind == TokenKind.CAR else args[0].cdr
+        case TokenKind.LIST:
+            return from_items(args)
+        case _:
+            # NOTE: checked last, as hashing a TokenKind is a Python call
+            assert kind in OPERATORS_TOKEN_KIND, (
+                f"operator {op} does not have the expected kind. Should be one of: {OPERATORS_TOKEN_KIND}"
+            )
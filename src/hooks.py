@@ -0,0 +1,100 @@
+import heapq
+import itertools
+from collections import Counter
+
+from .parser import Expression, Operator, to_lisp
+from .token import LispValue, Token, TokenKind
+
+
+class Hooks:
+    """
+    Events emitted by an `Interpreter(hooks=...)`. Override the ones to listen to, the
+    others do nothing.
+    """
+
+    def on_token(self, token: Token):
+        "A token was scanned"
+
+    def on_form(self, form: Expression):
+        "A top-level expression was parsed"
+
+    def on_call(self, op: Token, args: list[LispValue]):
+        "An operator is about to be applied to the values of its arguments"
+
+    def on_node(self, node: Expression, value: LispValue | list, elapsed_ns: int):
+        "An expression was evaluated, in `elapsed_ns` (its sub-expressions included)"
+
+
+class PrintHooks(Hooks):
+    "Print every event (what the `debug` flag of `scan` used to do)"
+
+    def __init__(self):
+        from rich import print  # imported here: `rich` is slow to import
+
+        self.print = print
+
+    def on_token(self, token: Token):
+        self.print("token scanned:", token)
+
+    def on_form(self, form: Expression):
+        self.print("form parsed:", to_lisp(form))
+
+    def on_call(self, op: Token, args: list[LispValue]):
+        self.print(f"calling {op.lexeme} with:", args)
+
+    def on_node(self, node: Expression, value: LispValue | list, elapsed_ns: int):
+        self.print(f"evaluated {to_lisp(node)} in {elapsed_ns} ns:", value)
+
+
+class ProfileCollector(Hooks):
+    "Count the tokens, forms and operator calls, and keep the slowest expressions"
+
+    def __init__(self, top: int = 10):
+        self.top = top
+        self.n_tokens = 0
+        self.n_forms = 0
+        self.calls: Counter[TokenKind] = Counter()
+        self.operator_ns: Counter[TokenKind] = Counter()  # sub-expressions included
+        # min-heap of the `top` slowest calls: (elapsed_ns, tie-breaker, node)
+        self.hottest: list[tuple[int, int, Expression]] = []
+        self._order = itertools.count()
+
+    def on_token(self, token: Token):
+        self.n_tokens += 1
+
+    def on_form(self, form: Expression):
+        self.n_forms += 1
+
+    def on_call(self, op: Token, args: list[LispValue]):
+        self.calls[op.kind] += 1
+
+    def on_node(self, node: Expression, value: LispValue | list, elapsed_ns: int):
+        if not (type(node) is list and node and isinstance(node[0], Operator)):
+            return  # atoms: not worth a line in the report
+        self.operator_ns[node[0].op.kind] += elapsed_ns
+
+        entry = (elapsed_ns, next(self._order), node)
+        if len(self.hottest) < self.top:
+            heapq.heappush(self.hottest, entry)
+        elif entry > self.hottest[0]:
+            heapq.heapreplace(self.hottest, entry)
+
+    def report(self, max_width: int = 60) -> str:
+        lines = [
+            f"{self.n_tokens} tokens, {self.n_forms} forms",
+            f"{'operator':<10} {'calls':>10} {'total (ms)':>12} {'mean (µs)':>10}",
+        ]
+        for kind, total_ns in self.operator_ns.most_common():
+            n_calls = self.calls[kind] or 1  # quotes are not calls
+            lines.append(
+                f"{kind.value:<10} {self.calls[kind]:>10} {total_ns / 1e6:>12.3f} "
+                f"{total_ns / n_calls / 1e3:>10.2f}"
+            )
+
+        lines.append(f"hottest forms (top {self.top}, sub-expressions included):")
+        for elapsed_ns, _, node in sorted(self.hottest, reverse=True):
+            text = to_lisp(node)
+            if len(text) > max_width:
+                text = text[: max_width - 3] + "..."
+            lines.append(f"{elapsed_ns / 1e6:>10.3f} ms  {text}")
+        return "\n".join(lines)
@@ -0,0 +1,196 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from itertools import chain
+
+from .parser import Expression, Parser
+from .scanner import _ASCII_WHITESPACE, _MASTER_PATTERN, _token_from_match, scan
+from .token import Token, TokenKind
+
+
+@dataclass(slots=True)
+class IncrementalStats:
+    edits: int = 0
+    full_parses: int = 0  # edits which needed to scan and parse the whole source again
+    forms_parsed: int = 0
+    forms_reused: int = 0  # re-scanned, but with the same tokens: the old node is kept
+
+
+class IncrementalSource:
+    """
+    A source text with its tokens and top-level expressions, kept up to date through
+    edits.
+
+    An edit only re-scans the text between the unaffected neighbouring forms, and only
+    re-parses the forms of that region: the other expressions (and their tokens) are
+    kept as is, and their offsets shifted. So the cost of an edit depends on the size
+    of the edited forms, not on the size of the source (up to a copy of the text and
+    the shift of the offsets, both done at C speed).
+
+    The tokens and expressions are always the same as with `scan` and `Parser` on the
+    whole text. When it can't be sure of that (e.g. an edit which unbalances the
+    parentheses), the region is widened, up to the whole source.
+    """
+
+    def __init__(self, source: str):
+        self.stats = IncrementalStats()
+        self._parse_all(source)
+
+    @property
+    def tokens(self) -> list[Token]:
+        return list(chain.from_iterable(self.form_tokens))
+
+    def edit(self, offset: int, deleted: int, inserted: str) -> range:
+        """
+        Replace `deleted` characters at `offset` by the `inserted` text, and return the
+        indices of the re-parsed expressions in `forms` (the others are the same nodes).
+        Errors are the ones of `scan` and `Parser` on the new text: then the source is
+        left as it was before the edit.
+        """
+        if not (0 <= offset and 0 <= deleted and offset + deleted <= len(self.source)):
+            raise ValueError(
+                f"Edit out of the source (length {len(self.source)}): {deleted} characters at offset {offset}"
+            )
+        source = self.source[:offset] + inserted + self.source[offset + deleted :]
+        self.stats.edits += 1
+        if self.starts is None or not inserted.isascii():
+            self._parse_all(source)
+            return range(len(self.forms))
+
+        # the forms touching the edit are affected, e.g. deleting the space of '(a) 12 34'
+        lo = bisect_left(self.ends, offset)
+        hi = bisect_right(self.starts, offset + deleted)
+        delta = len(inserted) - deleted
+        widen = 1
+        while True:
+            region_start = self.ends[lo - 1] if lo > 0 else 0
+            region_end = (
+                self.starts[hi] + delta if hi < len(self.forms) else len(source)
+            )
+            region = _parse_region(source, region_start, region_end)
+            if region is not None:
+                break
+            if lo == 0 and hi == len(self.forms):
+                self._parse_all(source)  # raises the errors of the whole source
+                return range(len(self.forms))
+            lo, hi = max(lo - widen, 0), min(hi + widen, len(self.forms))
+            widen *= 2
+
+        forms, form_tokens, starts, ends = region
+        self._reuse_nodes(lo, hi, forms, form_tokens)
+        self.stats.forms_parsed += len(forms)
+
+        # index of the first form after the region, once replaced
+        tail = lo + len(forms)
+        self.forms[lo:hi] = forms
+        self.form_tokens[lo:hi] = form_tokens
+        self.starts[lo:hi] = starts
+        self.ends[lo:hi] = ends
+        if delta:
+            self.starts[tail:] = array(
+                "q", [start + delta for start in self.starts[tail:]]
+            )
+            self.ends[tail:] = array("q", [end + delta for end in self.ends[tail:]])
+        self.source = source
+        return range(lo, lo + len(forms))
+
+    def _reuse_nodes(
+        self, lo: int, hi: int, forms: list[Expression], form_tokens: list[list[Token]]
+    ):
+        "Keep the old nodes of the re-parsed forms whose tokens did not change"
+        old_tokens = self.form_tokens[lo:hi]
+        n_max = min(len(old_tokens), len(form_tokens))
+        # from the left, then from the right of the region (the edit is in between)
+        n_left = 0
+        while n_left < n_max and form_tokens[n_left] == old_tokens[n_left]:
+            forms[n_left] = self.forms[lo + n_left]
+            n_left += 1
+        n_right = 0
+        while (
+            n_left + n_right < n_max
+            and form_tokens[-1 - n_right] == old_tokens[-1 - n_right]
+        ):
+            forms[-1 - n_right] = self.forms[hi - 1 - n_right]
+            n_right += 1
+        self.stats.forms_reused += n_left + n_right
+
+    def _parse_all(self, source: str):
+        self.stats.full_parses += 1
+        region = _parse_region(source, 0, len(source))
+        if region is None:
+            # errors, or non-ASCII sources: as `scan` and `Parser` do it (and raise)
+            tokens = scan(source)
+            self.forms = Parser(tokens=tokens).parse_all()
+            # NOTE: no offsets, so the next edits parse everything again
+            self.form_tokens = [tokens]
+            self.starts = self.ends = None
+            self.source = source
+            return
+
+        self.forms, self.form_tokens, self.starts, self.ends = region
+        self.source = source
+
+
+# groups of the master pattern for tokens which may span several characters
+_MULTI_CHAR_GROUPS = {"NUMBER", "STRING", "KEYWORD", "SYMBOL"}
+
+
+def _parse_region(
+    source: str, start: int, end: int
+) -> tuple[list[Expression], list[list[Token]], array, array] | None:
+    """
+    The forms of source[start:end], with their tokens and spans. None when they may not
+    be the ones of a scan of the whole source, or when scanning or parsing fails.
+    """
+    if not source[start:end].isascii():
+        return None
+    region_end = end
+    # the scanner strips the source, then skips spaces and newlines between the tokens
+    whitespace = _ASCII_WHITESPACE if start == 0 else " \n"
+    while start < end and source[start] in whitespace:
+        start += 1
+    whitespace = _ASCII_WHITESPACE if end == len(source) else " \n"
+    while end > start and source[end - 1] in whitespace:
+        end -= 1
+
+    forms: list[Expression] = []
+    form_tokens: list[list[Token]] = []
+    starts, ends = array("q"), array("q")
+    tokens: list[Token] = []
+    names: dict[str, str] = {}  # see `_scan_loop` of the scanner
+    depth = 0
+    m = None
+    for m in _MASTER_PATTERN.finditer(source, start, end):
+        tok = _token_from_match(m, names)
+        if tok is None:
+            return None
+        if not tokens:
+            starts.append(m.start(m.lastgroup))
+        tokens.append(tok)
+
+        # same splitting as `Parser.iter_forms`
+        if tok.kind == TokenKind.LEFT_PAREN:
+            depth += 1
+        elif tok.kind == TokenKind.RIGHT_PAREN:
+            if depth == 0:
+                return None
+            depth -= 1
+        if depth == 0 and tok.kind != TokenKind.QUOTE_ABR:
+            try:
+                forms.append(Parser(tokens=tokens).parse_iterative())
+            except ValueError:
+                return None
+            form_tokens.append(tokens)
+            ends.append(m.end())
+            tokens = []
+
+    if tokens:
+        return None  # incomplete last form: it may end after the region
+    if (
+        m is not None
+        and region_end < len(source)
+        and m.end() == region_end
+        and m.lastgroup in _MULTI_CHAR_GROUPS
+    ):
+        return None  # the last token may go on after the region, e.g. '12|34'
+    return forms, form_tokens, starts, ends
@@ -0,0 +1,90 @@
+from collections.abc import Iterable, Iterator
+from time import perf_counter_ns
+
+from .env import GLOBALS, evaluate_resolved, resolve
+from .eval import PROGRAM_TOKEN_KINDS, evalate_single_op, evaluate
+from .hooks import Hooks
+from .parser import SPECIAL_FORM_TOKEN_KINDS, Expression, Operator, Parser
+from .scanner import ScanEngine, TokenSource, iter_tokens, scan
+from .token import LispValue, Token
+
+
+class Interpreter:
+    """
+    Scan, parse and evaluate, with optional hooks to trace or profile each step.
+
+    The code path is chosen once, here: without hooks, the methods are the plain
+    `scan`, `Parser` and `evaluate` (no check per token or per node). With hooks, they
+    are instrumented versions emitting the events of `Hooks`.
+    """
+
+    def __init__(self, hooks: Hooks | None = None, engine: ScanEngine = "regex"):
+        self.hooks = hooks
+        self.engine = engine
+        if hooks is None:
+            self.evaluate = evaluate
+        else:
+            self.scan = self._scan_traced
+            self.parse = self._parse_traced
+            self.evaluate = self._evaluate_traced
+
+    def scan(self, source: str | TokenSource) -> Iterable[Token]:
+        "The tokens of a source text (a list), or of a stream (read lazily)"
+        if isinstance(source, str):
+            return scan(source, engine=self.engine)
+        return iter_tokens(source)
+
+    def parse(self, tokens: Iterable[Token]) -> Iterator[Expression]:
+        "The top-level expressions, one by one"
+        return Parser(tokens=tokens).iter_forms()
+
+    def evaluate(self, expression: Expression) -> LispValue | list:
+        return evaluate(expression)
+
+    def run(self, source: str | TokenSource) -> list[LispValue | list]:
+        "The value of each top-level expression of the source"
+        return [self.evaluate(form) for form in self.parse(self.scan(source))]
+
+    # --- Instrumented code path ---
+
+    def _scan_traced(self, source: str | TokenSource) -> Iterable[Token]:
+        tokens = Interpreter.scan(self, source)
+        if isinstance(tokens, list):
+            for token in tokens:
+                self.hooks.on_token(token)
+            return tokens
+        return self._trace_tokens(tokens)
+
+    def _trace_tokens(self, tokens: Iterator[Token]) -> Iterator[Token]:
+        for token in tokens:
+            self.hooks.on_token(token)
+            yield token
+
+    def _parse_traced(self, tokens: Iterable[Token]) -> Iterator[Expression]:
+        for form in Interpreter.parse(self, tokens):
+            self.hooks.on_form(form)
+            yield form
+
+    def _evaluate_traced(self, expression: Expression) -> LispValue | list:
+        "Same value (and errors) as `evaluate`, emitting the calls and the nodes evaluated"
+        start = perf_counter_ns()
+        match expression:
+            case [Operator(op=op), *raw_args] if (
+                op.kind not in SPECIAL_FORM_TOKEN_KINDS
+            ):
+                args_values = [self._evaluate_traced(arg) for arg in raw_args]
+                self.hooks.on_call(op, args_values)
+                value = evalate_single_op(op, args_values)
+            case [head, *_] if (
+                not isinstance(head, Operator) or head.op.kind in PROGRAM_TOKEN_KINDS
+            ):
+                # function calls, lambda, if and defun, like `evaluate_program`: the
+                # operator calls run inside emit their events too
+                value = evaluate_resolved(
+                    resolve(expression), None, GLOBALS, self.hooks
+                )
+            case _:
+                # atoms, quotes, and malformed forms (for which `evaluate` raises)
+                value = evaluate(expression)
+        self.hooks.on_node(expression, value, perf_counter_ns() - start)
+        return value
@@ -0,0 +1,91 @@
+"""
+NumPy backend for the arithmetic operators over many arguments (see
+`set_arithmetic_backend` in eval.py). NumPy is an optional dependency: this module is
+only imported when the backend is selected.
+"""
+
+import numpy as np
+
+from .token import LispValue, TokenKind
+
+# below, building the array costs more than the Python loop
+MIN_ARGS = 64
+
+# ints up to this magnitude are exactly represented as floats: so are the sums of ints
+# whose magnitudes add up to less than this
+_MAX_EXACT_INT = 2**53
+_MAX_INT64 = 2**63 - 1
+
+
+def evaluate_arithmetic(kind: TokenKind, args: list[LispValue]) -> LispValue | None:
+    """
+    The value of `+`, `-` or `/` over the args, exactly as the Python path computes it
+    (same value, same type). None when NumPy can't guarantee that, then the Python
+    path should be used: e.g. for arguments which are not numbers (it raises the
+    errors), zero divisors (same), huge ints, or `+` over floats (`sum` compensates
+    the rounding errors, sequentially).
+    """
+    types = set(map(type, args))
+    if not types <= {int, float}:
+        return None  # NOTE: including bools (`t`), which the Python path rejects
+    only_ints = float not in types
+    has_ints = int in types
+    if kind == TokenKind.PLUS and not only_ints:
+        return (
+            None  # before building the array: this is the fallback of `+` over floats
+        )
+
+    with np.errstate(all="ignore"):  # like Python floats: inf and nan, no warnings
+        try:
+            values = np.array(args, dtype=np.int64 if only_ints else np.float64)
+        except OverflowError:
+            return None  # ints beyond 64 bits
+
+        match kind:
+            case TokenKind.PLUS:
+                if _abs_sum_above(values, _MAX_EXACT_INT):
+                    return None
+                # every partial sum is exact: `sum` of the floats gives the exact sum
+                return float(int(values.sum()))
+            case TokenKind.MINUS:
+                if only_ints:
+                    if _abs_sum_above(values, _MAX_INT64):
+                        return None
+                    return int(values[0]) - int(values[1:].sum())
+                if has_ints and _abs_sum_above(values, _MAX_EXACT_INT):
+                    return None  # ints may not have been exact, e.g. 10**17 - 1 - 0.5
+                # same float operations, in the same order, as the Python loop
+                return float(np.subtract.accumulate(values)[-1])
+            case TokenKind.SLASH:
+                if not (values[1:] != 0).all():
+                    return None  # let the Python path raise, with the divisor
+                # int / int is the correctly rounded quotient: the same as with floats,
+                # as long as the ints are exact floats
+                if has_ints and not _exact_floats(args, values):
+                    return None
+                values = values.astype(np.float64, copy=False)
+                return float(np.divide.accumulate(values)[-1])
+            case _:
+                return None
+
+
+def _exact_floats(args: list[LispValue], values: np.ndarray) -> bool:
+    """
+    Whether the ints of the args are exactly represented as floats. Checked on the ints
+    themselves: once converted, 2**53 + 1 is 2**53, which is exact
+    """
+    if values.dtype == np.int64:
+        # NOTE: not `np.abs`, which overflows for the smallest int64
+        return bool(
+            (values > -_MAX_EXACT_INT).all() and (values < _MAX_EXACT_INT).all()
+        )
+    return all(
+        -_MAX_EXACT_INT < arg < _MAX_EXACT_INT for arg in args if type(arg) is int
+    )
+
+
+def _abs_sum_above(values: np.ndarray, bound: int) -> bool:
+    "Whether the magnitudes of the values add up to more than `bound` (without overflow)"
+    magnitudes = np.abs(values.astype(np.float64))
+    # NOTE: float sums are approximate, so leave a margin below the bound
+    return not magnitudes.sum() < bound * 0.5
@@ -0,0 +1,81 @@
+from .cons import Cons
+from .eval import EVALUATION_ERRORS, evaluate
+from .parser import (
+    SINGLETON_ATOMS,
+    SPECIAL_FORM_TOKEN_KINDS,
+    Atom,
+    Expression,
+    Operator,
+)
+from .token import TokenKind
+
+# operators without side effects, whose calls on literal atoms can be computed once and for all
+FOLDABLE_TOKEN_KINDS = {
+    TokenKind.PLUS,
+    TokenKind.MINUS,
+    TokenKind.SLASH,
+    TokenKind.EQUAL,
+    TokenKind.CONS,
+    TokenKind.LIST,
+}
+
+
+def fold_constants(expression: Expression) -> Expression:
+    """
+    Replace the calls of pure operators on literal atoms by the atom of their value,
+    bottom-up, e.g. (/ (+ 5 1) (- 4 2)) -> 3.0.
+
+    Quoted expressions are left untouched, and so are the calls whose evaluation raises
+    (e.g. a division by zero): the error is still raised when the expression is evaluated.
+    Folding is charged to the budget like evaluating, and raises its BudgetExceeded.
+    Folded lists (cons, list) become CONS atoms: like quoted data in compiled code,
+    their value is then the same cells at each evaluation.
+    Uses an explicit stack, so any depth is fine.
+    """
+    folded: list[Expression] = []  # folded expressions, in post-order
+    todo: list[tuple[Expression, bool]] = [(expression, False)]  # (expr, items folded?)
+    while todo:
+        expr, items_folded = todo.pop()
+        if not _is_call(expr):
+            folded.append(expr)
+        elif not items_folded:
+            todo.append((expr, True))
+            todo.extend((item, False) for item in reversed(expr))
+        else:
+            items = folded[len(folded) - len(expr) :]
+            del folded[len(folded) - len(expr) :]
+            if all(item is original for item, original in zip(items, expr)):
+                items = expr  # nothing folded below: keep the original node
+            folded.append(_fold_call(items))
+
+    return folded.pop()
+
+
+def _is_call(expr: Expression) -> bool:
+    "Whether the items of the expression are evaluated (not an atom, a quote or a malformed list)"
+    return (
+        isinstance(expr, list)
+        and bool(expr)
+        and isinstance(expr[0], Operator)
+        and expr[0].op.kind not in SPECIAL_FORM_TOKEN_KINDS
+    )
+
+
+def _fold_call(expr: list[Expression]) -> Expression:
+    if expr[0].op.kind not in FOLDABLE_TOKEN_KINDS or not all(
+        isinstance(arg, Atom) and arg.kind != TokenKind.SYMBOL for arg in expr[1:]
+    ):
+        return expr
+
+    try:
+        value = evaluate(expr)
+    except EVALUATION_ERRORS:
+        return expr  # keep the error for evaluation time
+
+    if isinstance(value, Cons):
+        return Atom(kind=TokenKind.CONS, literal=value)
+    elif value is None:
+        return SINGLETON_ATOMS[TokenKind.NIL]  # (list), (= 1 2)
+    elif value is True:
+        return SINGLETON_ATOMS[TokenKind.TRUE]  # (= 1 1)
+    return Atom(kind=TokenKind.NUMBER, literal=value)
@@ -1,10 +1,14 @@
-from dataclasses import dataclass
+import itertools
+from collections.abc import Iterable, Iterator, Sequence
+from dataclasses import dataclass, field
 
-from .token import Token, TokenKind
+from .cons import Cons, last_cdr
+from .token import SINGLETON_TOKENS, LispValue, Token, TokenKind
+from .token_stream import TokenStream
 
 
 # my current mental model for operators are that they are symbols which refer to functions
-@dataclass
+@dataclass(slots=True)
 class Operator:
     op: Token  # token-kind should be in OPERATORS_TOKEN_KIND or SPECIAL_OPERATORS_TOKEN_KIND ('quote')
 
@@ -26,9 +30,26 @@ OPERATORS_TOKEN_KIND: set[TokenKind] = {
     TokenKind.PLUS,
     TokenKind.MINUS,
     TokenKind.SLASH,
+    TokenKind.EQUAL,
     #
     TokenKind.QUOTE,
     TokenKind.CONS,
+    TokenKind.CAR,
+    TokenKind.CDR,
+    TokenKind.LIST,
+    #
+    TokenKind.LAMBDA,
+    TokenKind.IF,
+    TokenKind.DEFUN,
+}
+
+# operators whose arguments are not (all) evaluated, so they are not applied with
+# `evalate_single_op`: quote and the forms of programs (see env.py)
+SPECIAL_FORM_TOKEN_KINDS: set[TokenKind] = {
+    TokenKind.QUOTE,
+    TokenKind.LAMBDA,
+    TokenKind.IF,
+    TokenKind.DEFUN,
 }
 
 # special functions, which do not follow the typical (operator, arg1, ..., argN) pattern
@@ -36,14 +57,32 @@ SPECIAL_OPERATORS_TOKEN_KIND: set[TokenKind] = {
     TokenKind.QUOTE_ABR,
 }
 
+# one shared node per operator (never mutate them)
+OPERATORS: dict[TokenKind, Operator] = {
+    kind: Operator(op=SINGLETON_TOKENS[kind]) for kind in OPERATORS_TOKEN_KIND
+}
+
 
-@dataclass
+@dataclass(slots=True)
 class Atom:
     """
     Special leaf tokens. Like elementary pieces of data such as a literal string or a number.
+    Only the kind and the literal of the token are kept (not the token and its lexeme).
     """
 
-    atom: Token  # token-kind should be in ATOM_TOKEN_KINDS
+    kind: TokenKind  # should be in ATOM_TOKEN_KINDS, or CONS for a list folded by the optimizer
+    literal: LispValue
+
+
+# atoms fully determined by their kind, shared by every occurrence (never mutate them)
+SINGLETON_ATOMS: dict[TokenKind, Atom] = {
+    TokenKind.NIL: Atom(kind=TokenKind.NIL, literal=None),
+    TokenKind.TRUE: Atom(kind=TokenKind.TRUE, literal=True),
+}
+
+
+def atom_from_token(tok: Token) -> Atom:
+    return SINGLETON_ATOMS.get(tok.kind) or Atom(kind=tok.kind, literal=tok.literal)
 
 
 # "Another beauty of Lisp notation is: this is all there is.  All Lisp expressions are either atoms, like 1, or lists, which consist of zero or more expressions enclosed in parentheses." from Graham's book (end of 2.1)
@@ -61,10 +100,92 @@ assert (
 ), "Not all token-kinds covered by parsing sets"
 
 
+def desugar_quote(quoted_ast: Expression) -> Expression:
+    # re-wrap using the normal quote (i.e., desugar the expression)
+    # My idea is that the quote abbreviation is syntactic sugar for (quote ...) --> we recover the full ast for the user , i.e. prepent the quote
+    return [OPERATORS[TokenKind.QUOTE], quoted_ast]
+
+
+def to_lisp(value: object) -> str:
+    "An expression (or a value) as LISP text, e.g. `(+ 3 5)` for a quoted expression"
+    match value:
+        case list():
+            return "(" + " ".join(map(to_lisp, value)) + ")"
+        case Cons():
+            text = " ".join(map(to_lisp, value))
+            tail = last_cdr(value)
+            if tail is not None:
+                text += f" . {to_lisp(tail)}"  # a dotted pair, like (cons 1 2)
+            return f"({text})"
+        case Operator(op=op):
+            return op.lexeme
+        case Atom(kind=TokenKind.STRING, literal=literal):
+            return f'"{literal}"'
+        case Atom(kind=TokenKind.NIL) | None:
+            return "nil"
+        case Atom(kind=TokenKind.TRUE) | True:
+            return "t"
+        case Atom(literal=literal):
+            return to_lisp(literal)
+        case _:
+            return str(value)
+
+
+class NodeTable:
+    """
+    Hash-consing of the AST: one shared node per distinct subtree, e.g. all the
+    `(+ 2 3)` of a program are the same list. Like `OPERATORS`, never mutate the nodes.
+    """
+
+    def __init__(self):
+        # atoms by (kind, type, literal): 2 and 2.0 are equal, but not the same atom
+        self._atoms: dict[tuple[TokenKind, type, LispValue], Atom] = {}
+        # lists by the ids of their items, which are shared nodes kept alive here
+        self._lists: dict[tuple[int, ...], list[Expression]] = {}
+        self.requested = 0  # number of atoms and lists built by the parser
+
+    def atom(self, tok: Token) -> Atom:
+        self.requested += 1
+        key = (tok.kind, type(tok.literal), tok.literal)
+        node = self._atoms.get(key)
+        if node is None:
+            node = self._atoms[key] = atom_from_token(tok)
+        return node
+
+    def list(self, items: list[Expression]) -> list[Expression]:
+        self.requested += 1
+        key = tuple(map(id, items))
+        node = self._lists.get(key)
+        if node is None:
+            node = self._lists[key] = items
+        return node
+
+    def quote(self, quoted_ast: Expression) -> Expression:
+        return self.list(desugar_quote(quoted_ast))
+
+    def __len__(self) -> int:
+        "Number of distinct nodes"
+        return len(self._atoms) + len(self._lists)
+
+    @property
+    def dedup_ratio(self) -> float:
+        "Nodes built per distinct node (1.0: no subtree shared)"
+        return self.requested / max(len(self), 1)
+
+
 @dataclass
 class Parser:
-    tokens: list[Token]
+    # `parse` needs a list (or a `TokenStream`), `iter_forms` takes any iterable (e.g. `iter_tokens`)
+    tokens: Sequence[Token] | Iterable[Token]
     idx: int = 0  # idx of the token currently being processed
+    # hash-consing mode: identical subtrees are parsed to a single shared node
+    hash_cons: bool = False
+    # the table of the shared nodes, can be passed to share nodes between parsers
+    nodes: NodeTable | None = field(default=None, repr=False)
+
+    def __post_init__(self):
+        if self.hash_cons and self.nodes is None:
+            self.nodes = NodeTable()
 
     def parse(self) -> Expression:
         "Assume the tokens reprends a single expression (no declarations, pure? lisp!)"
@@ -76,9 +197,11 @@ class Parser:
         self.idx += 1  # 'consume' the tok
 
         if tok.kind in ATOM_TOKEN_KINDS:
-            return Atom(atom=tok)
+            return (
+                self.nodes.atom(tok) if self.nodes is not None else atom_from_token(tok)
+            )
         elif tok.kind in OPERATORS_TOKEN_KIND:
-            return Operator(op=tok)
+            return OPERATORS[tok.kind]
         elif tok.kind in SPECIAL_OPERATORS_TOKEN_KIND:
             # NOTE: assuming they all work like the abbreviated quote. We only support this one in the scanner anyway for now
             assert tok.kind == TokenKind.QUOTE_ABR, (
@@ -88,12 +211,9 @@ class Parser:
             # "You can get the effect of calling quote by affixing a ' to the front of any expression" from Graham's book (end of 2.2)
             quoted_ast = self.parse()
 
-            # re-wrap using the normal quote (i.e., desugar the expression)
-            # My idea is that the quote abbreviation is syntactic sugar for (quote ...) --> we recover the full ast for the user , i.e. prepent the quote
-            return [
-                Operator(op=Token(kind=TokenKind.QUOTE, lexeme="quote", literal=None)),
-                quoted_ast,
-            ]
+            if self.nodes is not None:
+                return self.nodes.quote(quoted_ast)
+            return desugar_quote(quoted_ast)
 
         elif tok.kind == TokenKind.LEFT_PAREN:
             list_items: list[Expression] = []
@@ -113,10 +233,114 @@ class Parser:
 
             # consume the right paren
             self.idx += 1
-            return list_items
+            return self.nodes.list(list_items) if self.nodes is not None else list_items
 
         else:
             raise ValueError(
-                f"Unexpected token at idx {self.idx}: {tok}. "
+                f"Unexpected token at idx {self.idx}{self._location(self.idx - 1)}: {tok}. "
                 "Expected either an atom of data, an operator or a left parenthesis"
             )
+
+    def parse_iterative(self) -> Expression:
+        """
+        Same as `parse`, but with an explicit stack instead of recursion.
+        Handles any nesting depth (`parse` hits the recursion limit at ~1000 levels).
+        """
+        # lists being built, innermost last. A `None` marks a pending abbreviated quote,
+        # which wraps the next complete expression.
+        stack: list[list[Expression] | None] = []
+        make_atom, make_list, quote = atom_from_token, None, desugar_quote
+        if self.nodes is not None:
+            make_atom, make_list, quote = (
+                self.nodes.atom,
+                self.nodes.list,
+                self.nodes.quote,
+            )
+
+        while True:
+            if self.idx >= len(self.tokens):
+                if stack and stack[-1] is not None:
+                    raise ValueError(
+                        "Ran out of tokens before finding the end of the list (right paren)"
+                    )
+                raise ValueError("Ran out of tokens")
+
+            tok = self.tokens[self.idx]
+            self.idx += 1  # 'consume' the tok
+
+            expr: Expression
+            if tok.kind in ATOM_TOKEN_KINDS:
+                expr = make_atom(tok)
+            elif tok.kind in OPERATORS_TOKEN_KIND:
+                expr = OPERATORS[tok.kind]
+            elif tok.kind in SPECIAL_OPERATORS_TOKEN_KIND:
+                assert tok.kind == TokenKind.QUOTE_ABR, (
+                    "special operator is expected to be the abbreviated quote for now"
+                )
+                stack.append(None)
+                continue
+            elif tok.kind == TokenKind.LEFT_PAREN:
+                stack.append([])
+                continue
+            elif tok.kind == TokenKind.RIGHT_PAREN and stack and stack[-1] is not None:
+                expr = stack.pop()
+                if make_list is not None:
+                    expr = make_list(expr)
+            else:
+                raise ValueError(
+                    f"Unexpected token at idx {self.idx}{self._location(self.idx - 1)}: {tok}. "
+                    "Expected either an atom of data, an operator or a left parenthesis"
+                )
+
+            # `expr` is complete: apply the pending quotes, then add it to its list
+            while stack and stack[-1] is None:
+                stack.pop()
+                expr = quote(expr)
+            if not stack:
+                return expr
+            stack[-1].append(expr)
+
+    def _location(self, idx: int) -> str:
+        "Where the token at idx is in the source, if the tokens know it (see `TokenStream`)"
+        if isinstance(self.tokens, TokenStream):
+            line, column = self.tokens.line_col(idx)
+            return f" (line {line}, column {column})"
+        return ""
+
+    def iter_forms(self) -> Iterator[Expression]:
+        """
+        Yield the top-level expressions one by one, each as soon as its last token is read.
+        Only the tokens of the expression being read are buffered.
+        """
+        tokens = self.tokens
+        if isinstance(tokens, Sequence):
+            tokens = itertools.islice(tokens, self.idx, None)
+
+        form_tokens: list[Token] = []
+        depth = 0  # number of lists opened and not yet closed in the current expression
+        for tok in tokens:
+            self.idx += 1
+            form_tokens.append(tok)
+
+            if tok.kind == TokenKind.LEFT_PAREN:
+                depth += 1
+            elif tok.kind == TokenKind.RIGHT_PAREN:
+                if depth == 0:
+                    raise ValueError(
+                        f"Unexpected token at idx {self.idx}{self._location(self.idx - 1)}: {tok}. "
+                        "Expected either an atom of data, an operator or a left parenthesis"
+                    )
+                depth -= 1
+
+            # a quote is not a complete expression: it applies to the next one
+            if depth == 0 and tok.kind != TokenKind.QUOTE_ABR:
+                yield Parser(tokens=form_tokens, nodes=self.nodes).parse_iterative()
+                form_tokens = []
+
+        if form_tokens:
+            # incomplete last expression, let `parse_iterative` report it
+            Parser(tokens=form_tokens).parse_iterative()
+
+    def parse_all(self) -> list[Expression]:
+        "All the top-level expressions of the tokens"
+        return list(self.iter_forms())
@@ -1,26 +1,60 @@
-from rich import print
+import codecs
+import mmap
+import re
+from collections.abc import Iterator
+from typing import BinaryIO, Literal, TextIO
 
-from .token import LispValue, Token, TokenKind
+from .token import SINGLETON_TOKENS, LispValue, Token, TokenKind
 
+ScanEngine = Literal["loop", "regex"]
 
-def scan(source: str, debug: bool = False) -> list[Token]:
-    "From raw source text to a 'stream' of tokens"
-    source = source.strip()
+# NOTE: a keyword is only matched when a delimiter (or the end of the source) follows
+# it, otherwise it is the start of a longer symbol, like 'cart' or 'iffy'
+KEYWORD_TOKEN_KINDS = (
+    TokenKind.NIL,
+    TokenKind.CONS,
+    TokenKind.QUOTE,
+    TokenKind.CAR,
+    TokenKind.CDR,
+    TokenKind.LIST,
+    TokenKind.LAMBDA,
+    TokenKind.IF,
+    TokenKind.DEFUN,
+)
+KEYWORD_DELIMITERS = " \n\t\r\x0b\x0c()'"
 
+
+def scan(source: str, engine: ScanEngine = "loop") -> list[Token]:
+    """
+    From raw source text to a 'stream' of tokens
+
+    `engine="regex"` tokenizes with a single compiled master regex instead of the
+    char-by-char loop. Both engines produce the same tokens (and the same errors).
+    To trace the tokens, see `Interpreter(hooks=...)`.
+    """
+    if engine == "regex":
+        return _scan_regex(source)
+    return _scan_loop(source.strip(), {})
+
+
+def _scan_loop(source: str, names: dict[str, str]) -> list[Token]:
+    """
+    The char-by-char engine of `scan`, on a source already stripped
+
+    `names` maps the symbol names scanned so far to their first lexeme, so that all the
+    tokens of a symbol share one string. It is local to a scan (not `sys.intern`, whose
+    strings are never freed in a long-running process).
+    """
     tokens: list[Token] = []
     idx = 0  # idx into the source text
 
     while idx < len(source):
-        if debug:
-            print(f"Scanning at idx {idx}: {source[idx]}")
         tok_kind: TokenKind
         literal: LispValue = None
         lexeme: str
         match source[idx]:
             case " " | "\n":
                 # skip whitespace
-                if debug:
-                    print(f"skipping whitespace idx {idx}")
                 idx += 1
                 continue
             case "(":
@@ -54,8 +88,6 @@ def scan(source: str, debug: bool = False) -> list[Token]:
                     literal = int(lexeme[:-1])
                 else:
                     literal = float(lexeme)
-                if debug:
-                    print(f"after number scanning, idx is {idx}")
             case '"':
                 tok_kind = TokenKind.STRING
 
@@ -101,25 +133,24 @@ def scan(source: str, debug: bool = False) -> list[Token]:
             case "-":
                 tok_kind = TokenKind.MINUS
                 lexeme = source[idx]
+            case "=":
+                tok_kind = TokenKind.EQUAL
+                lexeme = source[idx]
             case _:
-                if check_longer_token_match(TokenKind.NIL, idx, source):
-                    tok_kind = TokenKind.NIL
-                    lexeme = TokenKind.NIL.value
-                    literal = None
-                    idx += len(TokenKind.NIL.value)
-                elif check_longer_token_match(TokenKind.CONS, idx, source):
-                    tok_kind = TokenKind.CONS
-                    lexeme = TokenKind.CONS.value
+                keyword = next(
+                    (
+                        kind
+                        for kind in KEYWORD_TOKEN_KINDS
+                        if check_longer_token_match(kind, idx, source)
+                    ),
+                    None,
+                )
+                if keyword is not None:
+                    tok_kind = keyword
+                    lexeme = keyword.value
                     literal = None
-                    idx += len(TokenKind.CONS.value)
-                elif check_longer_token_match(TokenKind.QUOTE, idx, source):
-                    tok_kind = TokenKind.QUOTE
-                    lexeme = TokenKind.QUOTE.value
-                    literal = None
-                    idx += len(TokenKind.QUOTE.value)
+                    idx += len(keyword.value) - 1  # on its last char, like the others
                 else:
-                    if debug:
-                        print("parsing a symbol")
                     # try to parse a symbol
                     tok_kind = TokenKind.SYMBOL
                     head = idx  # idx of the symbol first character
@@ -128,7 +159,7 @@ def scan(source: str, debug: bool = False) -> list[Token]:
                         idx += 1
 
                     if head < idx:
-                        lexeme = source[head:idx]
+                        lexeme = names.setdefault(source[head:idx], source[head:idx])
                         literal = lexeme
 
                         idx -= 1
@@ -137,13 +168,14 @@ def scan(source: str, debug: bool = False) -> list[Token]:
                             f"Expected variable name to have at least length of 1 at index {idx}: {source[idx]}"
                         )
 
-        tok = Token(
-            kind=tok_kind,
-            lexeme=lexeme,
-            literal=literal,
-        )
-        if debug:
-            print("token scanned:", tok)
+        if tok_kind in SINGLETON_TOKENS:
+            tok = SINGLETON_TOKENS[tok_kind]
+        else:
+            tok = Token(
+                kind=tok_kind,
+                lexeme=lexeme,
+                literal=literal,
+            )
 
         tokens.append(tok)
 
@@ -156,7 +188,248 @@ def scan(source: str, debug: bool = False) -> list[Token]:
 def check_longer_token_match(
     target_token_kind: TokenKind, idx: int, source: str
 ) -> bool:
-    return (
-        idx + len(target_token_kind.value) - 1 < len(source)
-        and source[idx : idx + len(target_token_kind.value)] == target_token_kind.value
+    "Whether the keyword is at idx, followed by a delimiter or by the end of the source"
+    end = idx + len(target_token_kind.value)
+    return source[idx:end] == target_token_kind.value and (
+        end == len(source) or source[end] in KEYWORD_DELIMITERS
+    )
+
+
+# --- Regex engine ---
+# One alternative per case of the `match` in `scan`, in the same order. The first
+# characters of the alternatives are disjoint, except for 't' (TRUE wins over SYMBOL,
+# like in the loop) and the keywords (tried before SYMBOL, like in the loop).
+# Only ASCII sources go through it: there `isdigit`/`isalpha` are exactly [0-9]/[A-Za-z].
+# Whitespace is skipped as the prefix of the next token, so each match is a token.
+_MASTER_PATTERN = re.compile(
+    r"""
+    [ \n]*+
+    (?:(?P<LEFT_PAREN>\()
+    |(?P<RIGHT_PAREN>\))
+    |(?P<NUMBER>[0-9]+(?P<FRACTION>\.[0-9]*)?)
+    |(?P<STRING>"(?P<STRING_BODY>[A-Za-z]*+)(?s:.))  # NOTE: possessive, and like the loop, whatever char stops the string is taken as its closing quote
+    |(?P<TRUE>t)
+    |(?P<QUOTE_ABR>')
+    |(?P<SLASH>/)
+    |(?P<PLUS>\+)
+    |(?P<MINUS>-)
+    |(?P<EQUAL>=)
+    |(?P<KEYWORD>nil|cons|quote|car|cdr|list|lambda|if|defun)(?=[ \n\t\r\x0b\x0c()']|\Z)  # NOTE: see KEYWORD_DELIMITERS
+    |(?P<SYMBOL>[A-Za-z]+)
+    |(?P<ERROR>(?s:.)))
+    """,
+    re.VERBOSE,
+)
+
+# whitespace removed by `str.strip` on an ASCII string
+_ASCII_WHITESPACE = "\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f "
+
+_SINGLE_CHAR_TOKEN_KINDS: dict[str, TokenKind] = {
+    kind.name: kind
+    for kind in (
+        TokenKind.LEFT_PAREN,
+        TokenKind.RIGHT_PAREN,
+        TokenKind.TRUE,
+        TokenKind.QUOTE_ABR,
+        TokenKind.SLASH,
+        TokenKind.PLUS,
+        TokenKind.MINUS,
+        TokenKind.EQUAL,
     )
+}
+
+_KEYWORD_TOKEN_KINDS: dict[str, TokenKind] = {
+    kind.value: kind for kind in KEYWORD_TOKEN_KINDS
+}
+
+
+def _scan_regex(source: str) -> list[Token]:
+    if not source.isascii():
+        return scan(source)
+
+    start, end = _strip_bounds(source)
+    tokens: list[Token] = []
+    names: dict[str, str] = {}
+    for m in _MASTER_PATTERN.finditer(source, start, end):
+        tok = _token_from_match(m, names)
+        if tok is None:
+            # let the loop scanner raise its (more detailed) error
+            return scan(source)
+        tokens.append(tok)
+
+    return tokens
+
+
+def _strip_bounds(source: str | bytes | memoryview) -> tuple[int, int]:
+    "Same bounds as `source.strip()` on an ASCII source, without copying the source"
+    whitespace = _ASCII_WHITESPACE
+    if not isinstance(source, str):
+        whitespace = (
+            _ASCII_WHITESPACE.encode()
+        )  # NOTE: indexing bytes gives ints, so does `in bytes`
+
+    start, end = 0, len(source)
+    while start < end and source[start] in whitespace:
+        start += 1
+    while end > start and source[end - 1] in whitespace:
+        end -= 1
+    return start, end
+
+
+def _token_from_match(m: re.Match[str], names: dict[str, str]) -> Token | None:
+    "Build the token of a master pattern match, None for an ERROR match (`names`: see `_scan_loop`)"
+    group = m.lastgroup
+    if group in _SINGLE_CHAR_TOKEN_KINDS:
+        return SINGLETON_TOKENS[_SINGLE_CHAR_TOKEN_KINDS[group]]
+    elif group == "NUMBER":
+        lexeme = m[group]
+        fraction = m["FRACTION"]
+        literal: LispValue
+        if fraction is None:
+            literal = int(lexeme)
+        elif fraction == ".":
+            literal = int(lexeme[:-1])  # like in '3.' -> view it as an int
+        else:
+            literal = float(lexeme)
+        return Token(kind=TokenKind.NUMBER, lexeme=lexeme, literal=literal)
+    elif group == "STRING":
+        return Token(kind=TokenKind.STRING, lexeme=m[group], literal=m["STRING_BODY"])
+    elif group == "KEYWORD":
+        return SINGLETON_TOKENS[_KEYWORD_TOKEN_KINDS[m[group]]]
+    elif group == "SYMBOL":
+        lexeme = names.setdefault(m[group], m[group])
+        return Token(kind=TokenKind.SYMBOL, lexeme=lexeme, literal=lexeme)
+    else:
+        return None
+
+
+# --- Streaming ---
+
+DEFAULT_CHUNK_SIZE = 1 << 16  # in characters (text streams) or bytes (binary input)
+
+TokenSource = TextIO | BinaryIO | bytes | bytearray | memoryview | mmap.mmap
+
+
+def iter_tokens(
+    stream: TokenSource, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[Token]:
+    """
+    Lazily scan a text stream, a binary stream or a bytes buffer (e.g. a mmap)
+
+    Yields the same tokens as `scan` would on the whole text, but only keeps the
+    current chunk (plus the token crossing its end) in memory.
+    ASCII sources are scanned by the master regex (like the regex engine). From the
+    first chunk with other characters on, the loop of `scan` takes over: still chunk
+    by chunk, up to the last token boundary of the buffer.
+    """
+    buffer = ""
+    offset = 0  # offset of `buffer` in the (whole) source text, for error messages
+    at_start = True  # still skipping the leading whitespace (the `strip()` in `scan`)
+    names: dict[str, str] = {}  # see `_scan_loop`
+
+    chunks = _iter_text_chunks(stream, chunk_size)
+    eof = False
+    while not eof:
+        chunk = next(chunks, None)
+        if chunk is None:
+            eof = True
+            buffer = buffer.rstrip()  # trailing whitespace, the other half of `strip()`
+        elif not chunk.isascii():
+            yield from _iter_tokens_loop(buffer + chunk, chunks, at_start, names)
+            return
+        else:
+            buffer += chunk
+        if at_start:
+            stripped = buffer.lstrip()
+            offset += len(buffer) - len(stripped)
+            buffer = stripped
+            if not buffer:
+                continue
+            at_start = False
+
+        # Tokens reaching the trailing whitespace of the buffer are left for the next
+        # round: they may continue in the next chunk (e.g. '12|34', 'ni|l'), or
+        # end on whitespace which `strip()` drops at the end of the source (e.g. '"ab\n').
+        limit = len(buffer) if eof else len(buffer.rstrip())
+        consumed = 0  # end of the last token taken out of the buffer
+        for m in _MASTER_PATTERN.finditer(buffer):
+            if m.end() >= limit and not eof:
+                break
+
+            tok = _token_from_match(m, names)
+            if tok is None:
+                rest = buffer[m.start("ERROR") :]
+                if not eof and _OPEN_STRING.fullmatch(rest):
+                    break  # the closing quote may be in the next chunk
+                _raise_scan_error(rest, offset + m.start("ERROR"))
+            yield tok
+            consumed = m.end()
+
+        offset += consumed
+        buffer = buffer[consumed:]
+
+
+_OPEN_STRING = re.compile(r'"[A-Za-z]*')
+
+
+def _iter_tokens_loop(
+    buffer: str, chunks: Iterator[str], at_start: bool, names: dict[str, str]
+) -> Iterator[Token]:
+    "The rest of `iter_tokens` with the loop engine, from `buffer` (not scanned yet)"
+    searched = 0  # the buffer before has no token boundary
+    while True:
+        chunk = next(chunks, None)
+        if chunk is None:
+            break
+        buffer += chunk
+        if at_start:
+            buffer = buffer.lstrip()
+            at_start = not buffer
+        cut = _last_boundary(buffer, searched)
+        if cut:
+            yield from _scan_loop(buffer[:cut], names)
+            buffer = buffer[cut:]
+        searched = len(buffer)
+    yield from _scan_loop(buffer.strip() if at_start else buffer.rstrip(), names)
+
+
+def _last_boundary(buffer: str, start: int) -> int:
+    """
+    The last position of the buffer (from `start`) between two tokens, 0 if none: a
+    space or a newline (which the loop skips) after a char which is not whitespace
+    (`strip()` may drop it at the end of the source) and can't be in a string (the
+    space could be its closing char)
+    """
+    for idx in range(len(buffer) - 1, max(start, 1) - 1, -1):
+        if buffer[idx] in " \n":
+            before = buffer[idx - 1]
+            if not (before == '"' or before.isalpha() or before.isspace()):
+                return idx
+    return 0
+
+
+def _iter_text_chunks(stream: TokenSource, chunk_size: int) -> Iterator[str]:
+    if isinstance(stream, bytes | bytearray | memoryview | mmap.mmap):
+        view = memoryview(stream)
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        for head in range(0, len(view), chunk_size):
+            yield decoder.decode(view[head : head + chunk_size])
+        yield decoder.decode(b"", final=True)
+        return
+
+    decoder = None
+    while chunk := stream.read(chunk_size):
+        if isinstance(chunk, str):
+            yield chunk
+        else:
+            # binary stream
+            decoder = decoder or codecs.getincrementaldecoder("utf-8")()
+            yield decoder.decode(chunk)
+    if decoder is not None:
+        yield decoder.decode(b"", final=True)
+
+
+def _raise_scan_error(rest: str, offset: int):
+    # let the loop scanner raise its (more detailed) error
+    scan(rest)
+    raise ValueError(f"Unexpected character at offset {offset}: {rest[0]!r}")
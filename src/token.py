@@ -6,11 +6,18 @@ class TokenKind(Enum):
     PLUS = "+"
     MINUS = "-"
     SLASH = "/"
+    EQUAL = "="
     #
-    # TODO: add other 'basic' built-ins: list, car/cdr, first, lambda
+    # TODO: add other 'basic' built-ins: first
     QUOTE = "quote"
     QUOTE_ABR = "'"
     CONS = "cons"
+    CAR = "car"
+    CDR = "cdr"
+    LIST = "list"
+    LAMBDA = "lambda"
+    IF = "if"
+    DEFUN = "defun"
     #
     NIL = "nil"
     TRUE = "t"
@@ -27,8 +34,16 @@ class TokenKind(Enum):
 LispValue = str | int | float | bool | None
 
 
-@dataclass
+@dataclass(slots=True)
 class Token:
     kind: TokenKind
     lexeme: str  # from the source
     literal: LispValue  # not every token is a literal / has a literal _value_
+
+
+# Tokens fully determined by their kind, shared by every occurrence (never mutate them)
+SINGLETON_TOKENS: dict[TokenKind, Token] = {
+    kind: Token(kind=kind, lexeme=kind.value, literal=None)
+    for kind in TokenKind
+    if kind not in {TokenKind.STRING, TokenKind.NUMBER, TokenKind.SYMBOL}
+}
@@ -0,0 +1,155 @@
+import mmap
+import re
+from array import array
+from collections.abc import Iterator, Sequence
+from typing import overload
+
+from .scanner import (
+    _MASTER_PATTERN,
+    KEYWORD_TOKEN_KINDS,
+    _raise_scan_error,
+    _strip_bounds,
+)
+from .token import SINGLETON_TOKENS, LispValue, Token, TokenKind
+
+TokenStreamSource = str | bytes | bytearray | memoryview | mmap.mmap
+
+# the master pattern of the regex engine, for bytes sources
+_MASTER_PATTERN_BYTES = re.compile(_MASTER_PATTERN.pattern.encode(), re.VERBOSE)
+
+_ALL_KINDS: list[TokenKind] = list(TokenKind)
+_KIND_CODES: dict[TokenKind, int] = {kind: code for code, kind in enumerate(_ALL_KINDS)}
+
+# kind code of the tokens of each group of the master pattern, except KEYWORD and ERROR
+_GROUP_KIND_CODES: dict[str, int] = {
+    kind.name: _KIND_CODES[kind]
+    for kind in (
+        TokenKind.LEFT_PAREN,
+        TokenKind.RIGHT_PAREN,
+        TokenKind.NUMBER,
+        TokenKind.STRING,
+        TokenKind.TRUE,
+        TokenKind.QUOTE_ABR,
+        TokenKind.SLASH,
+        TokenKind.PLUS,
+        TokenKind.MINUS,
+        TokenKind.EQUAL,
+        TokenKind.SYMBOL,
+    )
+}
+
+# kind code of each keyword, as matched in a str or in a bytes source
+_KEYWORD_KIND_CODES: dict[str | bytes, int] = {}
+for _keyword in KEYWORD_TOKEN_KINDS:
+    _KEYWORD_KIND_CODES[_keyword.value] = _KEYWORD_KIND_CODES[
+        _keyword.value.encode()
+    ] = _KIND_CODES[_keyword]
+
+
+class TokenStream(Sequence[Token]):
+    """
+    Columnar tokens: parallel arrays of token kinds and of start/end offsets into the
+    source, which is kept as is (a bytes-like source is only wrapped in a memoryview,
+    so e.g. a mmap can't be closed while the stream is alive).
+
+    Tokens are rebuilt on access, so a `Parser` can consume a TokenStream like a list
+    of tokens. Literals are decoded from the source span of their token on access
+    (no copy of the lexemes is kept around).
+    """
+
+    __slots__ = ("_names", "ends", "kinds", "source", "starts")
+
+    def __init__(self, source: TokenStreamSource):
+        "Scan the source, which should be ASCII (like for the regex engine of `scan`)"
+        if isinstance(source, str):
+            if not source.isascii():
+                raise ValueError("Only ASCII sources can be scanned to a TokenStream")
+            self.source: str | memoryview = source
+            pattern = _MASTER_PATTERN
+        else:
+            self.source = memoryview(source)
+            pattern = _MASTER_PATTERN_BYTES
+
+        self.kinds = array("B")  # codes of the token kinds, see `_ALL_KINDS`
+        self.starts = array("q")  # offset of the first character of each token
+        self.ends = array("q")  # offset right after the last character of each token
+        self._names: dict[
+            str, str
+        ] = {}  # the symbol names decoded, see `_scan_loop` of the scanner
+
+        start, end = _strip_bounds(self.source)
+        for m in pattern.finditer(self.source, start, end):
+            group = m.lastgroup
+            if group == "KEYWORD":
+                kind_code = _KEYWORD_KIND_CODES[m[group]]
+            elif group == "ERROR":
+                offset = m.start(group)
+                _raise_scan_error(self._text(offset, len(self.source)), offset)
+            else:
+                kind_code = _GROUP_KIND_CODES[group]
+            self.kinds.append(kind_code)
+            self.starts.append(m.start(group))
+            self.ends.append(m.end(group))
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    @overload
+    def __getitem__(self, idx: int) -> Token: ...
+    @overload
+    def __getitem__(self, idx: slice) -> list[Token]: ...
+    def __getitem__(self, idx: int | slice) -> Token | list[Token]:
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+
+        kind = _ALL_KINDS[self.kinds[idx]]
+        if kind in SINGLETON_TOKENS:
+            return SINGLETON_TOKENS[kind]
+
+        lexeme = self.lexeme(idx)
+        return Token(
+            kind=kind, lexeme=lexeme, literal=_decode_literal(kind, lexeme, self._names)
+        )
+
+    def __iter__(self) -> Iterator[Token]:
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def kind(self, idx: int) -> TokenKind:
+        return _ALL_KINDS[self.kinds[idx]]
+
+    def span(self, idx: int) -> tuple[int, int]:
+        "Offsets of the token in the source: source[start:end] is its lexeme"
+        return self.starts[idx], self.ends[idx]
+
+    def lexeme(self, idx: int) -> str:
+        return self._text(self.starts[idx], self.ends[idx])
+
+    def line_col(self, idx: int) -> tuple[int, int]:
+        "Line and column (both starting at 1) of the token in the source, for error messages"
+        start = self.starts[idx]
+        before = self._text(0, start)
+        return before.count("\n") + 1, start - before.rfind("\n")
+
+    def _text(self, start: int, end: int) -> str:
+        if isinstance(self.source, str):
+            return self.source[start:end]
+        return bytes(self.source[start:end]).decode()
+
+
+def _decode_literal(kind: TokenKind, lexeme: str, names: dict[str, str]) -> LispValue:
+    "Literal of a token from its lexeme, like the scanner computes it"
+    match kind:
+        case TokenKind.NUMBER:
+            if "." not in lexeme:
+                return int(lexeme)
+            elif lexeme.endswith("."):
+                return int(lexeme[:-1])  # like in '3.' -> view it as an int
+            else:
+                return float(lexeme)
+        case TokenKind.STRING:
+            return lexeme[1:-1]  # NOTE: the last char is whatever closed the string
+        case TokenKind.SYMBOL:
+            return names.setdefault(lexeme, lexeme)
+        case _:
+            return None
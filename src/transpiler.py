@@ -0,0 +1,222 @@
+"""
+Expressions transpiled to Python source, compiled by CPython to its own bytecode.
+
+`(/ (+ 5 1) (- 4 2))` becomes straight-line code, one statement per call, in the
+evaluation order of `evaluate`:
+
+    def transpiled(c0, c1, c2, c3):
+        _budget = _current_budget()
+        if _budget is not None:
+            _budget.charge(9, 0)
+        v2 = _sum((float(c0), float(c1)))
+        v5 = c2 - c3
+        v6 = v2
+        if v5 == 0:
+            _zero_divisor(v5)
+        v6 /= v5
+        return v6
+
+The literals are not in the source: they are the arguments of the function (so are the
+data of the quotes, and the forms left to `evaluate`). The source only depends on the
+shape of the AST, the "plan" below: its code object is cached with the plan as key
+(hashed like any tuple), and shared by all the expressions of the same shape (e.g. the
+same program with other numbers).
+"""
+
+from collections import OrderedDict
+from functools import partial
+from types import CodeType, FunctionType
+
+from .budget import current_budget
+from .cache import CacheStats
+from .compiler import ARITHMETIC_TOKEN_KINDS, Compiled, returns_number
+from .cons import Cons
+from .eval import evalate_single_op, evaluate, quoted_cells
+from .parser import SPECIAL_FORM_TOKEN_KINDS, Atom, Expression, Operator
+from .token import TokenKind
+
+# most code objects kept, the least recently used are dropped first
+CODE_CACHE_SIZE = 256
+
+# the code of the last plans transpiled (see `_plan`), by plan
+_code_cache: OrderedDict[tuple, CodeType] = OrderedDict()
+code_cache_stats = CacheStats()
+
+
+def transpile(expression: Expression) -> Compiled:
+    """
+    Turn an expression into a Python function, so that it can be evaluated many times
+    at the speed of CPython's own bytecode.
+
+    Calling the result gives the same value as `evaluate(expression)`, and raises the
+    same errors at the same point, like `compiler.compile`: the arithmetic on arguments
+    known to be numbers is plain Python arithmetic (`+` through `sum` of floats, for its
+    exact semantics, `/` with a check of each divisor), `cons` builds its pair, and the
+    other operators go through `evalate_single_op`. The budget is charged like
+    `compiler.compile` does (see budget.py).
+    """
+    plan, constants = _plan(expression)
+    code = _code_cache.get(plan)
+    if code is not None:
+        _code_cache.move_to_end(plan)
+        code_cache_stats.hits += 1
+    else:
+        code_cache_stats.misses += 1
+        code = _compile_plan(plan, len(constants))
+        _code_cache[plan] = code
+        if len(_code_cache) > CODE_CACHE_SIZE:
+            _code_cache.popitem(last=False)
+            code_cache_stats.evictions += 1
+    return partial(FunctionType(code, _NAMESPACE), *constants)
+
+
+def transpile_source(expression: Expression) -> str:
+    "The Python source of the expression, as `transpile` compiles it"
+    plan, constants = _plan(expression)
+    return _source(plan, len(constants))
+
+
+def clear_code_cache():
+    _code_cache.clear()
+
+
+# the globals of the transpiled functions
+_NAMESPACE: dict[str, object] = {
+    "__builtins__": {"float": float},
+    "_Cons": Cons,
+    "_apply": evalate_single_op,
+    "_current_budget": current_budget,
+    "_evaluate": evaluate,
+    "_sum": sum,
+}
+
+
+def _zero_divisor(divisor: object):
+    raise ValueError(f"Invalid argument. Divisor should not be 0: {divisor}")
+
+
+_NAMESPACE["_zero_divisor"] = _zero_divisor
+
+# The plan of an expression: its nodes in evaluation order (post-order), one entry
+# each, which refers to the constants and to the entries of its arguments by index:
+# - (CONST, c): the constant c, the literal of an atom
+# - (EVAL, c): `evaluate` of the constant c (symbols, special forms, malformed forms...)
+# - (APPLY, c, args): the operator token c applied to the entries args, with its checks
+# - (ADD | SUB | DIV, args): arithmetic on at least one number
+# - (CONS, car, cdr)
+# - (QUOTE, c, cells): the constant c, the data of a quote of that many cells
+CONST, EVAL, APPLY, ADD, SUB, DIV, CONS, QUOTE = range(8)
+
+_ARITHMETIC_ENTRIES = {TokenKind.PLUS: ADD, TokenKind.MINUS: SUB, TokenKind.SLASH: DIV}
+
+
+def _plan(expression: Expression) -> tuple[tuple, list]:
+    "The plan of the expression and its constants. Uses an explicit stack: any depth"
+    plan: list[tuple] = []
+    constants: list = []
+    # (expression, whether its arguments are planned), and the entries of the arguments
+    # planned so far, innermost call last
+    todo: list[tuple[Expression, bool]] = [(expression, False)]
+    args_entries: list[list[int]] = [[]]
+    while todo:
+        expr, args_planned = todo.pop()
+        if args_planned:
+            args = tuple(args_entries.pop())
+            op = expr[0].op
+            if (
+                op.kind in ARITHMETIC_TOKEN_KINDS
+                and args
+                and all(map(returns_number, expr[1:]))
+            ):
+                plan.append((_ARITHMETIC_ENTRIES[op.kind], args))
+            elif op.kind == TokenKind.CONS and len(args) == 2:
+                plan.append((CONS, *args))
+            else:
+                constants.append(op)
+                plan.append((APPLY, len(constants) - 1, args))
+        else:
+            match expr:
+                case Atom(kind=kind, literal=literal) if kind != TokenKind.SYMBOL:
+                    constants.append(literal)
+                    plan.append((CONST, len(constants) - 1))
+                case [Operator(op=op), *raw_args] if (
+                    op.kind not in SPECIAL_FORM_TOKEN_KINDS
+                ):
+                    todo.append((expr, True))
+                    todo.extend((arg, False) for arg in reversed(raw_args))
+                    args_entries.append([])
+                    continue
+                case [Operator(op=op), quoted] if op.kind == TokenKind.QUOTE:
+                    # NOTE: converted once: cells are never mutated, so they can be shared.
+                    # Still charged at each call, like `evaluate` does
+                    data, n_cells = quoted_cells(quoted)
+                    constants.append(data)
+                    plan.append((QUOTE, len(constants) - 1, n_cells))
+                case _:
+                    # symbols (looked up in the globals), lambda, if, defun, function
+                    # calls, a lone operator or a malformed list: `evaluate` runs them
+                    # (or raises the right error)
+                    constants.append(expr)
+                    plan.append((EVAL, len(constants) - 1))
+        args_entries[-1].append(len(plan) - 1)
+    return tuple(plan), constants
+
+
+def _source(plan: tuple, n_constants: int) -> str:
+    params = ", ".join(f"c{index}" for index in range(n_constants))
+    lines = [f"def transpiled({params}):"]
+    steps = allocations = 0
+    names: list[str] = []  # of the values of the entries
+    for index, entry in enumerate(plan):
+        kind, name = entry[0], f"v{index}"
+        if kind == CONST:
+            name = f"c{entry[1]}"
+        elif kind == QUOTE:
+            name = f"c{entry[1]}"
+            allocations += entry[2]
+        elif kind == EVAL:
+            lines.append(f"    {name} = _evaluate(c{entry[1]})")
+        elif kind == APPLY:
+            _, constant, args = entry
+            items = ", ".join(names[arg] for arg in args)
+            lines.append(f"    {name} = _apply(c{constant}, [{items}])")
+        elif kind == CONS:
+            _, car, cdr = entry
+            lines.append(f"    {name} = _Cons({names[car]}, {names[cdr]})")
+            steps, allocations = steps + 3, allocations + 1
+        else:  # ADD, SUB, DIV
+            args = entry[1]
+            steps += len(args) + 1
+            if kind == ADD:
+                # NOTE: always through `sum`, to keep its exact float semantics
+                items = ", ".join(f"float({names[arg]})" for arg in args)
+                comma = "," if len(args) == 1 else ""
+                lines.append(f"    {name} = _sum(({items}{comma}))")
+            elif len(args) == 1:
+                name = names[args[0]]  # the value is left as is
+            elif kind == SUB:
+                # NOTE: one statement per term, a long `a - b - c...` is too deep for
+                # CPython's compiler
+                lines.append(f"    {name} = {names[args[0]]} - {names[args[1]]}")
+                lines.extend(f"    {name} -= {names[arg]}" for arg in args[2:])
+            else:
+                lines.append(f"    {name} = {names[args[0]]}")
+                for arg in args[1:]:
+                    lines.append(f"    if {names[arg]} == 0:")
+                    lines.append(f"        _zero_divisor({names[arg]})")
+                    lines.append(f"    {name} /= {names[arg]}")
+        names.append(name)
+    if steps or allocations:
+        lines[1:1] = [
+            "    _budget = _current_budget()",
+            "    if _budget is not None:",
+            f"        _budget.charge({steps}, {allocations})",
+        ]
+    lines.append(f"    return {names[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+def _compile_plan(plan: tuple, n_constants: int) -> CodeType:
+    module = compile(_source(plan, n_constants), "<transpiled>", "exec")
+    # NOTE: the module only defines the function: its code is one of the constants
+    return next(const for const in module.co_consts if type(const) is CodeType)
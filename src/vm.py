@@ -0,0 +1,182 @@
+from array import array
+from dataclasses import dataclass, field
+from enum import IntEnum
+
+from .budget import current_budget
+from .compiler import returns_number
+from .cons import Cons
+from .eval import evalate_single_op, evaluate, quoted_data
+from .parser import SPECIAL_FORM_TOKEN_KINDS, Atom, Expression, Operator
+from .token import LispValue, TokenKind
+
+
+class Opcode(IntEnum):
+    PUSH_CONST = 0  # push constants[arg]
+    QUOTE_CONST = 1  # push the data of constants[arg], a quoted expression
+    # NOTE: the arithmetic opcodes take arg >= 1 values statically known to be numbers
+    ADD_N = 2  # pop arg numbers, push their sum
+    SUB_N = 3  # pop arg numbers, push the first minus the others
+    DIV_N = 4  # pop arg numbers, push the first divided by the others
+    CONS = 5  # pop 2 values, push the pair
+    CALL = 6  # constants[arg] is (operator token, n): pop n values, apply the operator (with all its checks)
+    EVAL_CONST = 7  # push `evaluate(constants[arg])`, for forms the VM does not handle (e.g. malformed ones)
+
+
+# the values of the opcodes, as plain ints for the dispatch loop
+PUSH_CONST, QUOTE_CONST, ADD_N, SUB_N, DIV_N, CONS, CALL, EVAL_CONST = map(int, Opcode)
+
+
+@dataclass(slots=True)
+class Program:
+    """
+    Bytecode of an expression: a flat array of (opcode, arg) pairs, run on a value stack.
+    The instructions follow the evaluation order: the arguments of a call, then the call.
+    """
+
+    code: array = field(default_factory=lambda: array("i"))
+    constants: list = field(default_factory=list)
+    # steps and allocations of the instructions which don't go through
+    # `evalate_single_op`, once computed by `static_cost`
+    cost: tuple[int, int] | None = field(default=None, compare=False, repr=False)
+
+    def emit(self, opcode: Opcode, arg: int = 0):
+        self.code.append(opcode)
+        self.code.append(arg)
+
+    def add_constant(self, value: object) -> int:
+        self.constants.append(value)
+        return len(self.constants) - 1
+
+
+def compile_program(expression: Expression) -> Program:
+    "From an AST to bytecode. Uses an explicit stack, like the VM, so any depth is fine"
+    program = Program()
+    # (expression, whether its arguments have already been emitted)
+    todo: list[tuple[Expression, bool]] = [(expression, False)]
+    while todo:
+        expr, args_emitted = todo.pop()
+        if args_emitted:
+            _emit_call(program, expr)
+            continue
+
+        match expr:
+            case Atom(kind=kind, literal=literal) if kind != TokenKind.SYMBOL:
+                program.emit(Opcode.PUSH_CONST, program.add_constant(literal))
+            case [Operator(op=op), *raw_args] if (
+                op.kind not in SPECIAL_FORM_TOKEN_KINDS
+            ):
+                todo.append((expr, True))
+                todo.extend((arg, False) for arg in reversed(raw_args))
+            case [Operator(op=op), quoted] if op.kind == TokenKind.QUOTE:
+                program.emit(Opcode.QUOTE_CONST, program.add_constant(quoted))
+            case _:
+                # symbols (looked up in the globals), lambda, if, defun, function calls,
+                # a lone operator or a malformed list: `evaluate` runs them (or raises
+                # the right error)
+                program.emit(Opcode.EVAL_CONST, program.add_constant(expr))
+    return program
+
+
+def _emit_call(program: Program, call: list[Expression]):
+    op, raw_args = call[0].op, call[1:]
+    numbers = bool(raw_args) and all(map(returns_number, raw_args))
+    match op.kind:
+        case TokenKind.PLUS if numbers:
+            program.emit(Opcode.ADD_N, len(raw_args))
+        case TokenKind.MINUS if numbers:
+            program.emit(Opcode.SUB_N, len(raw_args))
+        case TokenKind.SLASH if numbers:
+            program.emit(Opcode.DIV_N, len(raw_args))
+        case TokenKind.CONS if len(raw_args) == 2:
+            program.emit(Opcode.CONS)
+        case _:
+            program.emit(Opcode.CALL, program.add_constant((op, len(raw_args))))
+
+
+def static_cost(program: Program) -> tuple[int, int]:
+    """
+    The steps and allocations of the arithmetic and CONS instructions, which `run`
+    charges at once to the budget: CALL charges its operator as it runs (see budget.py)
+    """
+    if program.cost is None:
+        steps = allocations = 0
+        code = iter(program.code)
+        for opcode, arg in zip(code, code):
+            if opcode in (ADD_N, SUB_N, DIV_N):
+                steps += arg + 1
+            elif opcode == CONS:
+                steps += 3
+                allocations += 1
+        program.cost = (steps, allocations)
+    return program.cost
+
+
+def run(program: Program) -> LispValue | list:
+    "Evaluate the program, same value (and errors) as `evaluate` on its expression"
+    budget = current_budget()
+    if budget is not None:
+        budget.charge(*static_cost(program))
+    constants = program.constants
+    stack: list = []
+    push, pop = stack.append, stack.pop
+
+    code = iter(program.code)
+    for opcode, arg in zip(code, code):
+        if opcode == PUSH_CONST:
+            push(constants[arg])
+        elif opcode == ADD_N:
+            args = stack[-arg:]
+            del stack[-arg:]
+            push(sum([float(value) for value in args]))
+        elif opcode == SUB_N:
+            if arg == 2:
+                term = pop()
+                stack[-1] -= term
+            elif arg > 2:
+                terms = stack[-arg + 1 :]
+                del stack[-arg + 1 :]
+                for term in terms:
+                    stack[-1] -= term
+            # NOTE: with a single argument, the value is left as is
+        elif opcode == DIV_N:
+            if arg > 1:
+                divisors = stack[-arg + 1 :]
+                del stack[-arg + 1 :]
+                for divisor in divisors:
+                    if divisor == 0:
+                        raise ValueError(
+                            f"Invalid argument. Divisor should not be 0: {divisor}"
+                        )
+                    stack[-1] /= divisor
+        elif opcode == CONS:
+            cdr = pop()
+            stack[-1] = Cons(stack[-1], cdr)
+        elif opcode == CALL:
+            op, n_args = constants[arg]
+            args = stack[len(stack) - n_args :]
+            del stack[len(stack) - n_args :]
+            push(evalate_single_op(op, args))
+        elif opcode == QUOTE_CONST:
+            # NOTE: the constant stays an expression, which the parse cache can store
+            push(quoted_data(constants[arg]))
+        else:  # EVAL_CONST
+            push(evaluate(constants[arg]))
+
+    return stack.pop()
+
+
+def disassemble(program: Program) -> str:
+    "One line per instruction: offset, opcode, arg (and the constant it refers to)"
+    lines = []
+    for pc in range(0, len(program.code), 2):
+        opcode, arg = Opcode(program.code[pc]), program.code[pc + 1]
+        line = f"{pc // 2:>6} {opcode.name:<12} {arg:>6}"
+        if opcode in {
+            Opcode.PUSH_CONST,
+            Opcode.QUOTE_CONST,
+            Opcode.CALL,
+            Opcode.EVAL_CONST,
+        }:
+            line += f"  ({program.constants[arg]!r})"
+        lines.append(line)
+    return "\n".join(lines)
@@ -0,0 +1,73 @@
+import pytest
+
+from src import Parser, evaluate, evaluate_batch, scan
+from src.eval import EVALUATION_ERRORS
+from src.parser import Expression
+
+
+def parse(source: str) -> Expression:
+    return Parser(tokens=scan(source)).parse()
+
+
+def error_of(fn) -> tuple[type, str] | None:
+    try:
+        fn()
+    except EVALUATION_ERRORS as error:
+        return type(error), str(error)
+    return None
+
+
+# (template, columns): the rows are the same source with the values of the row
+CASES = [
+    # row 0: an addition of a string, row 1: a zero divisor, in an earlier argument
+    ("(+ (/ 1 {y}) (- {x}))", {"x": ['"a"', 1], "y": [1, 0]}),
+    ("(+ (/ 1 {y}) (- {x}))", {"x": [1, '"a"', 2], "y": [2, 1, 0]}),
+    ("(list (car {x}) (/ {y} {y}))", {"x": ["(list 1)", 2, 3], "y": [1, 1, 0]}),
+    ("(- (cons {x} {y}) (+ {y} {x}))", {"x": [1, 2], "y": ['"b"', 3]}),
+    ("(/ {x} {y} (- {x} 1))", {"x": [1, 2, 0], "y": [1, 0, 1]}),
+]
+
+
+@pytest.mark.parametrize("template, columns", CASES)
+def test_error_of_the_first_failing_row(template: str, columns: dict[str, list]):
+    "The error of `evaluate` on the first row which raises, whatever the other rows"
+    n_rows = len(next(iter(columns.values())))
+    rows = [
+        {name: values[row] for name, values in columns.items()} for row in range(n_rows)
+    ]
+    expected = next(
+        error
+        for row in rows
+        if (error := error_of(lambda row=row: evaluate(parse(template.format(**row)))))
+    )
+    values = {
+        name: [evaluate(parse(str(value))) for value in column]
+        for name, column in columns.items()
+    }
+    expr = parse(template.replace("{", "").replace("}", ""))
+    assert error_of(lambda: evaluate_batch(expr, values)) == expected
+
+
+# (template, columns), with forms which use the columns under special forms and calls
+VALUE_CASES = [
+    ("(if {x} {y} 0)", {"x": [1, "nil", "t"], "y": [10, 20, 30]}),
+    ("((lambda (a) a) {x})", {"x": [1, 2.5, '"s"']}),
+    ("(+ 1 ((lambda (x) (+ x 1)) 5) {x})", {"x": [1, 2]}),  # x shadowed in the lambda
+    ("(cons ((lambda (a b) (- a b)) {x} {y}) '(x y))", {"x": [5, 7], "y": [1, 2]}),
+    ("(list (if (= {x} 1) {x} (list {y})) (+ {x} {y}))", {"x": [1, 2], "y": [3, 4]}),
+]
+
+
+@pytest.mark.parametrize("template, columns", VALUE_CASES)
+def test_same_values_as_evaluate(template: str, columns: dict[str, list]):
+    n_rows = len(next(iter(columns.values())))
+    rows = [
+        {name: values[row] for name, values in columns.items()} for row in range(n_rows)
+    ]
+    expected = [evaluate(parse(template.format(**row))) for row in rows]
+    values = {
+        name: [evaluate(parse(str(value))) for value in column]
+        for name, column in columns.items()
+    }
+    expr = parse(template.replace("{", "").replace("}", ""))
+    assert list(map(str, evaluate_batch(expr, values))) == list(map(str, expected))
@@ -0,0 +1,52 @@
+import json
+from dataclasses import asdict
+
+import pytest
+
+from bench import compare
+from bench.generators import WORKLOADS
+from bench.suite import StageResult, run_suite
+from src import Parser, evaluate_iterative, scan
+
+
+@pytest.mark.parametrize("workload", WORKLOADS)
+def test_workloads_are_deterministic_and_evaluate(workload: str):
+    generate = WORKLOADS[workload]
+    source = generate(50)
+    assert generate(50) == source and generate(60) != source
+    evaluate_iterative(Parser(tokens=scan(source)).parse_iterative())
+
+
+def test_suite_times_every_stage():
+    results = run_suite([10], repeat=2, min_time=0, workloads=["deep_sum", "wide_list"])
+    assert len(results) == 2 * 6
+    assert all(result.error is None and len(result.times) == 2 for result in results)
+    assert {result.stage for result in results} >= {"scan", "parse", "evaluate"}
+
+
+def write_report(path, seconds: float, peak_bytes: int) -> str:
+    result = StageResult("deep_sum", 100, "scan", 1, [seconds], peak_bytes)
+    path.write_text(json.dumps({"results": [asdict(result)]}))
+    return str(path)
+
+
+@pytest.mark.parametrize(
+    "seconds, peak_bytes, status",
+    [
+        (1.05, 100_000, 0),  # under the threshold
+        (1.5, 100_000, 1),
+        (1.0, 200_000, 1),
+        (1.0, 3000, 0),  # small peaks are not compared
+    ],
+)
+def test_compare_flags_regressions(
+    tmp_path, monkeypatch, seconds: float, peak_bytes: int, status: int
+):
+    base = write_report(
+        tmp_path / "base.json", 1.0, 100_000 if peak_bytes > 4096 else 1000
+    )
+    new = write_report(tmp_path / "new.json", seconds, peak_bytes)
+    monkeypatch.setattr("sys.argv", ["compare.py", base, new])
+    with pytest.raises(SystemExit) as exit_:
+        compare.main()
+    assert exit_.value.code == status
@@ -0,0 +1,48 @@
+from functools import partial
+
+import pytest
+
+from src import Parser, evaluate, evaluate_iterative, evaluate_memoized, scan
+from src.budget import Budget
+from src.compiler import compile
+from src.transpiler import transpile
+from src.vm import compile_program, run
+
+# each engine turns the expression into a function to call, run twice
+ENGINES = {
+    "evaluate": lambda expr: lambda: evaluate(expr),
+    "evaluate_iterative": lambda expr: lambda: evaluate_iterative(expr),
+    "evaluate_memoized": lambda expr: lambda: evaluate_memoized(expr),
+    "compile": compile,
+    "vm": lambda expr: partial(run, compile_program(expr)),
+    "transpile": transpile,
+}
+
+SOURCES = [
+    "'(1 2 (3 4))",
+    "'()",
+    "'apple",
+    "(cons '(1 2) (list 3 '(4) '(5 6)))",
+    "(+ (car '(1 2)) (car (cdr (list 3 4))))",
+    "(list (list) (list 1) '(1 (2 (3))))",
+    "(cons (cons 1 2) (quote (a b c)))",
+    "((lambda (x) (cons x '(1 2))) '(3))",
+]
+
+
+def charged(fn) -> tuple[int, int]:
+    with Budget() as budget:
+        fn()
+    return budget.steps, budget.allocations
+
+
+@pytest.mark.parametrize("source", SOURCES)
+def test_engines_charge_the_same(source: str):
+    counts = {}
+    for name, engine in ENGINES.items():
+        # NOTE: a new AST each time, so that no engine sees the quotes converted already
+        fn = engine(Parser(tokens=scan(source)).parse())
+        counts[name] = (charged(fn), charged(fn))
+    assert len(set(counts.values())) == 1, counts
+    first, again = counts["evaluate"]
+    assert first == again
@@ -0,0 +1,122 @@
+import os
+import time
+
+import pytest
+
+from bench.generators import deep_quoted_list, deep_sum, quote_heavy, string_heavy
+from src import Parser, scan
+from src.cache import ParseCache, decode_expression, encode_expression
+from src.vm import compile_program, run
+
+SOURCES = [
+    '(+ 1 2.5) (list "abc" nil t) \'(a (b c))',
+    "(car (cons 1 '(2 3))) (/ 7 2) (quote (1 2))",
+    deep_sum(50),
+    string_heavy(20),
+    quote_heavy(20),
+]
+
+
+def parse_all(source: str) -> list:
+    return Parser(tokens=scan(source)).parse_all()
+
+
+def test_hits_and_misses(tmp_path):
+    cache = ParseCache(tmp_path)
+    cache.parse(SOURCES[0])
+    cache.parse(SOURCES[0])
+    cache.parse(SOURCES[1])
+    assert (cache.stats.hits, cache.stats.misses) == (1, 2)
+
+    # a parsed entry has no bytecode yet: a hit, then the bytecode is stored with it
+    cache.compile(SOURCES[0])
+    cache.compile(SOURCES[0])
+    assert (cache.stats.hits, cache.stats.misses) == (3, 2)
+    assert len(list(tmp_path.glob("*.bin"))) == 2
+
+
+@pytest.mark.parametrize("source", SOURCES)
+def test_round_trip(tmp_path, source: str):
+    ParseCache(tmp_path).compile(source)
+    cache = ParseCache(tmp_path)  # a new run: from the files
+    forms, programs = cache.compile(source)
+    assert cache.stats.hits == 1
+    assert forms == parse_all(source)
+    assert [run(program) for program in programs] == [
+        run(compile_program(form)) for form in forms
+    ]
+
+
+def test_any_depth_encoded():
+    expr = Parser(tokens=scan(deep_quoted_list(5000))).parse_iterative()
+    encoded = encode_expression(expr)
+    # NOTE: the encodings are compared, `==` on the nested lists would recurse
+    assert encode_expression(decode_expression(encoded)) == encoded
+
+
+@pytest.mark.parametrize("content", [b"", b"garbage", b"\xe9\x00\x01"])
+def test_corrupt_entry_is_a_miss(tmp_path, content: bytes):
+    source = SOURCES[0]
+    ParseCache(tmp_path).parse(source)
+    (entry,) = tmp_path.glob("*.bin")
+    entry.write_bytes(content)
+
+    cache = ParseCache(tmp_path)
+    assert cache.parse(source) == parse_all(source)
+    assert (cache.stats.hits, cache.stats.misses) == (0, 1)
+    assert entry.read_bytes() != content  # stored again
+    assert ParseCache(tmp_path).parse(source) == parse_all(source)
+
+
+def test_stale_entries_are_misses(tmp_path, monkeypatch):
+    source = SOURCES[0]
+    cache = ParseCache(tmp_path)
+    cache.parse(source)
+    (entry,) = tmp_path.glob("*.bin")
+    entry.unlink()  # e.g. removed by another run
+    assert cache.parse(source) == parse_all(source)
+    assert (cache.stats.hits, cache.stats.misses) == (0, 2)
+
+    # the entries of another version of the interpreter are never read
+    monkeypatch.setattr("src.cache.CACHE_FORMAT_VERSION", -1)
+    cache = ParseCache(tmp_path)
+    cache.parse(source)
+    assert (cache.stats.hits, cache.stats.misses) == (0, 1)
+    assert len(list(tmp_path.glob("*.bin"))) == 2
+
+
+def test_least_recently_used_evicted(tmp_path):
+    sizes = []
+    for source in SOURCES[:3]:
+        probe = ParseCache(tmp_path / "probe")
+        probe.parse(source)
+        sizes.append(probe._total_bytes)
+        probe.clear()
+
+    # room for the first entry and one of the others
+    cache = ParseCache(tmp_path, max_bytes=sizes[0] + max(sizes[1:]))
+    cache.parse(SOURCES[0])
+    cache.parse(SOURCES[1])
+    cache.parse(SOURCES[0])  # now the most recently used
+    cache.parse(SOURCES[2])
+    assert cache.stats.evictions == 1
+    assert cache._total_bytes <= cache.max_bytes
+    assert cache.key(SOURCES[1]) not in cache._entries
+    assert not cache._path(cache.key(SOURCES[1])).exists()
+
+    # the order survives across runs, by the mtimes of the entries (set back in time
+    # here, as writes in the same clock tick get the same mtime)
+    keys = [cache.key(SOURCES[0]), cache.key(SOURCES[2])]
+    for age, key in enumerate(reversed(keys), 1):
+        os.utime(cache._path(key), (time.time() - age, time.time() - age))
+    assert list(ParseCache(tmp_path)._index()) == keys
+    ParseCache(tmp_path).parse(SOURCES[0])
+    assert list(ParseCache(tmp_path)._index()) == keys[::-1]
+
+
+def test_clear(tmp_path):
+    cache = ParseCache(tmp_path)
+    for source in SOURCES:
+        cache.parse(source)
+    cache.clear()
+    assert not list(tmp_path.glob("*.bin")) and cache._total_bytes == 0
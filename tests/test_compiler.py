@@ -0,0 +1,95 @@
+import random
+import re
+
+import pytest
+
+from bench.generators import (
+    arithmetic_chain,
+    deep_quoted_list,
+    deep_sum,
+    quote_heavy,
+    random_arithmetic,
+    string_heavy,
+    wide_list,
+    wide_sum,
+)
+from src import Parser, evaluate, scan
+from src.compiler import compile
+from src.eval import EVALUATION_ERRORS
+from src.parser import Expression
+from src.transpiler import transpile
+from src.vm import compile_program, run
+
+# the compiled engines, each called like `evaluate`
+ENGINES = {
+    "compile": lambda expr: compile(expr)(),
+    "vm": lambda expr: run(compile_program(expr)),
+    "transpile": lambda expr: transpile(expr)(),
+}
+
+
+def parse(source: str) -> Expression:
+    return Parser(tokens=scan(source)).parse()
+
+
+def outcome(engine, expr: Expression) -> tuple:
+    "The value of the expression (its type and how it prints), or its error"
+    try:
+        value = engine(expr)
+    except EVALUATION_ERRORS as error:
+        return ("error", type(error), str(error))
+    return ("value", type(value), str(value))
+
+
+def bench_sources() -> list[str]:
+    rng = random.Random(0)
+    return [
+        *(
+            random_arithmetic(depth, width, rng)
+            for depth, width in [(4, 3), (8, 2)] * 5
+        ),
+        arithmetic_chain(200),
+        deep_sum(100),
+        wide_sum(500),
+        deep_quoted_list(50),
+        wide_list(300),
+        string_heavy(100),
+        quote_heavy(100),
+    ]
+
+
+def error_sources() -> list[str]:
+    "Arithmetic trees with a literal replaced by a bad argument, so that they raise"
+    rng = random.Random(1)
+    sources = []
+    for bad in ["0", '"apple"', "nil", "t", "'(1)", "(car 1)", "(quote 1 2)"]:
+        for _ in range(10):
+            source = random_arithmetic(4, 3, rng)
+            literals = list(re.finditer(r"\d", source))
+            at = rng.choice(literals).start()
+            sources.append(source[:at] + bad + source[at + 1 :])
+    return sources
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_same_values_as_evaluate(engine: str):
+    for source in bench_sources():
+        expr = parse(source)
+        assert outcome(ENGINES[engine], expr) == outcome(evaluate, expr), source
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_same_errors_as_evaluate(engine: str):
+    n_errors = 0
+    for source in error_sources():
+        expr = parse(source)
+        expected = outcome(evaluate, expr)
+        assert outcome(ENGINES[engine], expr) == expected, source
+        n_errors += expected[0] == "error"
+    assert n_errors > 50  # most replacements break the tree
+
+
+def test_vm_any_depth():
+    depth = 20_000
+    expr = Parser(tokens=scan(deep_sum(depth))).parse_iterative()
+    assert run(compile_program(expr)) == depth + 1
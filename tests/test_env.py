@@ -0,0 +1,257 @@
+import pytest
+
+from src import Parser, evaluate, scan
+from src.cache import CacheStats
+from src.env import (
+    GLOBALS,
+    SYMBOLS,
+    Call,
+    CallCache,
+    Closure,
+    Defun,
+    Frame,
+    GlobalEnv,
+    GlobalRef,
+    If,
+    Lambda,
+    LocalRef,
+    Scope,
+    _call_key,
+    evaluate_resolved,
+    resolve,
+    set_call_cache,
+)
+
+
+def run(source: str) -> list:
+    return [evaluate(form) for form in Parser(tokens=scan(source)).parse_all()]
+
+
+@pytest.fixture(autouse=True)
+def globals_cleared():
+    yield
+    GLOBALS.clear()
+
+
+@pytest.fixture
+def cache():
+    cache = CallCache(capacity=4)
+    set_call_cache(cache)
+    yield cache
+    set_call_cache(None)
+
+
+def function(name: str) -> Closure:
+    closure = GLOBALS.value_of(name)
+    assert type(closure) is Closure
+    return closure
+
+
+@pytest.mark.parametrize(
+    "source, pure",
+    [
+        ("(defun f (x) (+ x 1))", True),
+        ("(defun f (x) (if (= x 0) 0 (f (- x 1))))", True),  # recursive
+        ("(defun g (x) (/ x 2)) (defun f (x) (g (car (list x))))", True),
+        ("(defun f (x) '(a b))", True),
+        ("(defun f (x) (defun g () 1))", False),
+        ("(defun f (x) (lambda (y) y))", False),
+        ("(defun f (x) ((lambda (y) y) x))", False),  # not a global function
+        ("(defun f (x) (h x))", False),  # not defined (yet)
+        # calls an impure one
+        ("(defun g (x) (defun h () 1)) (defun f (x) (g x))", False),
+    ],
+)
+def test_purity(cache: CallCache, source: str, pure: bool):
+    run(source)
+    assert cache.is_pure(function("f").function, GLOBALS) is pure
+
+
+def test_variables_of_enclosing_functions_are_impure(cache: CallCache):
+    run("(defun f (x) ((lambda (y) (+ x y)) 1))")
+    # the inner lambda reads `x` of `f`: it depends on more than its arguments
+    inner = function("f").function.body[0].items[0]
+    assert not cache.is_pure(inner, GLOBALS)
+
+
+def test_stats(cache: CallCache):
+    run("(defun f (x) (+ x 1))")
+    assert run("(f 1) (f 1) (f 2) (f 1.0) (f 1)") == [2, 2, 3, 2.0, 2]
+    # 1 and 1.0 are different arguments
+    assert cache.stats == CacheStats(hits=2, misses=3, evictions=0)
+    assert len(cache) == 3
+
+
+def test_least_recently_used_evicted(cache: CallCache):
+    run("(defun f (x) (+ x 1))")
+    run("(f 1) (f 2) (f 3) (f 4) (f 1) (f 5)")  # (f 2) is the oldest when (f 5) comes
+    assert cache.stats.evictions == 1 and len(cache) == 4
+    run("(f 1) (f 3) (f 4) (f 5)")
+    assert cache.stats.hits == 5
+    run("(f 2)")
+    assert cache.stats.misses == 6
+
+
+def test_defun_clears_the_cache(cache: CallCache):
+    run("(defun f (x) (+ x 1)) (f 1)")
+    run("(defun f (x) (+ x 2))")
+    assert len(cache) == 0
+    assert run("(f 1)") == [3]
+
+
+def test_lists_keyed_by_their_items(cache: CallCache):
+    run("(defun f (x) (car (cdr x)))")
+    assert run("(f (list 1 2)) (f (list 1 2)) (f (cons 1 (cons 2 nil)))") == [2] * 3
+    assert cache.stats.hits == 2
+    # other items, nesting or tail: other keys
+    run("(f (list 1 2.0)) (f (list (list 1) 2)) (f (cons 1 (cons 2 3)))")
+    assert cache.stats.hits == 2
+
+
+def test_call_keys():
+    run("(defun f (x y) x)")
+    f = function("f")
+    key = _call_key
+    nested = run('(list 1 (list 2 "a") nil)')[0]
+    assert key([f, nested, 3]) == key([f, run('(list 1 \'(2 "a") nil)')[0], 3])
+    assert key([f, nested, 3]) != key([f, run('(list 1 \'(2 "a"))')[0], 3])
+    # the end of a list is not the start of the next argument
+    assert key([f, run("(list 1)")[0], 2]) != key([f, run("(list 1 2)")[0]])
+    assert key([f, 0.0, 1]) != key([f, -0.0, 1]) != key([f, 0, True])
+
+
+def parse(source: str):
+    return Parser(tokens=scan(source)).parse()
+
+
+def addresses(expr) -> list[tuple[str, int, int] | tuple[str]]:
+    "The variables of a resolved expression, in order: (name, depth, index), or (name,)"
+    found, todo = [], [expr]
+    while todo:
+        expr = todo.pop()
+        kind = type(expr)
+        if kind is LocalRef:
+            found.append((SYMBOLS.names[expr.symbol], expr.depth, expr.index))
+        elif kind is GlobalRef:
+            found.append((SYMBOLS.names[expr.symbol],))
+        elif kind is Lambda:
+            todo += reversed(expr.body)
+        elif kind is Defun:
+            todo.append(expr.function)
+        elif kind is If:
+            todo += [expr.otherwise, expr.then, expr.test]
+        elif kind is Call:
+            todo += reversed(expr.items)
+        elif kind is list:
+            todo += reversed(expr)
+    return found
+
+
+@pytest.mark.parametrize(
+    "source, expected",
+    [
+        ("(+ b a c)", [("b", 0, 1), ("a", 1, 0), ("c",)]),
+        ("(list a (cons b '(a b)))", [("a", 1, 0), ("b", 0, 1)]),  # quoted: data
+        ("(car b)", [("b", 0, 1)]),  # the inner b shadows the outer one
+        ("b", [("b", 0, 1)]),
+    ],
+)
+def test_resolve_in_scopes(source: str, expected: list):
+    scope = Scope.of(["x", "b"], Scope.of(["a", "b"]))
+    assert addresses(resolve(parse(source), scope)) == expected
+
+
+@pytest.mark.parametrize(
+    "source, expected",
+    [
+        ("(lambda (a b) (+ b a c))", [("b", 0, 1), ("a", 0, 0), ("c",)]),
+        (
+            "(lambda (a b) (lambda (c) (lambda (a) (list a b c))))",
+            [("a", 0, 0), ("b", 2, 1), ("c", 1, 0)],
+        ),
+        ("(lambda (a a) a)", [("a", 0, 1)]),  # the last of duplicate names wins
+        (
+            "(defun f (n) (if (= n 0) n (f (- n 1))))",
+            [("n", 0, 0), ("n", 0, 0), ("f",), ("n", 0, 0)],
+        ),
+        (
+            "((lambda (x) ((lambda (y) (+ x y)) x)) 1)",
+            [("x", 1, 0), ("y", 0, 0), ("x", 0, 0)],
+        ),
+        ("(lambda (x) '(x y))", []),  # quoted data: not variables
+    ],
+)
+def test_resolve_addresses(source: str, expected: list):
+    assert addresses(resolve(parse(source))) == expected
+
+
+def test_duplicate_names():
+    "The last of duplicate names wins"
+    assert addresses(resolve(parse("a"), Scope.of(["a", "a"]))) == [("a", 0, 1)]
+
+
+def test_nodes_without_symbols_kept():
+    expr = parse("(+ (- 1 2) (list a 3) '(a))")
+    resolved = resolve(expr, Scope.of(["a"]))
+    assert resolved[1] is expr[1] and resolved[3] is expr[3]
+    assert resolved[2] is not expr[2]
+
+
+def test_same_values_as_evaluate():
+    "Without bindings, symbols are their names, like with `evaluate`"
+    for source in ["(+ 1 (/ 6 2))", "(list a '(b c) (car (cons x nil)))", "x"]:
+        expr = parse(source)
+        assert str(evaluate_resolved(resolve(expr))) == str(evaluate(expr))
+        assert str(evaluate_resolved(resolve(expr), env=GlobalEnv())) == str(
+            evaluate(expr)
+        )
+
+
+def test_evaluate_in_frames():
+    outer = Scope.of(["a", "b"])
+    expr = resolve(parse("(list a b (+ c 1) d)"), Scope.of(["b", "c"], outer))
+    assert addresses(expr) == [("a", 1, 0), ("b", 0, 0), ("c", 0, 1), ("d",)]
+    # the frames are laid out like the scopes; the others take their global values
+    frame = Frame(["inner b", 2], Frame(["a", "outer b"]))
+    env = GlobalEnv()
+    assert list(evaluate_resolved(expr, frame, env)) == ["a", "inner b", 3.0, "d"]
+    env.define("d", 4)
+    env.define("b", "global b")
+    assert list(evaluate_resolved(expr, frame, env)) == ["a", "inner b", 3.0, 4]
+
+
+def test_errors_like_evaluate():
+    expr = resolve(parse("(+ x 1)"), Scope.of(["x"]))
+    with pytest.raises(AssertionError, match="Addition"):
+        evaluate_resolved(expr, Frame(["one"]))
+
+
+def test_functions():
+    assert run("(defun add (a b) (+ a b)) (add 1 2) ((lambda (x) (- x 1)) 4)") == [
+        "add",
+        3.0,
+        3,
+    ]
+    assert type(GLOBALS.lookup(SYMBOLS.intern("add"))) is Closure
+    # closures keep the frame they were made in
+    assert run("(defun adder (n) (lambda (x) (+ x n))) ((adder 10) 5)")[1] == 15.0
+    assert run("(if nil 1) (if t 1 2) (if (= 1 2) 1 2)") == [None, 1, 2]
+
+
+def test_tail_calls_in_constant_stack():
+    n = 100_000  # deeper than any Python recursion
+    run("(defun count (n acc) (if (= n 0) acc (count (- n 1) (+ acc 1))))")
+    assert run(f"(count {n} 0)") == [n]
+
+
+@pytest.mark.parametrize(
+    "source, error",
+    [
+        ("((lambda (x) x))", "Invalid arguments"),
+        ("(f 1)", "Invalid function call"),
+        ("(1 2)", "Invalid function call"),
+    ],
+)
+def test_call_errors(source: str, error: str):
+    with pytest.raises(AssertionError, match=error):
+        run(source)
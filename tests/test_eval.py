@@ -0,0 +1,159 @@
+import random
+from functools import partial
+
+import pytest
+
+from bench.generators import random_arithmetic, wide_sum
+from src import (
+    Parser,
+    evaluate,
+    evaluate_batch,
+    evaluate_iterative,
+    evaluate_memoized,
+    scan,
+)
+from src.compiler import compile
+from src.env import GLOBALS
+from src.eval import EVALUATION_ERRORS
+from src.optimizer import fold_constants
+from src.parser import Expression
+from src.transpiler import transpile
+from src.vm import compile_program, run
+
+
+def parse(source: str) -> Expression:
+    return Parser(tokens=scan(source)).parse()
+
+
+ENGINES = {
+    "evaluate": evaluate,
+    "evaluate_iterative": evaluate_iterative,
+    "compile": lambda expr: compile(expr)(),
+    "vm": lambda expr: run(compile_program(expr)),
+    "transpile": lambda expr: transpile(expr)(),
+    "fold_constants": lambda expr: evaluate(fold_constants(expr)),
+}
+
+
+@pytest.fixture
+def globals_cleared():
+    yield
+    GLOBALS.clear()
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize(
+    "source", ["(+ t 1)", "(+ 1 t)", "(- t)", "(- 2 t)", "(/ 1 t)", "(= t 1)", "(= t)"]
+)
+def test_t_is_not_a_number(engine: str, source: str):
+    with pytest.raises(AssertionError, match="operate"):
+        ENGINES[engine](parse(source))
+
+
+def test_t_is_not_a_number_in_a_column():
+    with pytest.raises(AssertionError, match="Addition"):
+        evaluate_batch(parse("(+ x 1)"), {"x": [1, True]})
+
+
+def test_t_in_a_function():
+    with pytest.raises(AssertionError, match="Addition"):
+        evaluate(parse("((lambda (x) (+ x 1)) t)"))
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_symbols_are_looked_up_in_the_globals(engine: str, globals_cleared):
+    evaluate(parse("(defun id (x) x)"))
+    function = evaluate(parse("id"))
+    assert ENGINES[engine](parse("(list id)")).car is function
+    assert ENGINES[engine](parse("(id (list id))")).car is function
+    assert ENGINES[engine](parse("(list 'id)")).car.literal == "id"  # quoted: data
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_unbound_symbols_are_their_names(engine: str, globals_cleared):
+    assert str(ENGINES[engine](parse("(cons unbound nil)"))) == "(unbound)"
+
+
+COMPILERS = {
+    "compile": compile,
+    "vm": lambda expr: partial(run, compile_program(expr)),
+    "transpile": transpile,
+}
+
+
+@pytest.mark.parametrize("compiler", COMPILERS)
+def test_compiled_symbols_see_redefinitions(compiler: str, globals_cleared):
+    run_compiled = COMPILERS[compiler](parse("(list f)"))
+    assert str(run_compiled()) == "(f)"
+    evaluate(parse("(defun f (x) x)"))
+    assert run_compiled().car is evaluate(parse("f"))
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("source", ["(-)", "(/)", "(+ 1 (-))"])
+def test_minus_and_slash_need_an_argument(engine: str, source: str):
+    with pytest.raises(AssertionError, match="at least one number"):
+        ENGINES[engine](parse(source))
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize(
+    "source, printed",
+    [
+        ("(list 1 (list) '(a b))", "(1 nil (a b))"),
+        ("(cons 1 2)", "(1 . 2)"),
+        ("(cons 1 (cons 2 nil))", "(1 2)"),
+        ("(car (cdr (list 1 2 3)))", "2"),
+        ("(cdr (list 1))", "None"),
+        ("(car nil)", "None"),
+        ("(cdr (cons 1 '(2 (3))))", "(2 (3))"),
+    ],
+)
+def test_cons_cells(engine: str, source: str, printed: str):
+    assert str(ENGINES[engine](parse(source))) == printed
+
+
+def test_cons_shares_the_tail():
+    tail = evaluate(parse("'(2 3)"))
+    assert evaluate(parse("'(2 3)")) is not tail  # another quoted list
+    quoted = parse("(cons 1 '(2 3))")
+    assert evaluate(quoted).cdr is evaluate(quoted).cdr  # the same cells, kept
+    assert evaluate(quoted).cdr == tail
+
+
+def outcome(fn) -> tuple:
+    try:
+        value = fn()
+    except EVALUATION_ERRORS as error:
+        return ("error", type(error), str(error))
+    return ("value", type(value), str(value))
+
+
+def test_memoized_same_values():
+    rng = random.Random(0)
+    trees = [random_arithmetic(3, 2, rng) for _ in range(20)]
+    source = " ".join(trees * 3 + [wide_sum(10), "(+ 1 (/ 1 0))", "'(1 (+ 2 3))"])
+    forms = Parser(tokens=scan(source), hash_cons=True).parse_all()
+    memo = {}
+    for form in forms:
+        assert outcome(lambda form=form: evaluate_memoized(form, memo)) == outcome(
+            lambda form=form: evaluate(form)
+        )
+
+
+def test_memoized_calls_evaluated_once():
+    forms = Parser(
+        tokens=scan("(+ (- 5 2) (- 5 2)) (- 5 2)"), hash_cons=True
+    ).parse_all()
+    memo = {}
+    assert [evaluate_memoized(form, memo) for form in forms] == [6.0, 3]
+    assert len(memo) == 2  # (- 5 2), and the sum
+
+
+def test_memoized_calls_see_redefinitions(globals_cleared):
+    source = "(defun f (x) 1) (+ (f 1) 2) (defun f (x) 10) (+ (f 1) 2) (+ 2 3) (+ 2 3)"
+    forms = Parser(tokens=scan(source), hash_cons=True).parse_all()
+    memo = {}
+    values = [evaluate_memoized(form, memo) for form in forms]
+    assert [str(value) for value in values] == ["f", "3.0", "f", "12.0", "5.0", "5.0"]
+    assert len(memo) == 1  # only (+ 2 3): the other calls depend on f
@@ -0,0 +1,89 @@
+import random
+
+import pytest
+
+from bench.generators import WORKLOADS
+from src import IncrementalSource, Parser, scan
+
+# inserted by the random edits: bits of tokens, parens, quotes (opening or closing a
+# string), keywords, whitespace, and a non-ASCII char (parsed whole)
+INSERTS = [*"() '\"+-/12.9abtnil\n\t", "nil", "cons", "quote", "lambda", "(+ 1 2)", "é"]
+
+SOURCE = '(+ 1 23) "abc" (list \'(a b) "de") 45 (car \'(x))'
+
+
+def full_parse(source: str) -> tuple:
+    "The tokens and forms of a scan and parse of the whole source, or its error"
+    try:
+        tokens = scan(source)
+        return tokens, Parser(tokens=tokens).parse_all()
+    except (ValueError, AssertionError) as error:
+        return type(error), str(error)
+
+
+def check_edit(doc: IncrementalSource, offset: int, deleted: int, inserted: str):
+    "Edit the source, then check it against a full scan and parse"
+    before = doc.source
+    source = before[:offset] + inserted + before[offset + deleted :]
+    expected = full_parse(source)
+    try:
+        doc.edit(offset, deleted, inserted)
+    except (ValueError, AssertionError) as error:
+        assert (type(error), str(error)) == expected
+        assert doc.source == before
+        return
+    assert doc.source == source
+    assert (doc.tokens, doc.forms) == expected
+    if doc.starts is not None:
+        fresh = IncrementalSource(source)
+        assert list(doc.starts) == list(fresh.starts)
+        assert list(doc.ends) == list(fresh.ends)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_edits(seed: int):
+    rng = random.Random(seed)
+    for _ in range(30):
+        workloads = rng.choices(list(WORKLOADS.values()), k=rng.randint(1, 6))
+        separator = rng.choice([" ", "\n", ""])
+        doc = IncrementalSource(separator.join(w(rng.randint(1, 5)) for w in workloads))
+        for _ in range(20):
+            offset = rng.randint(0, len(doc.source))
+            deleted = rng.randint(0, min(3, len(doc.source) - offset))
+            inserted = "".join(rng.choices(INSERTS, k=rng.randint(0, 3)))
+            check_edit(doc, offset, deleted, inserted)
+
+
+@pytest.mark.parametrize(
+    "offset, deleted, inserted",
+    [
+        (SOURCE.index("23") + 1, 0, " "),  # splits a number: '2 3'
+        (SOURCE.index("45"), 0, "6"),  # extends a number
+        (SOURCE.index("abc"), 0, "x"),  # inside a string
+        (SOURCE.index('c"'), 2, " "),  # the end of a string: it closes on the space now
+        (SOURCE.index(")"), 1, ""),  # a closing paren: the next forms join in
+        (SOURCE.index("45") + 2, 1, ""),  # a space between two forms: '45(car'
+        (0, 1, ""),  # an opening paren: unbalanced
+        (SOURCE.index("(a b)") + 5, 0, ")"),  # ends a form early
+        (SOURCE.index("abc"), 20, ""),  # across forms
+        (len(SOURCE), 0, " (list 1)"),
+        (SOURCE.index("45"), 0, "é"),  # non-ASCII: parsed whole
+    ],
+)
+def test_edit(offset: int, deleted: int, inserted: str):
+    check_edit(IncrementalSource(SOURCE), offset, deleted, inserted)
+
+
+def test_untouched_forms_kept():
+    doc = IncrementalSource(SOURCE)
+    forms = list(doc.forms)
+    assert doc.edit(SOURCE.index("de"), 1, "xy") == range(2, 3)
+    assert all(doc.forms[idx] is forms[idx] for idx in [0, 1, 3, 4])
+    assert doc.forms[2] is not forms[2]
+    assert doc.stats.full_parses == 1  # the one of the constructor
+
+
+def test_edit_out_of_the_source():
+    doc = IncrementalSource(SOURCE)
+    with pytest.raises(ValueError, match="Edit out of the source"):
+        doc.edit(len(SOURCE), 1, "")
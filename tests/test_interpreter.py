@@ -0,0 +1,100 @@
+import io
+
+import pytest
+
+from src import Hooks, Interpreter, ProfileCollector, scan
+from src.env import GLOBALS
+from src.parser import to_lisp
+from src.token import TokenKind
+
+PROGRAM = """
+(defun count (n acc)
+  (if (= n 0) acc (count (- n 1) (+ acc 1))))
+(count 5 0)
+(list (+ 1 2) '(a b) ((lambda (x) (- x 1)) 7))
+"""
+
+
+class Recorder(Hooks):
+    "Every event, as text"
+
+    def __init__(self):
+        self.events: list[tuple] = []
+
+    def on_token(self, token):
+        self.events.append(("token", token.lexeme))
+
+    def on_form(self, form):
+        self.events.append(("form", to_lisp(form)))
+
+    def on_call(self, op, args):
+        self.events.append(("call", op.lexeme, list(args)))
+
+    def on_node(self, node, value, elapsed_ns):
+        assert elapsed_ns >= 0
+        self.events.append(("node", to_lisp(node), value))
+
+
+@pytest.fixture(autouse=True)
+def globals_cleared():
+    yield
+    GLOBALS.clear()
+
+
+def events(recorder: Recorder, kind: str) -> list[tuple]:
+    return [event[1:] for event in recorder.events if event[0] == kind]
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_same_values_with_hooks(stream: bool):
+    expected = Interpreter().run(PROGRAM)
+    GLOBALS.clear()
+    source = io.StringIO(PROGRAM) if stream else PROGRAM
+    assert Interpreter(hooks=Recorder()).run(source) == expected
+
+
+def test_events():
+    recorder = Recorder()
+    Interpreter(hooks=recorder).run(PROGRAM)
+    assert len(events(recorder, "token")) == len(scan(PROGRAM))
+    assert [form[:6] for (form,) in events(recorder, "form")] == [
+        "(defun",
+        "(count",
+        "(list ",
+    ]
+    calls = events(recorder, "call")
+    # the operator calls inside the functions are emitted too
+    assert calls.count(("=", [5, 0])) == calls.count(("-", [5, 1])) == 1
+    assert calls.count(("-", [7, 1])) == 1
+    assert sum(op == "+" for op, _ in calls) == 6
+    assert calls[-1][0] == "list"
+    assert ("(= n 0)", None) in events(recorder, "node")
+    assert ("(- x 1)", 6) in events(recorder, "node")
+
+
+def test_profile_report():
+    profile = ProfileCollector(top=3)
+    Interpreter(hooks=profile).run(PROGRAM)
+    assert profile.n_tokens == len(scan(PROGRAM)) and profile.n_forms == 3
+    assert profile.calls[TokenKind.EQUAL] == 6
+    assert profile.calls[TokenKind.MINUS] == 6
+    assert profile.calls[TokenKind.DEFUN] == 0
+    assert len(profile.hottest) == 3
+
+    lines = profile.report().splitlines()
+    assert lines[0] == f"{len(scan(PROGRAM))} tokens, 3 forms"
+    top = lines.index("hottest forms (top 3, sub-expressions included):")
+    rows = {line.split()[0]: line.split()[1] for line in lines[2:top]}
+    assert rows["="] == rows["-"] == "6"
+    assert top == len(lines) - 4
+    assert all(line.split("ms  ")[1].startswith("(") for line in lines[-3:])
+
+
+def test_long_forms_cut_in_report():
+    profile = ProfileCollector(top=1)
+    Interpreter(hooks=profile).run("(+ " + "1 " * 100 + ")")
+    assert (
+        profile.report(max_width=20)
+        .splitlines()[-1]
+        .endswith(" ms  (+ 1 1 1 1 1 1 1 ...")
+    )
@@ -0,0 +1,113 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from main import main, run_corpus
+
+
+@pytest.fixture
+def snippets(tmp_path: Path) -> list[Path]:
+    "A snippet defining a function, then one calling it (which should not see it)"
+    define, call = tmp_path / "a_define.lisp", tmp_path / "b_call.lisp"
+    define.write_text("(defun f (x) (+ x 1)) (f 1)")
+    call.write_text("(f 1)")
+    return [define, call]
+
+
+@pytest.mark.parametrize("jobs, chunksize", [(1, None), (2, 1), (2, 2)])
+def test_snippets_do_not_share_functions(snippets: list[Path], jobs, chunksize):
+    define, call = run_corpus(snippets, jobs, chunksize)
+    assert define.error is None
+    assert define.values[1] == 2.0
+    assert call.error is not None and "Invalid function call" in call.error
+
+
+@pytest.mark.parametrize("jobs, chunksize", [(1, None), (2, 1), (2, 2), (3, None)])
+def test_results_in_input_order(tmp_path: Path, jobs: int, chunksize):
+    paths = []
+    for idx in range(7):
+        paths.append(tmp_path / f"snippet_{idx}.lisp")
+        paths[-1].write_text(f"(+ {idx} 1) '(a b)")
+    results = run_corpus(paths, jobs, chunksize)
+    assert [result.path for result in results] == list(map(str, paths))
+    assert [result.values[0] for result in results] == [idx + 1.0 for idx in range(7)]
+    assert all(result.n_tokens == 10 for result in results)
+
+
+def test_snippet_errors(tmp_path: Path):
+    bad_syntax, missing = tmp_path / "bad.lisp", tmp_path / "missing.lisp"
+    bad_syntax.write_text("(+ 1 2) (+ 1")
+    bad, missing_result = run_corpus([bad_syntax, missing], jobs=1)
+    assert bad.values == [3.0] and bad.error.startswith("ValueError")
+    assert missing_result.error.startswith("FileNotFoundError")
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_batch_goes_on_after_an_arity_error(tmp_path: Path, jobs: int):
+    empty_minus, after = tmp_path / "a_minus.lisp", tmp_path / "b_after.lisp"
+    empty_minus.write_text("(+ 1 2) (-)")
+    after.write_text("(/ 6 3)")
+    minus_result, after_result = run_corpus([empty_minus, after], jobs)
+    assert minus_result.values == [3.0]
+    assert minus_result.error.startswith("AssertionError")
+    assert after_result.values == [2.0] and after_result.error is None
+
+
+def run_main(monkeypatch, capsys, *args: str) -> tuple[str, str]:
+    monkeypatch.setattr("sys.argv", ["main.py", *args])
+    main()
+    captured = capsys.readouterr()
+    return captured.out, captured.err
+
+
+@pytest.mark.parametrize("batch", [[], ["--batch", "--jobs", "1"]])
+def test_jsonl_format(tmp_path: Path, monkeypatch, capsys, batch: list[str]):
+    snippet = tmp_path / "forms.lisp"
+    # NOTE: only the batch mode reports the errors of a snippet (and goes on)
+    snippet.write_text('(+ 1 2) \'(a "b" (t))' + (" (/ 1 0)" if batch else ""))
+    out, err = run_main(monkeypatch, capsys, "--format", "jsonl", *batch, str(snippet))
+    lines = [json.loads(line) for line in out.splitlines()]
+    assert [line["form"] for line in lines] == list(range(3 if batch else 2))
+    assert [line["value"] for line in lines[:2]] == [3.0, ["a", "b", [True]]]
+    if batch:
+        assert lines[2]["error"].startswith("ValueError")
+        assert "1 files (1 errors)" in err
+
+
+def test_plain_format(tmp_path: Path, monkeypatch, capsys):
+    snippet = tmp_path / "forms.lisp"
+    snippet.write_text('(+ 1 2) \'(a "b" (t)) (cons nil 1) (list 1 (list))')
+    out, _ = run_main(monkeypatch, capsys, "--format", "plain", str(snippet))
+    assert out.splitlines() == ["3.0", "(a b (t))", "(nil . 1)", "(1 nil)"]
+
+
+@pytest.mark.parametrize("output_format, imported", [("jsonl", False), ("rich", True)])
+def test_rich_imported_lazily(output_format: str, imported: bool):
+    code = (
+        "import sys, main; "
+        f"sys.argv = ['main.py', '--format', '{output_format}', "
+        "'lisp_snippets/addition.lisp']; "
+        "main.main(); "
+        "print('rich' in sys.modules)"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=Path(__file__).parent.parent,
+    ).stdout
+    assert out.splitlines()[-1] == str(imported)
+
+
+@pytest.mark.parametrize("batch", [[], ["--batch", "--jobs", "1"]])
+def test_non_ascii_snippet(tmp_path: Path, monkeypatch, capsys, batch: list[str]):
+    "Scanned whole when not ASCII, even after the first chunk of a stream"
+    snippet = tmp_path / "accents.lisp"
+    snippet.write_text("(+ 1 2) " * 10_000 + "'(café crème)", encoding="utf-8")
+    out, _ = run_main(monkeypatch, capsys, "--format", "plain", *batch, str(snippet))
+    assert "error:" not in out and "Error" not in out
+    assert "(café crème)" in out
@@ -0,0 +1,89 @@
+import re
+import sys
+
+import pytest
+
+from bench.generators import deep_quoted_list, deep_sum
+from src import Parser, evaluate, evaluate_iterative, scan
+from src.cache import encode_expression
+from src.cons import Cons
+
+DEPTH = 3000  # deeper than the default recursion limit
+
+
+@pytest.fixture
+def deep_recursion():
+    "Let the recursive versions go as deep as `DEPTH`, to compare them"
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(10 * DEPTH)
+    yield
+    sys.setrecursionlimit(limit)
+
+
+def flat(value: object) -> list:
+    "The value (cons cells, nested at any depth, included) as a flat list"
+    items, todo = [], [value]
+    while todo:
+        value = todo.pop()
+        if type(value) is Cons:
+            items.append("(")
+            todo += [value.cdr, ")", value.car]  # car, then cdr
+        else:
+            items.append(value)
+    return items
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        deep_sum(DEPTH),
+        deep_quoted_list(DEPTH),
+        "'" * DEPTH + "1",
+        "(list " * DEPTH + ")" * DEPTH,
+        "(+ 1 " * DEPTH + "(+ 1 nil" + ")" * (DEPTH + 1),
+    ],
+    ids=["sum", "quoted list", "quotes", "lists", "error"],
+)
+def test_same_as_recursive(deep_recursion, source: str):
+    tokens = scan(source)
+    expr = Parser(tokens=tokens).parse()
+    expr_iterative = Parser(tokens=tokens).parse_iterative()
+    # NOTE: the encodings are compared, `==` on the nested lists would recurse
+    assert encode_expression(expr_iterative) == encode_expression(expr)
+
+    def outcome(evaluate_fn):
+        try:
+            return "value", flat(evaluate_fn(expr))
+        except AssertionError as error:
+            return "error", str(error)
+
+    assert outcome(evaluate_iterative) == outcome(evaluate)
+
+
+@pytest.mark.parametrize(
+    "source",
+    ["(+ 1 " * DEPTH, "(" * DEPTH + ")" * (DEPTH - 1), "'" * DEPTH],
+    ids=["sum", "lists", "quotes"],
+)
+def test_same_errors_as_recursive(deep_recursion, source: str):
+    tokens = scan(source)
+    with pytest.raises(ValueError) as error:
+        Parser(tokens=tokens).parse()
+    with pytest.raises(ValueError, match=re.escape(str(error.value))):
+        Parser(tokens=tokens).parse_iterative()
+
+
+def test_any_depth():
+    depth = 20_000
+    tokens = scan(deep_sum(depth))
+    with pytest.raises(RecursionError):
+        Parser(tokens=tokens).parse()
+    expr = Parser(tokens=tokens).parse_iterative()
+    assert evaluate_iterative(expr) == depth + 1
+    with pytest.raises(RecursionError):
+        evaluate(expr)
+
+    value = evaluate_iterative(
+        Parser(tokens=scan(deep_quoted_list(depth))).parse_iterative()
+    )
+    assert flat(value) == ["("] * (depth - 1) + [None] + [")", None] * (depth - 1)
@@ -0,0 +1,109 @@
+import random
+
+import pytest
+
+from src.eval import EVALUATION_ERRORS, evalate_single_op, set_arithmetic_backend
+from src.token import SINGLETON_TOKENS, TokenKind
+
+pytest.importorskip("numpy")
+
+from src.numpy_backend import MIN_ARGS, evaluate_arithmetic
+
+OPERATORS = [TokenKind.PLUS, TokenKind.MINUS, TokenKind.SLASH]
+
+# around the limits of exact floats and of int64, and the special floats
+EDGE_VALUES = [
+    *(2**53 + delta for delta in (-2, -1, 0, 1, 2, 3)),
+    *(-(2**53) + delta for delta in (-1, 0, 1)),
+    2**63 - 1,
+    -(2**63),
+    2**63,
+    10**17,
+    10**30,
+    0,
+    0.0,
+    -0.0,
+    0.5,
+    1e-320,
+    1e308,
+    float("inf"),
+    float("-inf"),
+    float("nan"),
+]
+
+
+def python_outcome(kind: TokenKind, args: list) -> tuple:
+    "The value (with its type) or the error of the Python path"
+    try:
+        value = evalate_single_op(SINGLETON_TOKENS[kind], args)
+    except EVALUATION_ERRORS as error:
+        return ("error", type(error))
+    return ("value", type(value), repr(value))
+
+
+def random_args(rng: random.Random) -> list:
+    n_args = rng.randint(MIN_ARGS, MIN_ARGS + 8)
+    pools = [
+        lambda: rng.randint(1, 9),
+        lambda: rng.randint(-(10**6), 10**6),
+        lambda: rng.choice(EDGE_VALUES),
+        lambda: rng.uniform(-1e3, 1e3),
+    ]
+    picked = rng.sample(pools, rng.randint(1, len(pools)))
+    args = [rng.choice(picked)() for _ in range(n_args)]
+    if rng.random() < 0.5:
+        args[2:] = [1] * (n_args - 2)  # e.g. (/ 9007199254740993 3 1 1 ...)
+    return args
+
+
+@pytest.mark.parametrize("seed", range(10))
+@pytest.mark.parametrize("kind", OPERATORS)
+def test_same_values_as_python(kind: TokenKind, seed: int):
+    rng = random.Random(seed)
+    n_fast = 0
+    for _ in range(300):
+        args = random_args(rng)
+        value = evaluate_arithmetic(kind, args)
+        if value is not None:
+            assert ("value", type(value), repr(value)) == python_outcome(kind, args), (
+                args
+            )
+            n_fast += 1
+    assert n_fast > 0  # NumPy computes some of them
+
+
+@pytest.mark.parametrize("kind", OPERATORS)
+@pytest.mark.parametrize("first", EDGE_VALUES)
+def test_edge_values(kind: TokenKind, first):
+    for args in ([first, 3] + [1] * MIN_ARGS, [first, 3.0] + [1] * MIN_ARGS):
+        value = evaluate_arithmetic(kind, args)
+        if value is not None:
+            assert ("value", type(value), repr(value)) == python_outcome(kind, args)
+
+
+def test_inexact_int_quotient():
+    args = [9007199254740993, 3] + [1] * 62
+    assert evaluate_arithmetic(TokenKind.SLASH, args) is None
+    set_arithmetic_backend("numpy")
+    try:
+        assert (
+            evalate_single_op(SINGLETON_TOKENS[TokenKind.SLASH], args)
+            == 3002399751580331.0
+        )
+    finally:
+        set_arithmetic_backend("python")
+
+
+@pytest.mark.parametrize("kind", OPERATORS)
+def test_errors_left_to_python(kind: TokenKind):
+    bad_args = [[1, True] * MIN_ARGS, [1, "a"] * MIN_ARGS]
+    if kind == TokenKind.SLASH:
+        bad_args.append([1, 0] * MIN_ARGS)
+    for args in bad_args:
+        assert evaluate_arithmetic(kind, args) is None
+        set_arithmetic_backend("numpy")
+        try:
+            numpy_outcome = python_outcome(kind, args)
+        finally:
+            set_arithmetic_backend("python")
+        assert numpy_outcome == python_outcome(kind, args)
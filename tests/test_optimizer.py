@@ -0,0 +1,58 @@
+import random
+
+import pytest
+
+from bench.generators import arithmetic_chain, random_arithmetic, wide_list
+from src import Parser, evaluate, scan
+from src.budget import Budget, BudgetExceeded
+from src.eval import EVALUATION_ERRORS
+from src.optimizer import fold_constants
+from src.parser import Expression
+
+
+def parse(source: str) -> Expression:
+    return Parser(tokens=scan(source)).parse()
+
+
+def outcome(expr: Expression) -> tuple:
+    "The value of the expression (its type and how it prints), or its error"
+    try:
+        value = evaluate(expr)
+    except EVALUATION_ERRORS as error:
+        return ("error", type(error), str(error))
+    return ("value", type(value), str(value))
+
+
+def sources() -> list[str]:
+    rng = random.Random(0)
+    generated = [random_arithmetic(5, 3, rng) for _ in range(20)]
+    return [
+        *generated,
+        *(source.replace("9", "0") for source in generated),  # zero divisors
+        *(source.replace("7", '"kiwi"') for source in generated),
+        arithmetic_chain(100),
+        f"(cons {wide_list(20)} (list 1 (cons 2 nil) (cons (+ 1 2) '(a b))))",
+        "(+ (car (list 1 2)) (cdr (cons 3 4)) (- (/ 6 2) 1))",
+        "(+ " + "9" * 400 + " 1)",
+        "(list (+ 1 2) (+))",
+        "(+ 1 (-))",
+        "(list (/) 2)",
+    ]
+
+
+@pytest.mark.parametrize("source", sources())
+def test_folding_keeps_the_value(source: str):
+    expr = parse(source)
+    assert outcome(fold_constants(expr)) == outcome(expr)
+
+
+def test_unchanged_subtrees_kept():
+    expr = parse("(+ (/ 1 0) (- 3 2) (cons 1 '(x)))")
+    folded = fold_constants(expr)
+    assert folded[1] is expr[1]  # raises: left for evaluation time
+    assert folded[2] == parse("1") and folded[3] is expr[3]
+
+
+def test_budget_exceeded_while_folding():
+    with pytest.raises(BudgetExceeded), Budget(max_steps=5):
+        fold_constants(parse("(+ (+ 1 2) (+ 3 4))"))
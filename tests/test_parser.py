@@ -0,0 +1,74 @@
+import io
+import itertools
+
+import pytest
+
+from src import Parser, iter_tokens, scan
+from src.parser import OPERATORS, SINGLETON_ATOMS, NodeTable
+from src.token import TokenKind
+
+FORMS = [
+    "(+ 2 3)",
+    "'(a b)",
+    "''x",
+    '"abc"',
+    "12",
+    "(/ (- 7 1) (+ 1 2))",
+    "(cons nil 1)",
+]
+
+
+def test_iter_forms_same_as_parse():
+    source = " \n".join(FORMS)
+    expected = [Parser(tokens=scan(form)).parse() for form in FORMS]
+    assert list(Parser(tokens=scan(source)).iter_forms()) == expected
+    assert (
+        list(Parser(tokens=iter_tokens(io.StringIO(source))).iter_forms()) == expected
+    )
+    assert Parser(tokens=scan(source)).parse_all() == expected
+
+
+def test_iter_forms_is_lazy():
+    stream = io.StringIO("(+ 1 2) " * 100_000)
+    forms = Parser(tokens=iter_tokens(stream, chunk_size=1024)).iter_forms()
+    assert len(list(itertools.islice(forms, 3))) == 3
+    assert stream.tell() <= 2048  # only the first chunks were read
+
+
+@pytest.mark.parametrize(
+    "source, n_forms, error",
+    [
+        ("(+ 1 2) ) (+ 3 4)", 1, "Unexpected token at idx 6"),
+        ("(+ 1 2) '(a", 1, "Ran out of tokens before finding the end of the list"),
+        ("1 2 '", 2, "Ran out of tokens"),
+    ],
+)
+def test_iter_forms_yields_the_forms_before_an_error(
+    source: str, n_forms: int, error: str
+):
+    forms = Parser(tokens=scan(source)).iter_forms()
+    assert len(list(itertools.islice(forms, n_forms))) == n_forms
+    with pytest.raises(ValueError, match=error):
+        next(forms)
+
+
+def test_nodes_shared():
+    first, second = Parser(tokens=scan("(+ nil t 1) (+ nil t 1)")).parse_all()
+    assert first[0] is second[0] is OPERATORS[TokenKind.PLUS]
+    assert first[1] is second[1] is SINGLETON_ATOMS[TokenKind.NIL]
+    assert first[2] is second[2] is SINGLETON_ATOMS[TokenKind.TRUE]
+    assert first[3] == second[3] and first[3] is not second[3]
+    assert not hasattr(first[0], "__dict__") and not hasattr(first[3], "__dict__")
+    quoted = Parser(tokens=scan("'x")).parse()
+    assert quoted[0] is OPERATORS[TokenKind.QUOTE]
+
+
+def test_hash_consing():
+    source = "(+ 2 3) (+ 2 3) (/ (+ 2 3) 2.0) '(+ 2 3) (+ 2.0 3)"
+    table = NodeTable()
+    forms = Parser(tokens=scan(source), nodes=table).parse_all()
+    assert forms == Parser(tokens=scan(source)).parse_all()
+    assert forms[0] is forms[1] is forms[2][1] is forms[3][1]
+    assert forms[4] is not forms[0]  # 2.0 and 2 are equal, but not the same atom
+    assert Parser(tokens=scan("(+ 2 3)"), nodes=table).parse() is forms[0]
+    assert table.dedup_ratio > 1
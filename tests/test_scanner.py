@@ -0,0 +1,164 @@
+import io
+import random
+from functools import partial
+
+import pytest
+
+from src import Parser, TokenStream, evaluate, iter_tokens, scan
+from src.token import SINGLETON_TOKENS, TokenKind
+
+
+def kinds_and_lexemes(tokens) -> list[tuple[TokenKind, str]]:
+    return [(tok.kind, tok.lexeme) for tok in tokens]
+
+
+def scan_all_ways(source: str) -> list[list[tuple[TokenKind, str]]]:
+    "The tokens of each scanner, which should all agree"
+    return [
+        kinds_and_lexemes(scan(source)),
+        kinds_and_lexemes(scan(source, engine="regex")),
+        kinds_and_lexemes(iter_tokens(io.StringIO(source), chunk_size=3)),
+        kinds_and_lexemes(TokenStream(source)),
+    ]
+
+
+@pytest.mark.parametrize(
+    "source, keyword",
+    [
+        ("(list)", TokenKind.LIST),
+        ("(car '(1))", TokenKind.CAR),
+        ("(cdr(list 1))", TokenKind.CDR),
+        ("(cons 1 nil)", TokenKind.NIL),
+        ("nil", TokenKind.NIL),
+    ],
+)
+def test_keyword_before_delimiter(source: str, keyword: TokenKind):
+    "The delimiter after a keyword is a token of its own"
+    for tokens in scan_all_ways(source):
+        assert "".join(lexeme for _, lexeme in tokens) == source.replace(" ", "")
+        assert (keyword, keyword.value) in tokens
+
+
+@pytest.mark.parametrize(
+    "symbol",
+    ["cart", "cdrs", "listing", "nile", "consing", "quoted"]
+    + ["defunct", "lambdas", "iffy", "ifs"],
+)
+def test_symbol_starting_with_keyword(symbol: str):
+    for tokens in scan_all_ways(f"'({symbol} {symbol})"):
+        assert tokens[2:4] == [(TokenKind.SYMBOL, symbol)] * 2
+
+
+def test_keyword_prefixed_symbols_evaluate_to_themselves():
+    quoted = evaluate(Parser(tokens=scan("'(cart listing nile)")).parse())
+    assert str(quoted) == "(cart listing nile)"
+
+
+def test_list_without_arguments():
+    assert evaluate(Parser(tokens=scan("(list)")).parse()) is None
+    assert evaluate(Parser(tokens=scan("(car '(1))")).parse()) == 1
+
+
+def test_special_form_prefixed_symbols_evaluate_to_themselves():
+    quoted = evaluate(Parser(tokens=scan("'(defunct lambdas iffy)")).parse())
+    assert str(quoted) == "(defunct lambdas iffy)"
+
+
+def test_special_forms_before_delimiters():
+    source = "((lambda(x)(if(= x 1)x nil))1)"
+    for tokens in scan_all_ways(source):
+        assert (TokenKind.LAMBDA, "lambda") in tokens
+        assert (TokenKind.IF, "if") in tokens
+    assert evaluate(Parser(tokens=scan(source)).parse()) == 1
+
+
+# pieces of the generated sources: tokens, keywords and symbols they prefix, bad input
+FRAGMENTS = (
+    ["nil", "cons", "quote", "car", "cdr", "list", "lambda", "if", "defun", "t"]
+    + ["cart", "listing", "nile", "quoted", "defunct", "iffy", "lambdas", "tea"]
+    + ["(", ")", "'", "+", "-", "/", "=", " ", "\n", "\t", "\r"]
+    + ["3.14", "2.", "12", ".5", '"ab"', '"a', "x", "é", "@"]
+)
+
+
+def scan_outcome(source: str, engine: str) -> tuple:
+    "The tokens, or the error, of a scan"
+    try:
+        return ("tokens", scan(source, engine=engine))
+    except ValueError as error:
+        return ("error", str(error))
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_regex_engine_matches_loop_engine(seed: int):
+    rng = random.Random(seed)
+    for _ in range(500):
+        source = "".join(rng.choices(FRAGMENTS, k=rng.randint(0, 12)))
+        assert scan_outcome(source, "regex") == scan_outcome(source, "loop"), source
+        if source.isascii() and scan_outcome(source, "loop")[0] == "tokens":
+            tokens = scan_all_ways(source)
+            assert all(other == tokens[0] for other in tokens[1:]), source
+
+
+# non-ASCII pieces: letters, digits, whitespace which `strip()` drops but the loop rejects
+UNICODE_FRAGMENTS = FRAGMENTS + ["café", '"é"', "\u3000", "\xa0", "²", "٣", '"', '" ']
+
+
+def stream_outcome(scan_tokens) -> tuple:
+    "The tokens, or the fact that scanning raised (the offsets in messages may differ)"
+    try:
+        return ("tokens", kinds_and_lexemes(scan_tokens()))
+    except ValueError:
+        return ("error",)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_iter_tokens_on_non_ascii_sources(seed: int):
+    rng = random.Random(seed)
+    for _ in range(1000):
+        source = "".join(rng.choices(UNICODE_FRAGMENTS, k=rng.randint(0, 16)))
+        chunk_size = rng.randint(1, 8)
+        expected = stream_outcome(partial(scan, source))
+        for stream in (io.StringIO(source), source.encode()):
+            tokens = stream_outcome(partial(iter_tokens, stream, chunk_size))
+            assert tokens == expected, (source, chunk_size)
+
+
+def test_iter_tokens_keeps_streaming_after_non_ascii():
+    stream = io.StringIO("'(é) " + "(+ 1 2)\n" * 100_000)
+    tokens = iter_tokens(stream, chunk_size=1024)
+    assert kinds_and_lexemes(next(tokens) for _ in range(4))[2] == (
+        TokenKind.SYMBOL,
+        "é",
+    )
+    assert stream.tell() <= 2048  # only the first chunks were read
+
+
+def test_fixed_tokens_shared():
+    source = "(cons nil '(t 1)) (+ (- 1) (/ 2 x))"
+    for tokens in (
+        scan(source),
+        scan(source, engine="regex"),
+        list(iter_tokens(io.StringIO(source), chunk_size=3)),
+        list(TokenStream(source)),
+    ):
+        for tok in tokens:
+            assert not hasattr(tok, "__dict__")
+            if tok.kind in SINGLETON_TOKENS:
+                assert tok is SINGLETON_TOKENS[tok.kind]
+
+
+@pytest.mark.parametrize(
+    "source", ["(foo 'foo (bar foo)) foo", "(foo 'foo (é foo)) foo"]
+)
+def test_symbol_names_shared_within_a_scan(source: str):
+    scans = [
+        scan(source),
+        scan(source, engine="regex"),
+        list(iter_tokens(io.StringIO(source), chunk_size=3)),
+    ]
+    if source.isascii():
+        scans.append(list(TokenStream(source)))
+    for tokens in scans:
+        names = [tok.literal for tok in tokens if tok.lexeme == "foo"]
+        assert len(names) == 4 and all(name is names[0] for name in names)
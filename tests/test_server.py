@@ -0,0 +1,67 @@
+import asyncio
+import gc
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import server
+from server import EvalServer, _Pending, run_request
+from src.env import SYMBOLS
+from src.eval import _quoted_cache
+
+LIMITS = (10**6, 10**6, 1.0)  # max steps, max allocations, max seconds
+
+
+def unique_request(idx: int) -> str:
+    "A program with symbols and quoted lists of its own, e.g. (defun fbc (xbc) ...)"
+    name = str(idx).translate(str.maketrans("0123456789", "abcdefghij"))
+    return f"(defun f{name} (x{name}) (cons x{name} '(a{name} ({idx})))) (f{name} 'b{name})"
+
+
+def test_request_values_and_errors():
+    assert run_request("(+ 1 2) '(a (b))", *LIMITS) == {"values": [3.0, ["a", ["b"]]]}
+    assert run_request("(/ 1 0)", *LIMITS)["error"].startswith("ValueError")
+    assert run_request("(-)", *LIMITS)["error"].startswith("AssertionError")
+    response = run_request("(list 1 2 3)", 10**6, 2, 1.0)
+    assert response["budget"] == {"resource": "allocations", "limit": 2, "used": 3}
+
+
+def test_nothing_left_after_a_request():
+    assert run_request(unique_request(1), *LIMITS) == {
+        "values": ["fb", ["bb", "ab", [1]]]
+    }
+    assert len(SYMBOLS) == len(_quoted_cache) == 0
+
+
+def test_memory_stays_bounded():
+    for idx in range(100):
+        run_request(unique_request(idx), *LIMITS)  # warm up the caches of Python
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        for idx in range(100, 1100):
+            run_request(unique_request(idx), *LIMITS)
+        gc.collect()
+        growth = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    assert growth < 100_000  # was ~1.9 MB: the symbols and the quoted lists were kept
+
+
+def test_every_request_of_a_failed_batch_gets_a_response(monkeypatch):
+    def run_batch(requests: list) -> list[dict]:
+        raise TypeError("a bug")
+
+    monkeypatch.setattr(server, "run_batch", run_batch)
+
+    async def run_failing_batch() -> list[dict]:
+        eval_server = EvalServer(jobs=1)
+        eval_server.pool.shutdown()
+        eval_server.pool = ThreadPoolExecutor(1)  # NOTE: sees the patched run_batch
+        loop = asyncio.get_running_loop()
+        batch = [_Pending("(+ 1 2)", *LIMITS, loop.create_future()) for _ in range(3)]
+        await eval_server._run(batch, asyncio.Semaphore(0))
+        eval_server.pool.shutdown()
+        return [pending.result.result() for pending in batch]
+
+    assert asyncio.run(run_failing_batch()) == [{"error": "TypeError: a bug"}] * 3
@@ -0,0 +1,87 @@
+import mmap
+import random
+import re
+from functools import partial
+
+import pytest
+
+from src import Parser, TokenStream, scan
+from src.token import TokenKind
+from tests.test_scanner import FRAGMENTS
+
+ASCII_FRAGMENTS = [fragment for fragment in FRAGMENTS if fragment.isascii()]
+
+
+def stream_sources(source: str, tmp_path) -> list:
+    "The source as each kind of buffer a TokenStream takes"
+    path = tmp_path / "source.lisp"
+    path.write_bytes(source.encode())
+    with open(path, "rb") as file:
+        # NOTE: an empty file can't be mapped
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if source else b""
+    return [
+        source,
+        source.encode(),
+        bytearray(source.encode()),
+        memoryview(source.encode()),
+        mapped,
+    ]
+
+
+def outcome(make_tokens) -> tuple:
+    "The tokens, or the fact that scanning raised (the offsets in messages may differ)"
+    try:
+        return ("tokens", list(make_tokens()))
+    except ValueError:
+        return ("error",)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_same_tokens_as_scan(tmp_path, seed: int):
+    rng = random.Random(seed)
+    for _ in range(100):
+        source = "".join(rng.choices(ASCII_FRAGMENTS, k=rng.randint(0, 12)))
+        expected = outcome(partial(scan, source, engine="regex"))
+        for buffer in stream_sources(source, tmp_path):
+            assert outcome(partial(TokenStream, buffer)) == expected, source
+
+
+def test_spans_and_lexemes(tmp_path):
+    source = '  (list "ab" 12.5)\n\n(car x) '
+    for buffer in stream_sources(source, tmp_path):
+        tokens = TokenStream(buffer)
+        assert len(tokens) == 9
+        assert tokens.kind(2) == TokenKind.STRING
+        assert tokens.span(2) == (8, 12) and tokens.lexeme(2) == '"ab"'
+        assert tokens[3].literal == 12.5
+        assert tokens[-1] == tokens[8] and tokens[2:4] == [tokens[2], tokens[3]]
+        assert [tokens.line_col(idx) for idx in [0, 4, 5, 7]] == [
+            (1, 3),
+            (1, 18),
+            (3, 1),
+            (3, 6),
+        ]
+
+
+@pytest.mark.parametrize(
+    "source, location",
+    [
+        ("(+ 1 2)\n  (list )) 3", "(line 2, column 10)"),
+        ("\n\n   )", "(line 3, column 4)"),
+        ("(car '(1)) '\n)", "(line 2, column 1)"),
+    ],
+)
+def test_location_in_parse_errors(tmp_path, source: str, location: str):
+    for buffer in stream_sources(source, tmp_path):
+        with pytest.raises(
+            ValueError, match=rf"Unexpected token at idx \d+ {re.escape(location)}: "
+        ):
+            Parser(tokens=TokenStream(buffer)).parse_all()
+    # the tokens of `scan` don't know where they are
+    with pytest.raises(ValueError, match=r"Unexpected token at idx \d+: "):
+        Parser(tokens=scan(source)).parse_all()
+
+
+def test_non_ascii_text_rejected():
+    with pytest.raises(ValueError, match="Only ASCII sources"):
+        TokenStream("(list é)")